@@ -136,10 +136,10 @@ def main():
                             message = st.chat_message("user")
                             message.write(prompt)
                             #st.chat_message(prompt, is_user=True)
-                            response = agent.chat_completions(st.session_state["prefix_messages"] + st.session_state["messages"])
-                            st.session_state["messages"].append({"role": "assistant", "content": response})
                             message = st.chat_message("assistant")
-                            message.write(response)
+                            # render tokens as they arrive instead of waiting for the whole answer
+                            response = message.write_stream(agent.stream_chat_completions(st.session_state["prefix_messages"] + st.session_state["messages"]))
+                            st.session_state["messages"].append({"role": "assistant", "content": response})
                             #st.chat_message(response)
 
 
@@ -1,7 +1,9 @@
 from openai import OpenAI
 from backend.utils.parameters import *
 import asyncio
-from typing import List, Dict, Literal
+import os
+import time
+from typing import List, Dict, Literal, Iterator, AsyncIterator
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
 from backend.models.data_model import TradingReasoning
@@ -10,8 +12,13 @@ from backend.orchestrator.NewsPipeline import NewsPipeline
 from backend.orchestrator.TechnicalAnalysisPipeline import TechnicalAnalysisPipeline
 from backend.utils.keep_time import time_it
 from backend.utils.format_response import basemodel_to_md_str
+from backend.utils.llm_clients import LLM_CLIENTS
+from backend.service.DriverPool import DRIVER_POOL
+from backend.utils.logger_config import get_logger
 import aiohttp
 
+logger = get_logger(__name__)
+
 class FXAgent():
     SYSTEM_MESSAGE = """Objective:
     You are an assistant designed to analyze financial information relevant to the {currency_pair} exchange rate and provide informed trading strategies based on the analysis of various data sources.
@@ -56,6 +63,8 @@ class FXAgent():
         self.model_name = model_name
         self.temperature = temperature
         self.currency_pair = currency_pair
+        # timings of the last streamed answer: time to first token, total time and chunk count
+        self.stream_stats = {}
     
     def run(self, messages):
         return self.chat_completions(messages)
@@ -84,6 +93,48 @@ class FXAgent():
         )
         return response.choices[0].message.content
 
+    def _stream_params(self, messages):
+        return dict(model=self.model_name, temperature=self.temperature, messages=messages, stream=True)
+
+    def _record_stream(self, start: float, first_token: float, chunks: int):
+        end = time.perf_counter()
+        self.stream_stats = {
+            "ttft": first_token - start if first_token is not None else None,
+            "total": end - start,
+            "chunks": chunks,
+        }
+        ttft = f"{self.stream_stats['ttft']:.2f}s" if first_token is not None else "n/a"
+        logger.info(f"{self.model_name} stream: first token after {ttft}, {chunks} chunks in {end - start:.2f}s")
+
+    def stream_chat_completions(self, messages) -> Iterator[str]:
+        """Yield the answer's text as it arrives; timings end up in self.stream_stats."""
+        start, first_token, chunks = time.perf_counter(), None, 0
+        try:
+            for chunk in self.client.chat.completions.create(**self._stream_params(messages)):
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    if first_token is None:
+                        first_token = time.perf_counter()
+                    chunks += 1
+                    yield delta
+        finally:
+            self._record_stream(start, first_token, chunks)
+
+    async def astream_chat_completions(self, messages) -> AsyncIterator[str]:
+        """Async stream_chat_completions on the shared async client."""
+        client = LLM_CLIENTS.openai(self.client.api_key or os.environ["OPENAI_API_KEY"])
+        start, first_token, chunks = time.perf_counter(), None, 0
+        try:
+            async for chunk in await client.chat.completions.create(**self._stream_params(messages)):
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    if first_token is None:
+                        first_token = time.perf_counter()
+                    chunks += 1
+                    yield delta
+        finally:
+            self._record_stream(start, first_token, chunks)
+
 
 
 class KnowledgeBase:
@@ -129,6 +180,27 @@ class KnowledgeBase:
         pipeline = TechnicalAnalysisPipeline(currency_pair=self.currency_pair, interval=interval, size=size, analysis_types=analysis_types)
         result = await pipeline.run()
         return result, pipeline.charts_data
+
+    async def create_news_and_sentiment(self, k: int = 5):
+        """Run the news and risk sentiment pipelines locally; the sentiment agent reads the news synthesis."""
+        news_synthesis = await NewsPipeline(currency_pair=self.currency_pair, k=k).arun()
+        risk_sentiment = await RiskSentimentPipeline(currency_pair=self.currency_pair).arun(basemodel_to_md_str(news_synthesis))
+        return news_synthesis, risk_sentiment
+
+    async def create_all_synthesis(self, k: int = 5):
+        """News, risk sentiment and technical analysis computed here instead of fetched, concurrently in one loop."""
+        # browsers launch while the technical data downloads
+        DRIVER_POOL.warm()
+        (news_synthesis, risk_sentiment), (technical_analysis, charts_data) = await asyncio.gather(
+            self.create_news_and_sentiment(k),
+            self.create_technical_analysis(),
+        )
+        return {
+            "News Analysis": basemodel_to_md_str(news_synthesis),
+            "Risk Sentiment": basemodel_to_md_str(risk_sentiment),
+            "Technical Analysis": technical_analysis,
+            "Charts data": charts_data
+        }
     
     @time_it
     async def get_all_synthesis(self):
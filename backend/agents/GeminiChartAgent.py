@@ -1,10 +1,12 @@
 from abc import ABC, abstractmethod
 import os
 from backend.utils.llm_helper import GeminiClient
+from backend.utils.llm_cache import LLM_CACHE
+from backend.utils.llm_executor import LLM_EXECUTOR, HedgePolicy, LLMCallError, LLMResult
 
 class GeminiChartAgent(ABC):
 
-    def __init__(self, chart_path: str = None, chart_data = None, interval: str = None, gemini_model: str = None, gemini_api_key: str = None, generation_config: dict = None, user_message: str = None):
+    def __init__(self, chart_path: str = None, chart_data = None, interval: str = None, gemini_model: str = None, gemini_api_key: str = None, generation_config: dict = None, user_message: str = None, hedge: HedgePolicy = None):
         self.gemini_model = gemini_model if gemini_model is not None else "gemini-2.5-flash-preview-05-20"
 
         self.gemini_api_key = gemini_api_key if gemini_api_key is not None else os.environ["GEMINI_API_KEY_XIFAN"]
@@ -28,42 +30,65 @@ class GeminiChartAgent(ABC):
 
         self.user_message = user_message if user_message is not None else "The chart is provided. Please start your analysis."
 
+        # opt-in: duplicate slow calls to the policy's fallback models or keys
+        self.hedge = hedge
+
+        # LLMResult of the last failed run; None after a success
+        self.error = None
+
     @property
     @abstractmethod
     def system_message(self):
         """Return the custom system message for the agent."""
         pass
 
-    async def run(self):
-        client = GeminiClient(
-            model_name=self.gemini_model,
-            generation_config=self.generation_config,
-            api_key=self.gemini_api_key,
-            system_instruction=self.system_message
+    def _client(self, model: str = None, api_key: str = None) -> GeminiClient:
+        # a thin wrapper: the underlying genai client is shared through LLM_CLIENTS
+        return GeminiClient(
+            model_name=model or self.gemini_model,
+            generation_config=dict(self.generation_config),
+            api_key=api_key or self.gemini_api_key,
+            system_instruction=self.system_message,
+            agent=type(self).__name__,
+            # a refresh that sends the same chart and context gets the earlier analysis back
+            cache=LLM_CACHE,
+            cache_sampled=True,
         )
+
+    async def _call(self, call_site: str, request):
+        """Run `request(client)` on the primary client, hedged over the fallbacks when a policy is set."""
+        if self.hedge is None or not self.hedge.fallbacks:
+            return await request(self._client())
+        clients = [self._client()] + [self._client(fallback.model, fallback.api_key) for fallback in self.hedge.fallbacks]
+        return await LLM_EXECUTOR.hedge("gemini", call_site, [lambda client=client: request(client) for client in clients], self.hedge)
+
+    async def run(self):
         try:
-            response, _ = await client.call_gemini_vision_api(
+            response, _ = await self._call("gemini_vision", lambda client: client.call_gemini_vision_api(
                 user_message=self.user_message,
                 image_path=self.chart_path,
                 image_data=self.chart_data,
-            )
+            ))
+            self.error = None
             return response
         except Exception as e:
-            print(f"Error in analyzing chart: {e}")
+            self._fail("gemini_vision", e)
             return None
 
+    def _fail(self, call_site: str, error: Exception):
+        if isinstance(error, LLMCallError):
+            self.error = error.result
+        else:
+            self.error = LLMResult("gemini", call_site, ok=False, error=str(error), error_type=type(error).__name__)
+        print(f"Error in analyzing chart: {error}")
+
     async def run_text(self):
-        client = GeminiClient(
-            model_name=self.gemini_model,
-            generation_config=self.generation_config,
-            api_key=self.gemini_api_key,
-            system_instruction=self.system_message
-        )
         try:
-            response, _ = await client.call_gemini_api(
+            response, _ = await self._call("gemini_text", lambda client: client.call_gemini_api(
                 user_message=self.user_message,
-            )
+            ))
+            self.error = None
             return response
         except Exception as e:
-            print(f"Error in analyzing chart: {e}")
+            self._fail("gemini_text", e)
             return None
\ No newline at end of file
@@ -2,6 +2,7 @@
 from backend.utils.llm_helper import Config
 from typing import List, Dict
 from backend.utils.llm_helper import OpenAIClient
+from backend.utils.llm_cache import LLM_CACHE
 import asyncio
 
 class SummaryAgent:
@@ -20,24 +21,22 @@ Be **concise** and focus on the most impactful information.
 
     def __init__(self, currency_pair: str, model_name: str = "gpt-4.1-mini-2025-04-14", temperature: float = 0.2):
         self.currency_pair = currency_pair
-        self.openai_client = OpenAIClient(model=model_name, temperature=temperature)
+        # the same article is summarized once per TTL, whichever refresh fetches it
+        self.openai_client = OpenAIClient(model=model_name, temperature=temperature, agent=type(self).__name__,
+                                          cache=LLM_CACHE, cache_sampled=True)
     
-    async def summarize_news(self, news: List[Dict[str, str]]) -> List[Dict[str, str]]:
-
-
+    async def summarize_article(self, article: Dict[str, str]) -> str:
         system_message = self.summarize_system_template.format(currency_pair=self.currency_pair)
+        return await self.openai_client.chat_completion(
+            messages = [
+                {"role": "system", "content": system_message},
+                {"role": "user", "content": article["content"]}
+            ]
+        )
+
+    async def summarize_news(self, news: List[Dict[str, str]]) -> List[Dict[str, str]]:
 
-        tasks = {
-            news_dict["url"]: self.openai_client.chat_completion(
-                messages = [
-                    {"role": "system", "content": system_message},
-                    {"role": "user", "content": news_dict["content"]}
-                ]
-            )
-            for news_dict in news
-        }
-
-        responses = await asyncio.gather(*tasks.values())
+        responses = await asyncio.gather(*[self.summarize_article(news_dict) for news_dict in news])
 
         for nd, summary in zip(news, responses):
             nd["summary"] = summary
@@ -20,7 +20,7 @@ Your goal is to synthesize these individual extractions into a cohesive summary
     def __init__(self, currency_pair: str, model_name: str = "gpt-4.1-mini-2025-04-14", temperature: float = 0.2):
 
         self.currency_pair = currency_pair
-        self.openai_client = OpenAIClient(model=model_name, temperature=temperature)
+        self.openai_client = OpenAIClient(model=model_name, temperature=temperature, agent=type(self).__name__)
     
     def _format_summaries(self, news: List[Dict[str, str]]) -> str:
         formatted_summaries = []
@@ -38,9 +38,12 @@ class RiskSentimentAgent:
 
     def __init__(self, currency_pair: str, model_name: str = "gpt-4.1-mini-2025-04-14", temperature: float = 0.2):
         self.currency_pair = currency_pair
-        self.openai_client = OpenAIClient(model=model_name, temperature=temperature)
+        self.openai_client = OpenAIClient(model=model_name, temperature=temperature, agent=type(self).__name__)
     
     def analyze_risk_sentiment(self, assets_data: str, news_summary: str) -> RiskSentimentAnalysis:
+        return asyncio.run(self.aanalyze_risk_sentiment(assets_data=assets_data, news_summary=news_summary))
+
+    async def aanalyze_risk_sentiment(self, assets_data: str, news_summary: str) -> RiskSentimentAnalysis:
         user_prompt = f"""
          <assets data>
          {assets_data}
@@ -56,9 +59,9 @@ class RiskSentimentAgent:
             {"role": "user", "content": user_prompt}
         ]
 
-        analysis = asyncio.run(self.openai_client.structured_chat_completion(
+        analysis = await self.openai_client.structured_chat_completion(
             messages=messages,
             response_format=RiskSentimentAnalysis
-        ))
+        )
         
         return analysis
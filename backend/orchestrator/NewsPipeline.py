@@ -1,9 +1,12 @@
 from backend.service.TradingViewScrapper import TradingViewScrapper
+from backend.service.JinaAIScrapper import JinaAIScrapper
 from backend.agents.news.SummaryAgent import SummaryAgent
 from backend.agents.news.SynthesisAgent import SynthesisAgent, NewsSynthesis
-from typing import List, Dict
+from backend.utils.llm_metrics import LLM_METRICS
+from typing import List, Dict, Tuple
 import logging
 import asyncio
+import aiohttp
 
 # Logger setup
 logging.basicConfig(
@@ -14,20 +17,28 @@ logger = logging.getLogger(__name__)
 
 class NewsPipeline:
 
-    def __init__(self, currency_pair: str, k: int = 5, summary_model : str = "gpt-4.1-mini-2025-04-14", synthesis_model: str = "gpt-4.1-mini-2025-04-14", temperature: float = 0.2):
+    def __init__(self, currency_pair: str, k: int = 5, summary_model : str = "gpt-4.1-mini-2025-04-14", synthesis_model: str = "gpt-4.1-mini-2025-04-14", temperature: float = 0.2,
+                 spare_links: int = 2, queue_size: int = 4, synthesis_deadline: float = None):
         self.currency_pair = currency_pair
         self.k = k
         self.summary_model = summary_model
         self.synthesis_model = synthesis_model
         self.temperature = temperature
-    
-    def get_news(self) -> List[Dict]:
-        logger.info(f"Fetching news for {self.currency_pair}")
+        # streamed run: links fetched beyond k, so failed or empty articles are replaced
+        self.spare_links = spare_links
+        # fetched articles waiting for a summarizer; a full queue holds the fetchers back
+        self.queue_size = queue_size
+        # seconds after which synthesis starts with the summaries ready so far
+        self.synthesis_deadline = synthesis_deadline
+
+    def get_news_links(self) -> List[str]:
+        logger.info(f"Fetching news links for {self.currency_pair}")
         tv_scrapper = TradingViewScrapper(self.currency_pair)
 
         try:
             links = tv_scrapper.get_news_websites()
             logger.debug(f"News links fetched: {links}")
+            return links
         except Exception as e:
             logger.error(f"Error getting news websites: {e}")
             raise
@@ -35,8 +46,18 @@ class NewsPipeline:
             tv_scrapper.quit_driver()
             logger.info("Closed web driver")
 
+    async def aget_news_links(self) -> List[str]:
+        # Selenium blocks, so the browser work runs in a thread and other pipelines keep the loop
+        return await asyncio.to_thread(self.get_news_links)
+
+    def get_news(self) -> List[Dict]:
+        return asyncio.run(self.aget_news())
+
+    async def aget_news(self) -> List[Dict]:
+        links = await self.aget_news_links()
+
         try:
-            news = tv_scrapper.get_news(links, self.k)
+            news = await JinaAIScrapper().aget_multiple(links[:self.k])
             first_news_snapshot = news[0]["content"][:500]
             logger.info(f"Fetched {len(news)} news articles")
             logger.info(f"News 1: {first_news_snapshot}")
@@ -47,24 +68,100 @@ class NewsPipeline:
         return news
 
     def get_news_summary(self, news: List[Dict]) -> List[Dict]:
+        return asyncio.run(self.aget_news_summary(news))
+
+    async def aget_news_summary(self, news: List[Dict]) -> List[Dict]:
         logger.info("Summarizing news articles")
         summary_agent = SummaryAgent(currency_pair=self.currency_pair, model_name=self.summary_model, temperature=self.temperature)
-        summaries = asyncio.run(summary_agent.summarize_news(news))
+        summaries = await summary_agent.summarize_news(news)
         logger.debug(f"Summaries: {summaries}")
         return summaries
 
     def synthesize_summary(self, summaries: List[Dict]) -> NewsSynthesis:
+        return asyncio.run(self.asynthesize_summary(summaries))
+
+    async def asynthesize_summary(self, summaries: List[Dict]) -> NewsSynthesis:
         logger.info("Synthesizing summaries")
         synthesis_agent = SynthesisAgent(currency_pair=self.currency_pair, model_name=self.synthesis_model, temperature=self.temperature)
-        synthesis = asyncio.run(synthesis_agent.synthesize_summaries(summaries))
+        synthesis = await synthesis_agent.synthesize_summaries(summaries)
         logger.debug(f"Synthesis result: {synthesis}")
         return synthesis
 
+    async def astream_summaries(self, links: List[str]) -> List[Dict]:
+        """
+        Fetch and summarize articles as a stream: each article goes to a
+        summarizer as soon as its fetch completes, through a bounded queue.
+        Returns once k summaries are ready, every link is done, or the
+        synthesis deadline passes, cancelling the work still in flight.
+        """
+        scrapper = JinaAIScrapper()
+        summary_agent = SummaryAgent(currency_pair=self.currency_pair, model_name=self.summary_model, temperature=self.temperature)
+        articles: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        # (link index, article): summaries complete out of order
+        summaries: List[Tuple[int, Dict]] = []
+        enough = asyncio.Event()
+
+        async def fetch(session: aiohttp.ClientSession, index: int, url: str):
+            try:
+                content = await scrapper.aget(session, url)
+            except Exception as e:
+                logger.warning(f"Error fetching {url}: {e}")
+                return
+            if content.strip():
+                await articles.put((index, {"url": url, "content": content}))
+
+        async def summarize():
+            while True:
+                index, article = await articles.get()
+                try:
+                    article["summary"] = await summary_agent.summarize_article(article)
+                    summaries.append((index, article))
+                    logger.info(f"Summarized {article['url']} ({len(summaries)}/{self.k})")
+                    if len(summaries) >= self.k:
+                        enough.set()
+                except Exception as e:
+                    logger.warning(f"Error summarizing {article['url']}: {e}")
+                finally:
+                    articles.task_done()
+
+        async def drained():
+            await asyncio.gather(*fetchers)
+            await articles.join()
+
+        async with aiohttp.ClientSession() as session:
+            fetchers = [asyncio.ensure_future(fetch(session, index, url)) for index, url in enumerate(links[:self.k + self.spare_links])]
+            summarizers = [asyncio.ensure_future(summarize()) for _ in range(self.k)]
+            waiters = [asyncio.ensure_future(drained()), asyncio.ensure_future(enough.wait())]
+            try:
+                _, pending = await asyncio.wait(waiters, timeout=self.synthesis_deadline, return_when=asyncio.FIRST_COMPLETED)
+                if len(pending) == len(waiters):
+                    logger.warning(f"Synthesis deadline reached with {len(summaries)}/{self.k} summaries")
+            finally:
+                for task in fetchers + summarizers + waiters:
+                    task.cancel()
+                await asyncio.gather(*fetchers, *summarizers, *waiters, return_exceptions=True)
+
+        if not summaries:
+            raise RuntimeError(f"No news article for {self.currency_pair} could be fetched and summarized")
+        # keep the ranking of the links, not the order the summaries finished in
+        summaries.sort(key=lambda item: item[0])
+        return [article for _, article in summaries[:self.k]]
+
+    async def astream(self, links: List[str]) -> NewsSynthesis:
+        with LLM_METRICS.stage("summary"):
+            summaries = await self.astream_summaries(links)
+        logger.debug(f"Summaries: {summaries}")
+        with LLM_METRICS.stage("synthesis"):
+            return await self.asynthesize_summary(summaries)
+
     def run(self) -> NewsSynthesis:
+        return asyncio.run(self.arun())
+
+    async def arun(self) -> NewsSynthesis:
         try:
-            news = self.get_news()
-            summaries = self.get_news_summary(news)
-            synthesis = self.synthesize_summary(summaries)
+            with LLM_METRICS.run("NewsPipeline", currency_pair=self.currency_pair, k=self.k):
+                links = await self.aget_news_links()
+                synthesis = await self.astream(links)
             logger.info("Pipeline completed successfully")
             return synthesis
         except Exception as e:
@@ -1,6 +1,8 @@
+import asyncio
 from backend.service.InvestingScrapper import InvestingScrapper
 from backend.agents.sentiment.RiskSentimentAgent import RiskSentimentAgent, RiskSentimentAnalysis
 from backend.utils.logger_config import get_logger
+from backend.utils.llm_metrics import LLM_METRICS
 
 logger = get_logger(__name__)
 
@@ -11,19 +13,30 @@ class RiskSentimentPipeline:
         self.temperature = temperature
     
     def get_assets_data(self) -> str:
-        scrapper = InvestingScrapper(self.currency_pair)
-        return scrapper.get_all_assets()
+        # the browser goes back to the pool even when scraping fails
+        with InvestingScrapper(self.currency_pair) as scrapper:
+            return scrapper.get_all_assets()
 
     def analyze_sentiment(self, assets_data: str, news_summary: str) -> RiskSentimentAnalysis:
         agent = RiskSentimentAgent(currency_pair=self.currency_pair, model_name=self.model_name, temperature=self.temperature)
         analysis = agent.analyze_risk_sentiment(assets_data=assets_data, news_summary=news_summary)
         return analysis
-    
+
+    async def aanalyze_sentiment(self, assets_data: str, news_summary: str) -> RiskSentimentAnalysis:
+        agent = RiskSentimentAgent(currency_pair=self.currency_pair, model_name=self.model_name, temperature=self.temperature)
+        return await agent.aanalyze_risk_sentiment(assets_data=assets_data, news_summary=news_summary)
+
     def run(self, news_summary: str) -> RiskSentimentAnalysis:
+        return asyncio.run(self.arun(news_summary))
+
+    async def arun(self, news_summary: str) -> RiskSentimentAnalysis:
         logger.info("Running Risk Sentiment Pipeline")
-        assets_data = self.get_assets_data()
-        logger.info("Assets data fetched successfully")
-        analysis = self.analyze_sentiment(assets_data=assets_data, news_summary=news_summary)
+        with LLM_METRICS.run("RiskSentimentPipeline", currency_pair=self.currency_pair):
+            # Selenium blocks, so the browser work runs in a thread and other pipelines keep the loop
+            assets_data = await asyncio.to_thread(self.get_assets_data)
+            logger.info("Assets data fetched successfully")
+            with LLM_METRICS.stage("sentiment_analysis"):
+                analysis = await self.aanalyze_sentiment(assets_data=assets_data, news_summary=news_summary)
         logger.info("Sentiment analysis completed")
         return analysis
     
@@ -1,6 +1,6 @@
 from backend.orchestrator.TechnicalDataPipeline import TechnicalDataPipeline
 from backend.utils.technical_indicators import TechnicalIndicators
-from typing import List, Dict
+from typing import List, Dict, Optional
 import asyncio
 from backend.agents.technical_analysis.ATRAgent import ATRAgent
 from backend.agents.technical_analysis.MACDAgent import MACDAgent
@@ -8,31 +8,59 @@ from backend.agents.technical_analysis.MAAgent import MAAgent
 from backend.agents.technical_analysis.RSIAgent import RSIAgent
 from backend.agents.technical_analysis.AggAgent import AggAgent
 from backend.utils.parameters import DECIMAL_PLACES
+from backend.utils.llm_metrics import LLM_METRICS
+from backend.utils.llm_executor import HedgePolicy
+from backend.utils.logger_config import get_logger
+
+logger = get_logger(__name__)
 
 class TechnicalAnalysisPipeline:
-    def __init__(self, currency_pair: str, interval: str, size: int, analysis_types: List[str], data_source: str = "TwelveData"):
+    def __init__(self, currency_pair: str, interval: str, size: int, analysis_types: List[str], data_source: str = "TwelveData", image_profile: str = "full",
+                 hedge: HedgePolicy = None, stage_deadlines: Optional[Dict[str, float]] = None):
         self.currency_pair = currency_pair
         self.decimal_places = DECIMAL_PLACES.get(currency_pair, 4)  
         self.interval = interval
         self.size = size
         self.analysis_types = analysis_types
         self.data_source = data_source
+        # output profile of the charts sent to the vision agents, see backend.utils.chart_profiles
+        self.image_profile = image_profile
+        # opt-in hedging of the Gemini calls of every agent, see LLMExecutor.hedge
+        self.hedge = hedge
+        # seconds per stage ("individual_analysis", "aggregate_analysis") after which it returns what it has
+        self.stage_deadlines = stage_deadlines or {}
     
     def prepare_technical_data(self) -> Dict[str, bytes]:
         data_pipeline = TechnicalDataPipeline(self.currency_pair, self.interval)
 
-        self.df = data_pipeline.prepare_data(data_source=self.data_source)
+        self.df = data_pipeline.prepare_data(data_source=self.data_source, analysis_types=self.analysis_types)
 
-        charts_data = {}
+        self.prepare_charts(data_pipeline)
 
-        for analysis_type in self.analysis_types:
-            binary_data = data_pipeline.prepare_chart(self.df, self.size, analysis_type)
-            charts_data[analysis_type] = binary_data
-        
-        charts_data["normal"] = data_pipeline.prepare_chart(self.df, 100, "normal")
+    async def aprepare_technical_data(self) -> Dict[str, bytes]:
+        data_pipeline = TechnicalDataPipeline(self.currency_pair, self.interval)
+
+        # the download no longer blocks the event loop, so it overlaps with other pipelines' calls
+        self.df = await data_pipeline.aprepare_data(data_source=self.data_source, analysis_types=self.analysis_types)
+
+        await self.aprepare_charts(data_pipeline)
+
+    def prepare_charts(self, data_pipeline: TechnicalDataPipeline):
+        # one render of the price chart and every panel, cut per analysis type
+        charts_data = data_pipeline.prepare_charts(self.df, self.size, self.analysis_types, profile=self.image_profile)
+
+        charts_data["normal"] = data_pipeline.prepare_chart(self.df, 100, "normal", profile=self.image_profile)
 
         self.charts_data = charts_data
 
+    async def aprepare_charts(self, data_pipeline: TechnicalDataPipeline):
+        # the composite and the 100-bar "normal" chart render concurrently in the chart process pool
+        charts_data, normal = await asyncio.gather(
+            data_pipeline.aprepare_charts(self.df, self.size, self.analysis_types, profile=self.image_profile),
+            data_pipeline.aprepare_chart(self.df, 100, "normal", profile=self.image_profile),
+        )
+        charts_data["normal"] = normal
+        self.charts_data = charts_data
 
     async def create_individual_analysis(self) -> Dict[str, str]:
         coroutines = {}
@@ -45,26 +73,38 @@ class TechnicalAnalysisPipeline:
             if analysis_type == "ema":
                 user_message = user_message_template.format(context=TechnicalIndicators.get_ma_context(self.df, self.decimal_places))
                 print(user_message)
-                agent = MAAgent(user_message=user_message, chart_data=chart_data, interval=self.interval)
+                agent = MAAgent(user_message=user_message, chart_data=chart_data, interval=self.interval, hedge=self.hedge)
             
             if analysis_type == "macd":
                 user_message = user_message_template.format(context=TechnicalIndicators.get_macd_context(self.df, self.decimal_places))
                 print(user_message)
-                agent = MACDAgent(user_message=user_message, chart_data=chart_data, interval=self.interval)
+                agent = MACDAgent(user_message=user_message, chart_data=chart_data, interval=self.interval, hedge=self.hedge)
      
             if analysis_type == "atr":
                 user_message = user_message_template.format(context=TechnicalIndicators.get_atr_context(self.df, self.decimal_places))
-                agent = ATRAgent(user_message=user_message, chart_data=chart_data, interval=self.interval)
+                agent = ATRAgent(user_message=user_message, chart_data=chart_data, interval=self.interval, hedge=self.hedge)
             
             if analysis_type == "rsi":
                 user_message = user_message_template.format(context=TechnicalIndicators.get_rsi_context(self.df, self.decimal_places))
-                agent = RSIAgent(user_message=user_message, chart_data=chart_data, interval=self.interval)
+                agent = RSIAgent(user_message=user_message, chart_data=chart_data, interval=self.interval, hedge=self.hedge)
 
             coroutines[analysis_type] = agent.run()
 
-        analysis = await asyncio.gather(*coroutines.values())
-        
-        analysis_dict = dict(zip(coroutines.keys(), analysis))
+        tasks = {analysis_type: asyncio.ensure_future(coroutine) for analysis_type, coroutine in coroutines.items()}
+        pending = set()
+        if tasks:
+            _, pending = await asyncio.wait(tasks.values(), timeout=self.stage_deadlines.get("individual_analysis"))
+        for task in pending:
+            task.cancel()
+        # let the cancelled agents unwind before their results are read
+        await asyncio.gather(*pending, return_exceptions=True)
+
+        # past the deadline, the aggregator gets the analyses that made it; late ones count as failed
+        analysis_dict = {}
+        for analysis_type, task in tasks.items():
+            if task in pending:
+                logger.warning(f"{analysis_type} analysis missed the stage deadline; aggregating without it")
+            analysis_dict[analysis_type] = None if task in pending else task.result()
 
         return analysis_dict
     
@@ -72,6 +112,9 @@ class TechnicalAnalysisPipeline:
         formatted_analysis = ""
 
         for indicator, analysis in analysis_dict.items():
+            if analysis is None:
+                # the agent failed after retries; aggregate what the others produced
+                continue
             formatted_analysis += f"<{indicator} analysis> \n{analysis}\n</{indicator} analysis> \n\n"
         
         return formatted_analysis
@@ -79,18 +122,27 @@ class TechnicalAnalysisPipeline:
     async def aggregate_analysis(self, formatted_analysis: str):
         agent = AggAgent(
             gemini_model="gemini-2.5-flash-preview-05-20",
-            user_message=formatted_analysis
+            user_message=formatted_analysis,
+            hedge=self.hedge
         )
-        agg_analysis = await agent.run_text()
-        return agg_analysis
+        try:
+            return await asyncio.wait_for(agent.run_text(), timeout=self.stage_deadlines.get("aggregate_analysis"))
+        except asyncio.TimeoutError:
+            logger.warning("Aggregate analysis missed the stage deadline")
+            return None
     
     async def run(self):
-        self.prepare_technical_data()
-        individual_analysis = await self.create_individual_analysis()
-        formatted_analysis = self.format_individual_analysis(individual_analysis)
-        print(formatted_analysis)
-        agg_analysis = await self.aggregate_analysis(formatted_analysis)
-        return agg_analysis
+        with LLM_METRICS.run("TechnicalAnalysisPipeline", currency_pair=self.currency_pair, interval=self.interval,
+                             analysis_types=self.analysis_types):
+            with LLM_METRICS.stage("technical_data"):
+                await self.aprepare_technical_data()
+            with LLM_METRICS.stage("individual_analysis"):
+                individual_analysis = await self.create_individual_analysis()
+            formatted_analysis = self.format_individual_analysis(individual_analysis)
+            print(formatted_analysis)
+            with LLM_METRICS.stage("aggregate_analysis"):
+                agg_analysis = await self.aggregate_analysis(formatted_analysis)
+            return agg_analysis
     
 
 
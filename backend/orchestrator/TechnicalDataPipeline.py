@@ -1,24 +1,74 @@
 from backend.service.TwelveData import TwelveData
+from backend.service.BarStore import BAR_STORE
+from backend.service.AsyncTwelveData import AsyncTwelveData, TD_CLIENT
 #from backend.service.IBKRData import IBKRData
 from backend.utils.technical_indicators import TechnicalIndicators
+from backend.utils.incremental_indicators import INDICATOR_ENGINE
+from backend.utils.batch_indicators import BatchIndicators
 from backend.utils.technical_charts import TechnicalCharts
+from backend.utils.chart_renderer import ChartRenderer
 from backend.agents.technical_analysis import ATRAgent, MAAgent, MACDAgent, RSIAgent
-from typing import List, Dict, Any, Literal
+from typing import List, Dict, Any, Literal, Tuple
 import pandas as pd
+import asyncio
+
+# plot_chart flags of the chart each analysis type is given
+CHART_FLAGS = {
+    "ema": dict(EMA20=True, EMA50=True, EMA100=True),
+    "rsi": dict(RSI14=True),
+    "macd": dict(MACD=True),
+    "atr": dict(ATR14=True),
+    "normal": dict(),
+}
+
+# indicator panels stacked under the price chart in each analysis type's crop of the composite chart
+EXPORT_PANELS = {
+    "ema": (),
+    "rsi": ("RSI",),
+    "macd": ("MACD",),
+    "atr": ("ATR",),
+}
+
+# analysis types whose crop keeps the EMA lines and legend on the price chart
+EXPORT_OVERLAYS = ("ema",)
 
 class TechnicalDataPipeline:
-    def __init__(self, currency_pair: str, interval: str):
+    def __init__(self, currency_pair: str, interval: str, incremental: bool = True, use_store: bool = True, resample_from: str = None):
         self.currecy_pair = currency_pair
         self.interval = interval
+        self.incremental = incremental
+        self.use_store = use_store
+        self.resample_from = resample_from
 
     def get_data_from_td(self, **kwargs) -> pd.DataFrame:
+        if self.use_store and not kwargs.get("start_date") and not kwargs.get("end_date"):
+            if self.resample_from and self.interval != self.resample_from:
+                data = self.get_resampled_data(**kwargs)
+                if data is not None:
+                    return data
+            # latest bars: only the ones after the last stored bar are downloaded
+            return BAR_STORE.sync(self.currecy_pair, self.interval, **kwargs)
         td = TwelveData(
             currency_pair=self.currecy_pair,
             interval=self.interval,
             **kwargs
         )
         return td.get_data()
-    
+
+    def get_resampled_data(self, outputsize: int = 400, exchange: str = "OANDA", max_age: float = 30) -> pd.DataFrame:
+        """
+        Derive the interval from the stored `resample_from` series, so all intervals of a pair share one fetch.
+        The source is backfilled once to the depth `outputsize` bars need; intervals that would need
+        more than MAX_RESAMPLE_DEPTH source bars, or a history that ends too early, return None.
+        """
+        depth = BAR_STORE.resample_depth(self.interval, outputsize, self.resample_from)
+        if depth > BAR_STORE.MAX_RESAMPLE_DEPTH:
+            return None
+        BAR_STORE.sync(self.currecy_pair, self.resample_from, outputsize=BAR_STORE.MAX_FETCH_SIZE, exchange=exchange, max_age=max_age)
+        if BAR_STORE.count(self.currecy_pair, self.resample_from) < depth:
+            BAR_STORE.backfill(self.currecy_pair, self.resample_from, depth, exchange=exchange)
+        return BAR_STORE.resample(self.currecy_pair, self.interval, size=outputsize, source_interval=self.resample_from)
+
     # def get_data_from_ibkr(self) -> pd.DataFrame:
     #     ibkr = IBKRData(
     #         currency_pair=self.currecy_pair,
@@ -26,11 +76,16 @@ class TechnicalDataPipeline:
     #     )
     #     return ibkr.get_data()
     
-    def get_technical_indicators(self, data: pd.DataFrame) -> pd.DataFrame:
+    def get_technical_indicators(self, data: pd.DataFrame, analysis_types: List[str] = None) -> pd.DataFrame:
+        if self.incremental:
+            # same values as the batch function; only the bars added since the last refresh are
+            # computed while the window keeps its first bar, and only for the requested analyses
+            return INDICATOR_ENGINE.sync(self.currecy_pair, self.interval, data, analysis_types=analysis_types)
         ti = TechnicalIndicators()
-        return ti.calculate_technical_indicators(data)
+        # a full recompute only pays for the indicators the requested analyses read
+        return ti.calculate_technical_indicators(data, analysis_types=analysis_types)
     
-    def prepare_data(self, data_source: Literal["TwelveData", "IBKR"], **kwargs) -> pd.DataFrame:
+    def prepare_data(self, data_source: Literal["TwelveData", "IBKR"], analysis_types: List[str] = None, **kwargs) -> pd.DataFrame:
         if data_source == "TwelveData":
             data = self.get_data_from_td(**kwargs)
         # elif data_source == "IBKR":
@@ -41,30 +96,108 @@ class TechnicalDataPipeline:
         if data is None or data.empty:
             raise ValueError("No data returned from the source.")
         
-        return self.get_technical_indicators(data)  
+        return self.get_technical_indicators(data, analysis_types)  
+
+    async def aget_data_from_td(self, client: AsyncTwelveData = None, **kwargs) -> pd.DataFrame:
+        client = client if client is not None else TD_CLIENT
+        if self.use_store and not kwargs.get("start_date") and not kwargs.get("end_date"):
+            outputsize = kwargs.get("outputsize", 400)
+            depth = BAR_STORE.resample_depth(self.interval, outputsize, self.resample_from) if self.resample_from else 0
+            if self.resample_from and self.interval != self.resample_from and depth <= BAR_STORE.MAX_RESAMPLE_DEPTH:
+                exchange = kwargs.get("exchange", "OANDA")
+                await BAR_STORE.async_sync(self.currecy_pair, self.resample_from, client, outputsize=BAR_STORE.MAX_FETCH_SIZE,
+                                           exchange=exchange, max_age=kwargs.get("max_age", 30))
+                if BAR_STORE.count(self.currecy_pair, self.resample_from) < depth:
+                    # paging back is a one-off per pair; keep it off the loop
+                    await asyncio.to_thread(BAR_STORE.backfill, self.currecy_pair, self.resample_from, depth, exchange)
+                data = BAR_STORE.resample(self.currecy_pair, self.interval, size=outputsize, source_interval=self.resample_from)
+                if data is not None:
+                    return data
+            return await BAR_STORE.async_sync(self.currecy_pair, self.interval, client, **kwargs)
+        frames = await client.get_frames([self.currecy_pair], [self.interval], **kwargs)
+        return frames.get((self.currecy_pair, self.interval))
+
+    async def aprepare_data(self, data_source: Literal["TwelveData", "IBKR"], analysis_types: List[str] = None, client: AsyncTwelveData = None, **kwargs) -> pd.DataFrame:
+        """Non-blocking prepare_data: the download runs on the pooled async client."""
+        if data_source == "TwelveData":
+            data = await self.aget_data_from_td(client, **kwargs)
+        else:
+            raise ValueError("Invalid data source. Choose 'TwelveData' or 'IBKR'.")
+
+        if data is None or data.empty:
+            raise ValueError("No data returned from the source.")
+
+        return self.get_technical_indicators(data, analysis_types)
+
+    @staticmethod
+    def prepare_data_batch(currency_pairs: List[str], intervals: List[str], data_source: Literal["TwelveData", "IBKR"] = "TwelveData", resample_from: str = None, **kwargs) -> Dict[Tuple[str, str], pd.DataFrame]:
+        """Fetch every (pair, interval) and compute all indicator sets in one stacked NumPy pass."""
+        frames = {}
+        for currency_pair in currency_pairs:
+            for interval in intervals:
+                pipeline = TechnicalDataPipeline(currency_pair, interval, resample_from=resample_from)
+                if data_source == "TwelveData":
+                    data = pipeline.get_data_from_td(**kwargs)
+                else:
+                    raise ValueError("Invalid data source. Choose 'TwelveData' or 'IBKR'.")
+
+                if data is None or data.empty:
+                    raise ValueError(f"No data returned from the source for {currency_pair} {interval}.")
+                frames[(currency_pair, interval)] = data
+
+        return BatchIndicators.calculate_frames(frames)
     
-    def prepare_chart(self, df: pd.DataFrame, size: int, analysis_type: Literal["ema", "rsi", "macd", "atr"]):
+    def _chart(self, df: pd.DataFrame, size: int, analysis_type: str, profile="full") -> Tuple[TechnicalCharts, Dict[str, bool]]:
+        if analysis_type not in CHART_FLAGS:
+            raise ValueError("Invalid analysis type. Choose 'ema', 'rsi', 'macd', or 'atr'.")
         chart_name = f"{self.interval}_{analysis_type}"
         chart = TechnicalCharts(
             currency_pair=self.currecy_pair,
             interval=self.interval,
             df=df,
             size=size,
-            chart_name=chart_name
+            chart_name=chart_name,
+            profile=profile
         )
-        if analysis_type == "ema":
-            _, binary_data = chart.plot_chart(EMA20=True, EMA50=True, EMA100=True)
-        elif analysis_type == "rsi":
-            _, binary_data = chart.plot_chart(RSI14=True)
-        elif analysis_type == "macd":
-            _, binary_data = chart.plot_chart(MACD=True)
-        elif analysis_type == "atr":
-            _, binary_data = chart.plot_chart(ATR14=True)
-        elif analysis_type == "normal":
-            _, binary_data = chart.plot_chart()
-        else:
-            raise ValueError("Invalid analysis type. Choose 'ema', 'rsi', 'macd', or 'atr'.")
-        
+        return chart, CHART_FLAGS[analysis_type]
+
+    def prepare_chart(self, df: pd.DataFrame, size: int, analysis_type: Literal["ema", "rsi", "macd", "atr"], profile="full"):
+        chart, flags = self._chart(df, size, analysis_type, profile)
+        _, binary_data = chart.plot_chart(**flags)
+        return binary_data
+
+    def _panel_chart(self, df: pd.DataFrame, size: int, analysis_types: List[str], profile="full"):
+        invalid = [analysis_type for analysis_type in analysis_types if analysis_type not in EXPORT_PANELS]
+        if invalid:
+            raise ValueError(f"Invalid analysis types {invalid}. Choose 'ema', 'rsi', 'macd', or 'atr'.")
+        chart = TechnicalCharts(
+            currency_pair=self.currecy_pair,
+            interval=self.interval,
+            df=df,
+            size=size,
+            chart_name=f"{self.interval}_composite",
+            profile=profile
+        )
+        flags = {flag: True for analysis_type in analysis_types for flag in CHART_FLAGS[analysis_type]}
+        exports = {analysis_type: EXPORT_PANELS[analysis_type] for analysis_type in analysis_types}
+        return chart, flags, exports
+
+    def prepare_charts(self, df: pd.DataFrame, size: int, analysis_types: List[str], profile="full") -> Dict[str, bytes]:
+        """The chart of every analysis type, cut from a single render of the price chart and all their panels."""
+        chart, flags, exports = self._panel_chart(df, size, analysis_types, profile)
+        _, charts = chart.plot_panels(exports, overlays=EXPORT_OVERLAYS, **flags)
+        return charts
+
+    async def aprepare_charts(self, df: pd.DataFrame, size: int, analysis_types: List[str], renderer: ChartRenderer = None, profile="full") -> Dict[str, bytes]:
+        """Non-blocking prepare_charts: the composite renders in the process pool."""
+        chart, flags, exports = self._panel_chart(df, size, analysis_types, profile)
+        _, charts = await chart.aplot_panels(exports, overlays=EXPORT_OVERLAYS, renderer=renderer, **flags)
+        return charts
+
+    async def aprepare_chart(self, df: pd.DataFrame, size: int, analysis_type: Literal["ema", "rsi", "macd", "atr"], renderer: ChartRenderer = None, profile="full"):
+        """Non-blocking prepare_chart: the chart renders in the process pool while the event loop keeps running."""
+        chart, flags = self._chart(df, size, analysis_type, profile)
+        _, binary_data = await chart.aplot_chart(renderer=renderer, **flags)
         return binary_data
 
 
@@ -0,0 +1,162 @@
+import asyncio
+import os
+import aiohttp
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Tuple
+from backend.utils.logger_config import get_logger
+from backend.utils.rate_limiter import RATE_LIMITER, PRIORITY_LIVE
+
+logger = get_logger(__name__)
+
+
+class AsyncTwelveData:
+    """
+    Async TwelveData time-series client with one pooled HTTP session per event loop.
+
+    Symbols sharing an interval are fetched in a single comma-joined request,
+    intervals run concurrently up to `max_concurrency` requests in flight, and
+    responses are parsed straight into preallocated float64 arrays. Every
+    request takes one API credit per symbol from the shared rate limiter.
+    """
+
+    BASE_URL = "https://api.twelvedata.com/time_series"
+    COLUMNS = ["Open", "High", "Low", "Close"]
+
+    def __init__(self, api_key: str = None, max_concurrency: int = 4, timeout: float = 30, priority: int = PRIORITY_LIVE):
+        self.api_key = api_key
+        self.priority = priority
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self._sessions: Dict[asyncio.AbstractEventLoop, Tuple[aiohttp.ClientSession, asyncio.Semaphore]] = {}
+
+    def _get_api_key(self) -> str:
+        api_key = self.api_key or os.getenv("TD_API_KEY", None)
+        if not api_key:
+            raise ValueError("API key for TwelveData is not set in environment variables.")
+        return api_key
+
+    def _get_session(self) -> Tuple[aiohttp.ClientSession, asyncio.Semaphore]:
+        loop = asyncio.get_running_loop()
+        # sessions are bound to their event loop (e.g. one asyncio.run per Streamlit rerun), so keep one per loop
+        entry = self._sessions.get(loop)
+        if entry is None or entry[0].closed:
+            for other in [other for other in self._sessions if other.is_closed()]:
+                del self._sessions[other]
+            session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                connector=aiohttp.TCPConnector(limit=self.max_concurrency, keepalive_timeout=60),
+            )
+            entry = (session, asyncio.Semaphore(self.max_concurrency))
+            self._sessions[loop] = entry
+            loop.create_task(self._close_at_shutdown(loop, session))
+        return entry
+
+    async def _close_at_shutdown(self, loop: asyncio.AbstractEventLoop, session: aiohttp.ClientSession):
+        """Park until the loop cancels its remaining tasks (asyncio.run does on exit), then close the session on it."""
+        try:
+            await loop.create_future()
+        finally:
+            if self._sessions.get(loop, (None,))[0] is session:
+                del self._sessions[loop]
+            if not session.closed:
+                await session.close()
+
+    async def close(self):
+        entry = self._sessions.pop(asyncio.get_running_loop(), None)
+        if entry is not None and not entry[0].closed:
+            await entry[0].close()
+
+    async def __aenter__(self):
+        self._get_session()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    @staticmethod
+    def parse_values(values: List[Dict]) -> Tuple[np.ndarray, np.ndarray]:
+        """Convert the newest-first `values` list into (datetime64[ns] timestamps, (n, 4) float64 OHLC), oldest first."""
+        n = len(values)
+        timestamps = np.empty(n, dtype="datetime64[ns]")
+        ohlc = np.empty((n, 4), dtype=np.float64)
+        for i, value in enumerate(reversed(values)):
+            timestamps[i] = np.datetime64(value["datetime"].replace(" ", "T"))
+            ohlc[i, 0] = float(value["open"])
+            ohlc[i, 1] = float(value["high"])
+            ohlc[i, 2] = float(value["low"])
+            ohlc[i, 3] = float(value["close"])
+        return timestamps, ohlc
+
+    async def fetch(self, symbols: List[str], interval: str, outputsize: int = 400, exchange: str = "OANDA",
+                    start_date: str = None, end_date: str = None) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+        """One request for all `symbols` of an interval; symbols that fail are logged and left out."""
+        api_key = self._get_api_key()
+        batch = int(RATE_LIMITER.max_cost("twelvedata", key=api_key))
+        if len(symbols) > batch:
+            # a request costs a credit per symbol and may not cost more than the key's quota
+            parts = await asyncio.gather(*(
+                self.fetch(symbols[i:i + batch], interval, outputsize, exchange, start_date, end_date)
+                for i in range(0, len(symbols), batch)
+            ))
+            return {symbol: arrays for part in parts for symbol, arrays in part.items()}
+        params = {
+            "symbol": ",".join(symbols),
+            "interval": interval,
+            "outputsize": outputsize,
+            "exchange": exchange,
+            "apikey": api_key,
+        }
+        if start_date:
+            params["start_date"] = start_date
+        if end_date:
+            params["end_date"] = end_date
+
+        session, semaphore = self._get_session()
+        await RATE_LIMITER.acquire("twelvedata", key=api_key, cost=len(symbols), priority=self.priority)
+        async with semaphore:
+            async with session.get(self.BASE_URL, params=params) as response:
+                payload = await response.json(content_type=None)
+
+        # a rate-limit error is answered at the top level whatever the number of symbols
+        if payload.get("code") == 429:
+            RATE_LIMITER.drain("twelvedata", key=api_key)
+
+        # a single symbol is answered at the top level, several are keyed by symbol
+        if len(symbols) == 1:
+            payload = {symbols[0]: payload}
+
+        results = {}
+        for symbol in symbols:
+            data = payload.get(symbol, {})
+            if data.get("status") != "ok":
+                logger.error(f"Error fetching {symbol} {interval}: {data.get('message', data)}")
+                continue
+            results[symbol] = self.parse_values(data.get("values", []))
+        return results
+
+    async def fetch_many(self, symbols: List[str], intervals: List[str], **kwargs) -> Dict[Tuple[str, str], Tuple[np.ndarray, np.ndarray]]:
+        """All (symbol, interval) series: one multi-symbol request per interval, run concurrently."""
+        responses = await asyncio.gather(
+            *(self.fetch(symbols, interval, **kwargs) for interval in intervals), return_exceptions=True
+        )
+        results = {}
+        for interval, response in zip(intervals, responses):
+            if isinstance(response, Exception):
+                logger.error(f"Error fetching {interval} for {symbols}: {response}")
+                continue
+            for symbol, arrays in response.items():
+                results[(symbol, interval)] = arrays
+        return results
+
+    @staticmethod
+    def to_frame(timestamps: np.ndarray, ohlc: np.ndarray) -> pd.DataFrame:
+        return pd.DataFrame(ohlc, index=pd.DatetimeIndex(timestamps, name="datetime"), columns=AsyncTwelveData.COLUMNS)
+
+    async def get_frames(self, symbols: List[str], intervals: List[str], **kwargs) -> Dict[Tuple[str, str], pd.DataFrame]:
+        """Same as fetch_many, as float64 frames in the layout of TwelveData.get_data."""
+        arrays = await self.fetch_many(symbols, intervals, **kwargs)
+        return {key: self.to_frame(timestamps, ohlc) for key, (timestamps, ohlc) in arrays.items()}
+
+
+TD_CLIENT = AsyncTwelveData()
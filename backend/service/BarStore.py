@@ -0,0 +1,374 @@
+import asyncio
+import json
+import os
+import threading
+import time
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Tuple
+from backend.service.TwelveData import TwelveData
+from backend.utils.resample import INTERVAL_MINUTES, OHLCResampler
+from backend.utils.logger_config import get_logger
+
+logger = get_logger(__name__)
+
+
+class BarStore:
+    """
+    Persistent OHLC bar store keyed by (currency_pair, interval).
+
+    Bars live in two flat little-endian files per key under `root_path`:
+    `timestamps.i8` (int64 ns) and `ohlc.f8` (float64, 4 per bar). Both are
+    read through np.memmap and only ever appended to, except for the latest
+    bar, which is rewritten in place while it is still forming. The last
+    `tail_size` bars of each key are also kept in memory so regular refreshes
+    never touch the disk.
+
+    Writes to a key (write, reset, backfill, a sync merge) hold the key's lock,
+    so callers running in worker threads never interleave a reset with a write.
+    """
+
+    COLUMNS = ["Open", "High", "Low", "Close"]
+    MAX_FETCH_SIZE = 5000  # TwelveData outputsize limit
+    MAX_RESAMPLE_DEPTH = 20 * MAX_FETCH_SIZE  # source bars worth backfilling to derive an interval
+
+    def __init__(self, root_path: str = "data/bars", tail_size: int = 1000):
+        self.root_path = root_path
+        self.tail_size = tail_size
+        self._tails: Dict[Tuple[str, str], pd.DataFrame] = {}
+        self._resamplers: Dict[Tuple[str, str, str], OHLCResampler] = {}
+        self._last_sync: Dict[Tuple[str, str], float] = {}
+        self._locks: Dict[Tuple[str, str], threading.RLock] = {}
+        self._locks_lock = threading.Lock()
+
+    def _lock(self, currency_pair: str, interval: str) -> threading.RLock:
+        with self._locks_lock:
+            return self._locks.setdefault((currency_pair, interval), threading.RLock())
+
+    # --- Files ---
+    def _paths(self, currency_pair: str, interval: str) -> Tuple[str, str, str, str]:
+        directory = os.path.join(self.root_path, currency_pair.replace("/", "_"), interval)
+        return (
+            directory,
+            os.path.join(directory, "timestamps.i8"),
+            os.path.join(directory, "ohlc.f8"),
+            os.path.join(directory, "meta.json"),
+        )
+
+    def _load(self, currency_pair: str, interval: str) -> Tuple[np.ndarray, np.ndarray]:
+        _, ts_path, ohlc_path, _ = self._paths(currency_pair, interval)
+        if not os.path.exists(ts_path) or os.path.getsize(ts_path) == 0:
+            return np.empty(0, dtype="<i8"), np.empty((0, 4), dtype="<f8")
+
+        timestamps = np.memmap(ts_path, dtype="<i8", mode="r")
+        ohlc = np.memmap(ohlc_path, dtype="<f8", mode="r").reshape(-1, 4)
+        # an interrupted append may leave one file longer than the other
+        n = min(len(timestamps), len(ohlc))
+        return timestamps[:n], ohlc[:n]
+
+    def _get_tz(self, currency_pair: str, interval: str):
+        _, _, _, meta_path = self._paths(currency_pair, interval)
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path) as f:
+            return json.load(f).get("tz")
+
+    def _to_frame(self, timestamps: np.ndarray, ohlc: np.ndarray, tz) -> pd.DataFrame:
+        index = pd.DatetimeIndex(np.asarray(timestamps).astype("datetime64[ns]"), name="datetime")
+        if tz is not None:
+            index = index.tz_localize("UTC").tz_convert(tz)
+        return pd.DataFrame(np.array(ohlc), index=index, columns=self.COLUMNS)
+
+    @staticmethod
+    def _to_int(index: pd.DatetimeIndex) -> np.ndarray:
+        if index.tz is not None:
+            index = index.tz_convert("UTC").tz_localize(None)
+        return index.as_unit("ns").asi8.astype("<i8")
+
+    # --- Read ---
+    def count(self, currency_pair: str, interval: str) -> int:
+        timestamps, _ = self._load(currency_pair, interval)
+        return len(timestamps)
+
+    def first_timestamp(self, currency_pair: str, interval: str):
+        timestamps, _ = self._load(currency_pair, interval)
+        if not len(timestamps):
+            return None
+        return self._to_frame(timestamps[:1], np.zeros((1, 4)), self._get_tz(currency_pair, interval)).index[0]
+
+    def last_timestamp(self, currency_pair: str, interval: str):
+        tail = self._get_tail(currency_pair, interval)
+        return None if tail.empty else tail.index[-1]
+
+    def _get_tail(self, currency_pair: str, interval: str) -> pd.DataFrame:
+        key = (currency_pair, interval)
+        if key not in self._tails:
+            timestamps, ohlc = self._load(currency_pair, interval)
+            self._tails[key] = self._to_frame(
+                timestamps[-self.tail_size:], ohlc[-self.tail_size:], self._get_tz(currency_pair, interval)
+            )
+        return self._tails[key]
+
+    def read(self, currency_pair: str, interval: str, size: int = None) -> pd.DataFrame:
+        """The latest `size` bars (all bars if None), served from memory when the tail is long enough."""
+        if size is not None and size <= self.tail_size:
+            return self._get_tail(currency_pair, interval).tail(size).copy()
+
+        timestamps, ohlc = self._load(currency_pair, interval)
+        if size is not None:
+            timestamps, ohlc = timestamps[-size:], ohlc[-size:]
+        return self._to_frame(timestamps, ohlc, self._get_tz(currency_pair, interval))
+
+    def read_range(self, currency_pair: str, interval: str, start=None, end=None) -> pd.DataFrame:
+        """
+        Bars with start <= timestamp <= end, located with a binary search on the memory-mapped timestamps.
+        Naive bounds are taken in the stored timezone; bars stored without one only accept naive bounds.
+        """
+        timestamps, ohlc = self._load(currency_pair, interval)
+        tz = self._get_tz(currency_pair, interval)
+
+        def to_int(value):
+            value = pd.Timestamp(value)
+            if value.tzinfo is None and tz is not None:
+                value = value.tz_localize(tz)
+            elif value.tzinfo is not None and tz is None:
+                # converting through UTC would shift the naive local times the bars were stored in
+                raise ValueError(f"{currency_pair} {interval} bars are stored without a timezone; pass naive bounds, not {value}")
+            return self._to_int(pd.DatetimeIndex([value]))[0]
+
+        lo = 0 if start is None else np.searchsorted(timestamps, to_int(start), side="left")
+        hi = len(timestamps) if end is None else np.searchsorted(timestamps, to_int(end), side="right")
+        return self._to_frame(timestamps[lo:hi], ohlc[lo:hi], tz)
+
+    # --- Write ---
+    def reset(self, currency_pair: str, interval: str):
+        with self._lock(currency_pair, interval):
+            _, ts_path, ohlc_path, meta_path = self._paths(currency_pair, interval)
+            for path in (ts_path, ohlc_path, meta_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            self._tails.pop((currency_pair, interval), None)
+            # bars derived from this series have to be rebuilt as well
+            for key in [key for key in self._resamplers if key[0] == currency_pair and key[2] == interval]:
+                del self._resamplers[key]
+
+    def write(self, currency_pair: str, interval: str, df: pd.DataFrame) -> int:
+        """
+        Merge bars into the store and return how many were appended.
+
+        Bars older than the latest stored bar are ignored, the latest stored
+        bar is overwritten if it is sent again, and newer bars are appended.
+        """
+        if df is None or df.empty:
+            return 0
+        with self._lock(currency_pair, interval):
+            return self._write(currency_pair, interval, df)
+
+    def _write(self, currency_pair: str, interval: str, df: pd.DataFrame) -> int:
+        df = df[self.COLUMNS].sort_index()
+        df = df[~df.index.duplicated(keep="last")]
+
+        directory, ts_path, ohlc_path, meta_path = self._paths(currency_pair, interval)
+        os.makedirs(directory, exist_ok=True)
+        if not os.path.exists(meta_path):
+            with open(meta_path, "w") as f:
+                json.dump({"tz": None if df.index.tz is None else str(df.index.tz)}, f)
+
+        timestamps_new = self._to_int(df.index)
+        values_new = df.to_numpy(dtype="<f8")
+
+        timestamps, _ = self._load(currency_pair, interval)
+        n_stored = len(timestamps)
+        if n_stored:
+            last = timestamps[-1]
+            keep = timestamps_new >= last
+            timestamps_new, values_new = timestamps_new[keep], values_new[keep]
+            if len(timestamps_new) and timestamps_new[0] == last:
+                # the previously stored bar was still forming: update it in place
+                ohlc = np.memmap(ohlc_path, dtype="<f8", mode="r+").reshape(-1, 4)
+                ohlc[n_stored - 1] = values_new[0]
+                ohlc.flush()
+                del ohlc
+                timestamps_new, values_new = timestamps_new[1:], values_new[1:]
+
+        if len(timestamps_new):
+            if os.path.exists(ohlc_path) and os.path.getsize(ohlc_path) > n_stored * 4 * 8:
+                # drop orphan prices left by an interrupted append
+                os.truncate(ohlc_path, n_stored * 4 * 8)
+            # prices first, so a crash leaves at most orphan prices that _load ignores
+            with open(ohlc_path, "ab") as f:
+                f.write(values_new.tobytes())
+            with open(ts_path, "ab") as f:
+                f.write(timestamps_new.tobytes())
+
+        self._update_tail(currency_pair, interval, df)
+        return len(timestamps_new)
+
+    def _update_tail(self, currency_pair: str, interval: str, df: pd.DataFrame):
+        key = (currency_pair, interval)
+        if key not in self._tails:
+            return
+        tail = self._tails[key]
+        if not tail.empty:
+            df = df[df.index >= tail.index[-1]]
+            tail = tail[tail.index < df.index[0]] if not df.empty else tail
+        self._tails[key] = pd.concat([tail, df]).tail(self.tail_size) if not df.empty else tail
+
+    # --- Sync ---
+    def _is_fresh(self, currency_pair: str, interval: str, outputsize: int, max_age: float) -> bool:
+        synced_at = self._last_sync.get((currency_pair, interval), 0)
+        return bool(max_age) and time.time() - synced_at < max_age and self.count(currency_pair, interval) >= outputsize
+
+    def _sync_request(self, currency_pair: str, interval: str, outputsize: int) -> Dict:
+        """TwelveData request parameters that bring the key up to date."""
+        last = self.last_timestamp(currency_pair, interval)
+        if last is None or self.count(currency_pair, interval) < outputsize:
+            return {"outputsize": outputsize}
+        return {"outputsize": self.MAX_FETCH_SIZE, "start_date": last.strftime("%Y-%m-%d %H:%M:%S")}
+
+    def _sync_merge(self, currency_pair: str, interval: str, outputsize: int, request: Dict, data: pd.DataFrame) -> pd.DataFrame:
+        with self._lock(currency_pair, interval):
+            return self._merge(currency_pair, interval, outputsize, request, data)
+
+    def _merge(self, currency_pair: str, interval: str, outputsize: int, request: Dict, data: pd.DataFrame) -> pd.DataFrame:
+        if data is not None and not data.empty:
+            if "start_date" not in request:
+                self.reset(currency_pair, interval)
+            elif len(data) >= self.MAX_FETCH_SIZE:
+                # the store is too far behind to be bridged: start over from the latest bars
+                logger.info(f"Bar store for {currency_pair} {interval} has a gap, rebuilding")
+                self.reset(currency_pair, interval)
+                data = data.tail(max(outputsize, self.tail_size))
+
+        if data is None or data.empty:
+            logger.warning(f"No new bars fetched for {currency_pair} {interval}, serving stored bars")
+        else:
+            appended = self.write(currency_pair, interval, data)
+            self._last_sync[(currency_pair, interval)] = time.time()
+            logger.info(f"Synced {currency_pair} {interval}: {appended} new bars")
+
+        return self.read(currency_pair, interval, size=outputsize)
+
+    def sync(self, currency_pair: str, interval: str, outputsize: int = 400, exchange: str = "OANDA", max_age: float = 0) -> pd.DataFrame:
+        """
+        Fetch only the bars after the latest stored one, merge them in and return the latest `outputsize` bars.
+
+        If the key was synced less than `max_age` seconds ago the stored bars are returned without a request.
+        """
+        if self._is_fresh(currency_pair, interval, outputsize, max_age):
+            return self.read(currency_pair, interval, size=outputsize)
+
+        request = self._sync_request(currency_pair, interval, outputsize)
+        data = TwelveData(currency_pair=currency_pair, interval=interval, exchange=exchange, **request).get_data()
+        return self._sync_merge(currency_pair, interval, outputsize, request, data)
+
+    async def async_sync_many(self, keys: List[Tuple[str, str]], client, outputsize: int = 400, exchange: str = "OANDA",
+                              max_age: float = 0) -> Dict[Tuple[str, str], pd.DataFrame]:
+        """
+        `sync` for many (pair, interval) keys through an AsyncTwelveData client.
+
+        Keys needing identical request parameters (same interval and last stored bar)
+        share one comma-joined request, and the groups are fetched concurrently.
+        """
+        results, groups = {}, {}
+        for currency_pair, interval in keys:
+            if self._is_fresh(currency_pair, interval, outputsize, max_age):
+                results[(currency_pair, interval)] = self.read(currency_pair, interval, size=outputsize)
+                continue
+            request = self._sync_request(currency_pair, interval, outputsize)
+            group_key = (interval, tuple(sorted(request.items())))
+            groups.setdefault(group_key, []).append(currency_pair)
+
+        async def fetch_group(interval, request, currency_pairs):
+            frames = await client.get_frames(currency_pairs, [interval], exchange=exchange, **request)
+            for currency_pair in currency_pairs:
+                data = frames.get((currency_pair, interval))
+                results[(currency_pair, interval)] = self._sync_merge(currency_pair, interval, outputsize, request, data)
+
+        await asyncio.gather(*(
+            fetch_group(interval, dict(request), currency_pairs)
+            for (interval, request), currency_pairs in groups.items()
+        ))
+        return results
+
+    async def async_sync(self, currency_pair: str, interval: str, client, outputsize: int = 400, exchange: str = "OANDA",
+                         max_age: float = 0) -> pd.DataFrame:
+        results = await self.async_sync_many([(currency_pair, interval)], client, outputsize, exchange, max_age)
+        return results[(currency_pair, interval)]
+
+    def backfill(self, currency_pair: str, interval: str, size: int, exchange: str = "OANDA") -> int:
+        """
+        Page backwards through TwelveData until at least `size` bars are stored; returns the stored count.
+
+        Holds the key's lock throughout, so a concurrent backfill of the same key
+        waits and then finds the history already there.
+        """
+        with self._lock(currency_pair, interval):
+            return self._backfill(currency_pair, interval, size, exchange)
+
+    def _backfill(self, currency_pair: str, interval: str, size: int, exchange: str) -> int:
+        stored = self.read(currency_pair, interval)
+        end = stored.index[0] if not stored.empty else None
+        total = len(stored)
+        frames = []
+
+        while total < size:
+            data = TwelveData(
+                currency_pair=currency_pair,
+                interval=interval,
+                outputsize=min(self.MAX_FETCH_SIZE, size - total + 1),
+                exchange=exchange,
+                end_date=None if end is None else end.strftime("%Y-%m-%d %H:%M:%S"),
+            ).get_data()
+            if data is not None and end is not None:
+                data = data[data.index < end]
+            if data is None or data.empty:
+                break
+            frames.insert(0, data)
+            total += len(data)
+            end = data.index[0]
+
+        if frames:
+            # the files are append-only, so older history means rewriting the key
+            combined = pd.concat(frames + [stored])
+            self.reset(currency_pair, interval)
+            self.write(currency_pair, interval, combined)
+            logger.info(f"Backfilled {currency_pair} {interval} to {total} bars")
+        return total
+
+    # --- Derived intervals ---
+    @staticmethod
+    def resample_depth(interval: str, size: int, source_interval: str = "1min") -> int:
+        """Source bars needed for `size` `interval` bars, plus one bucket for a partial first one."""
+        ratio = INTERVAL_MINUTES[interval] // INTERVAL_MINUTES[source_interval]
+        return (size + 1) * ratio
+
+    def resample(self, currency_pair: str, interval: str, size: int, source_interval: str = "1min", offset_minutes: int = 0) -> pd.DataFrame:
+        """
+        The latest `size` `interval` bars derived from the stored `source_interval` series.
+
+        Only source bars added since the previous call are fed to the per-key
+        OHLCResampler. Returns None if the source history is too short for `size` bars.
+        """
+        key = (currency_pair, interval, source_interval)
+        # a reset of the source drops its resamplers; feed this one under the source's lock
+        with self._lock(currency_pair, source_interval):
+            resampler = self._resamplers.get(key)
+            if resampler is None:
+                resampler = OHLCResampler(interval, offset_minutes=offset_minutes, max_bars=max(size, self.tail_size))
+                self._resamplers[key] = resampler
+            resampler.max_bars = max(resampler.max_bars, size)
+
+            timestamps, ohlc = self._load(currency_pair, source_interval)
+            if resampler.last_timestamp is not None:
+                start = np.searchsorted(timestamps, resampler.last_timestamp, side="left")
+                timestamps, ohlc = timestamps[start:], ohlc[start:]
+            resampler.update(timestamps, ohlc)
+
+            if resampler.bar_count < size:
+                return None
+            derived_timestamps, derived_ohlc = resampler.get_bars(size)
+        return self._to_frame(derived_timestamps, derived_ohlc, self._get_tz(currency_pair, source_interval))
+
+
+BAR_STORE = BarStore()
@@ -0,0 +1,210 @@
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.chrome.options import Options
+import asyncio
+import atexit
+import os
+import threading
+import time
+from typing import List, Optional
+from backend.utils.logger_config import get_logger
+
+logger = get_logger(__name__)
+
+WINDOW_SIZE = (1920, 1080)
+
+
+def launch_driver(driver_path=None, is_headless=True) -> webdriver.Chrome:
+    chrome_options = Options()
+    if is_headless:
+        chrome_options.add_argument("--headless")
+        chrome_options.add_argument("--disable-gpu")  # Especially on Windows
+    chrome_options.add_argument("--disable-infobars")
+    chrome_options.add_argument("--disable-extensions")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--start-maximized")  # Starts the browser maximized
+    chrome_options.add_argument(f"--window-size={WINDOW_SIZE[0]},{WINDOW_SIZE[1]}")  # Sets a default window size
+
+    chrome_options.page_load_strategy = "eager"
+
+    if driver_path is None:
+        try:
+            chrome_driver_path = r"C:\Windows\chromedriver.exe"  # Replace with your actual path
+            service = Service(chrome_driver_path)
+            return webdriver.Chrome(service=service, options=chrome_options)
+        except:
+            chrome_path = '/usr/bin/chromium'
+            chromedriver_path = '/usr/bin/chromedriver'
+            chrome_options.binary_location = chrome_path
+            service = Service(chromedriver_path)
+            return webdriver.Chrome(service=service, options=chrome_options)
+    else:
+        service = Service(driver_path)
+        return webdriver.Chrome(service=service, options=chrome_options)
+
+
+class PooledDriver:
+    """A pooled browser and the pages it has loaded since launch."""
+
+    def __init__(self, driver: webdriver.Chrome):
+        self.driver = driver
+        self.pages = 0
+        self.launched = time.monotonic()
+
+
+class DriverPool:
+    """
+    Warm headless Chromium browsers shared by the Selenium scrapers.
+
+    At most `size` browsers exist at once; checkout blocks (up to `timeout`
+    seconds) while all of them are borrowed. A browser is health-checked when
+    it is handed out and replaced if its session died, and it is quit instead
+    of returned once it has loaded `max_pages` pages, which caps the memory a
+    long-lived Chromium accumulates. `warm` pre-launches idle browsers in the
+    background so the first scraper does not pay the startup.
+    """
+
+    def __init__(self, size: int = 2, max_pages: int = 50, timeout: float = 300.0):
+        self.size = size
+        self.max_pages = max_pages
+        self.timeout = timeout
+        self._idle: List[PooledDriver] = []
+        self._count = 0
+        self._condition = threading.Condition()
+
+        self.launched = 0
+        self.recycled = 0
+        self.unhealthy = 0
+
+    def _launch(self) -> PooledDriver:
+        started = time.monotonic()
+        try:
+            driver = PooledDriver(launch_driver())
+        except Exception:
+            with self._condition:
+                self._count -= 1
+                self._condition.notify()
+            raise
+        with self._condition:
+            self.launched += 1
+        logger.info(f"Launched pooled browser in {time.monotonic() - started:.1f}s ({self._count}/{self.size})")
+        return driver
+
+    @staticmethod
+    def _healthy(pooled: PooledDriver) -> bool:
+        try:
+            return pooled.driver.execute_script("return 1") == 1
+        except Exception:
+            return False
+
+    @staticmethod
+    def _quit(pooled: PooledDriver):
+        try:
+            pooled.driver.quit()
+        except Exception as e:
+            logger.warning(f"Error quitting pooled browser: {e}")
+
+    def _discard(self, pooled: PooledDriver):
+        self._quit(pooled)
+        with self._condition:
+            self._count -= 1
+            self._condition.notify()
+
+    def checkout(self) -> PooledDriver:
+        deadline = time.monotonic() + self.timeout
+        while True:
+            with self._condition:
+                while not self._idle and self._count >= self.size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError(f"No browser free in the pool after {self.timeout}s")
+                    self._condition.wait(remaining)
+                if self._idle:
+                    pooled = self._idle.pop()
+                else:
+                    # reserve the slot, launch outside the lock
+                    self._count += 1
+                    pooled = None
+            if pooled is None:
+                return self._launch()
+            if self._healthy(pooled):
+                return pooled
+            logger.warning("Pooled browser failed its health check; replacing it")
+            with self._condition:
+                self.unhealthy += 1
+            self._discard(pooled)
+
+    def checkin(self, pooled: PooledDriver):
+        if pooled.pages >= self.max_pages:
+            with self._condition:
+                self.recycled += 1
+            logger.info(f"Recycling pooled browser after {pooled.pages} pages")
+            self._discard(pooled)
+            return
+        try:
+            # leave no state of the last scraper behind but the cookies (consent banners stay accepted)
+            pooled.driver.set_window_size(*WINDOW_SIZE)
+            pooled.driver.get("about:blank")
+        except Exception:
+            with self._condition:
+                self.unhealthy += 1
+            self._discard(pooled)
+            return
+        with self._condition:
+            self._idle.append(pooled)
+            self._condition.notify()
+
+    async def acheckout(self) -> PooledDriver:
+        return await asyncio.to_thread(self.checkout)
+
+    async def acheckin(self, pooled: PooledDriver):
+        await asyncio.to_thread(self.checkin, pooled)
+
+    def warm(self, count: Optional[int] = None) -> threading.Thread:
+        """Launch idle browsers up to `count` (default: the pool size) in a background thread."""
+        count = self.size if count is None else min(count, self.size)
+
+        def launch():
+            while True:
+                with self._condition:
+                    if len(self._idle) >= count or self._count >= self.size:
+                        return
+                    self._count += 1
+                try:
+                    pooled = self._launch()
+                except Exception as e:
+                    logger.error(f"Could not warm the browser pool: {e}")
+                    return
+                with self._condition:
+                    self._idle.append(pooled)
+                    self._condition.notify()
+
+        thread = threading.Thread(target=launch, name="driver-pool-warm", daemon=True)
+        thread.start()
+        return thread
+
+    def shutdown(self):
+        with self._condition:
+            idle, self._idle = self._idle, []
+            self._count -= len(idle)
+        for pooled in idle:
+            self._quit(pooled)
+
+    def stats(self) -> dict:
+        with self._condition:
+            return {
+                "size": self.size,
+                "browsers": self._count,
+                "idle": len(self._idle),
+                "launched": self.launched,
+                "recycled": self.recycled,
+                "unhealthy": self.unhealthy,
+            }
+
+
+DRIVER_POOL = DriverPool(
+    size=int(os.getenv("DRIVER_POOL_SIZE", 2)),
+    max_pages=int(os.getenv("DRIVER_POOL_MAX_PAGES", 50)),
+)
+atexit.register(DRIVER_POOL.shutdown)
@@ -28,7 +28,7 @@ class InvestingScrapper(SeleniumScrapper):
         return combined_urls
 
     def get_news_websites(self) -> List:
-        self.driver.get(self.news_root_url)
+        self.open(self.news_root_url)
         self.driver.execute_script("window.scrollBy(0, 400);")
         time.sleep(2)
 
@@ -48,7 +48,7 @@ class InvestingScrapper(SeleniumScrapper):
     
     def get_asset(self, name, url) -> List[str]:
         logger.info(f"Fetching data for {name} from {url}")
-        self.driver.get(url)
+        self.open(url)
         #self.wait_for_popup(timeout=5)
         #self.close_ads()
         logger.info(f"get url and close ads for {name}")
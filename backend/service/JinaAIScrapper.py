@@ -2,10 +2,12 @@ import requests
 import os
 import aiohttp
 import asyncio
+from backend.utils.rate_limiter import RATE_LIMITER, PRIORITY_DEFAULT
 
 class JinaAIScrapper:
 
-    def __init__(self):
+    def __init__(self, priority: int = PRIORITY_DEFAULT):
+        self.priority = priority
         self.prefix_url = "https://r.jina.ai/"
         self.jina_api_key = os.getenv("JINA_AI_API_KEY")
 
@@ -16,6 +18,7 @@ class JinaAIScrapper:
     
     def get(self, url):
         try:
+            RATE_LIMITER.acquire_sync("jina", key=self.jina_api_key, priority=self.priority)
             response = requests.get(self.prefix_url + url, headers=self.headers)
             return response.text
         except Exception as e:
@@ -23,6 +26,7 @@ class JinaAIScrapper:
             return ""
     
     async def aget(self, session: aiohttp.ClientSession, url: str):
+        await RATE_LIMITER.acquire("jina", key=self.jina_api_key, priority=self.priority)
         async with session.get(self.prefix_url + url, headers = self.headers) as response:
             return await response.text()
     
@@ -11,42 +11,32 @@ from webdriver_manager.chrome import ChromeDriverManager
 import time
 from PIL import Image, ImageDraw, ImageFont
 import os
+from backend.service.DriverPool import DRIVER_POOL, DriverPool, launch_driver
 from backend.utils.logger_config import get_logger
 logger = get_logger(__name__)
 
 class SeleniumScrapper:
 
-    def __init__(self, driver_path = None, is_headless = True):
-        self.driver = self.init_driver(driver_path, is_headless)
-    
+    def __init__(self, driver_path = None, is_headless = True, pool: DriverPool = DRIVER_POOL):
+        # the default headless browser is borrowed from the pool; a custom one is launched and owned
+        self.pool = pool if driver_path is None and is_headless else None
+        self.pooled = self.pool.checkout() if self.pool is not None else None
+        self.driver = self.pooled.driver if self.pooled is not None else self.init_driver(driver_path, is_headless)
+
     def init_driver(self, driver_path, is_headless):
-        chrome_options = Options()
-        if is_headless:
-            chrome_options.add_argument("--headless")
-            chrome_options.add_argument("--disable-gpu")  # Especially on Windows
-        chrome_options.add_argument("--disable-infobars")
-        chrome_options.add_argument("--disable-extensions")
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        chrome_options.add_argument("--start-maximized")  # Starts the browser maximized
-        chrome_options.add_argument("--window-size=1920,1080")  # Sets a default window size
-
-        chrome_options.page_load_strategy = "eager"
-
-        if driver_path is None:
-            try:
-                chrome_driver_path = r"C:\Windows\chromedriver.exe"  # Replace with your actual path
-                service = Service(chrome_driver_path)
-                return webdriver.Chrome(service=service, options=chrome_options)
-            except:
-                chrome_path = '/usr/bin/chromium'
-                chromedriver_path = '/usr/bin/chromedriver'
-                chrome_options.binary_location = chrome_path
-                service = Service(chromedriver_path)
-                return webdriver.Chrome(service=service, options=chrome_options)
-        else:
-            service = Service(driver_path)
-            return webdriver.Chrome(service=service, options=chrome_options)
+        return launch_driver(driver_path, is_headless)
+
+    def open(self, url: str):
+        """Load a page, counting it towards the pooled browser's recycling."""
+        if self.pooled is not None:
+            self.pooled.pages += 1
+        self.driver.get(url)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.quit_driver()
     
     def wait_for_popup(self, timeout=5):
         try:
@@ -84,7 +74,15 @@ class SeleniumScrapper:
 
     
     def quit_driver(self):
-        self.driver.quit()
+        """Return a pooled browser to the pool, or quit an owned one; safe to call twice."""
+        if self.driver is None:
+            return
+        if self.pooled is not None:
+            self.pool.checkin(self.pooled)
+            self.pooled = None
+        else:
+            self.driver.quit()
+        self.driver = None
 
 
 
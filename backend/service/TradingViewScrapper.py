@@ -21,7 +21,7 @@ class TradingViewScrapper(SeleniumScrapper):
         self.news_root_url = NEWS_ROOT_WEBSITE[self.currency_pair]
 
     def get_technical_indicators(self):
-        self.driver.get(self.indicator_url)
+        self.open(self.indicator_url)
         self.close_ads()
         
         self.driver.execute_script("window.scrollBy(0, 550);")
@@ -63,7 +63,7 @@ class TradingViewScrapper(SeleniumScrapper):
                         pivot_img.save(f"data/technical_indicators/{pivot_file_name}")
     
     def get_economic_calenders(self):
-        self.driver.get(self.calender_url)
+        self.open(self.calender_url)
         self.driver.execute_script("window.scrollBy(0, 400);")
         time.sleep(2)
         
@@ -98,7 +98,7 @@ class TradingViewScrapper(SeleniumScrapper):
                 cropped_img.save(f"data/calender/{file_name}")
     
     def get_news_websites(self) -> List[str]:
-        self.driver.get(self.news_root_url)
+        self.open(self.news_root_url)
         self.driver.execute_script("window.scrollBy(0, 400);")
         time.sleep(2)
 
@@ -109,11 +109,13 @@ class TradingViewScrapper(SeleniumScrapper):
         links = [link.get_attribute("href") for link in link_elements]
         return links
     
-    @time_it
     def get_news(self, links: List[str], k: int) -> List[Dict[str, str]]:
+        return asyncio.run(self.aget_news(links, k))
 
+    @time_it
+    async def aget_news(self, links: List[str], k: int) -> List[Dict[str, str]]:
         scrapper = JinaAIScrapper()
-        news = asyncio.run(scrapper.aget_multiple(links[:k]))
+        news = await scrapper.aget_multiple(links[:k])
         return news
 
     
@@ -1,25 +1,29 @@
 from twelvedata import TDClient#
 import pandas as pd
 import os
+from backend.utils.rate_limiter import RATE_LIMITER, PRIORITY_LIVE, is_rate_limit_error
 
 class TwelveData:
 
-    def __init__(self, currency_pair: str, interval: str, outputsize: int = 400, exchange: str = "OANDA", start_date: str = None, end_date: str = None):
+    def __init__(self, currency_pair: str, interval: str, outputsize: int = 400, exchange: str = "OANDA", start_date: str = None, end_date: str = None, priority: int = PRIORITY_LIVE):
         self.currency_pair = currency_pair
         self.interval = interval
         self.outputsize = outputsize
         self.exchange = exchange
         self.start_date = start_date
         self.end_date = end_date
+        self.priority = priority
 
     def _init_client(self):
         api_key = os.getenv("TD_API_KEY", None)
         if not api_key:
             raise ValueError("API key for TwelveData is not set in environment variables.")
+        self.api_key = api_key
         self.client = TDClient(apikey=api_key)
     
     def get_data(self) -> pd.DataFrame:
         self._init_client()
+        RATE_LIMITER.acquire_sync("twelvedata", key=self.api_key, priority=self.priority)
         try:
             if self.start_date and self.end_date:
                 data = self.client.time_series(
@@ -29,6 +33,24 @@ class TwelveData:
                     end_date=self.end_date,
                     exchange=self.exchange
                 ).as_pandas()
+            elif self.start_date:
+                # everything since start_date (inclusive), capped at outputsize
+                data = self.client.time_series(
+                    symbol=self.currency_pair,
+                    interval=self.interval,
+                    start_date=self.start_date,
+                    outputsize=self.outputsize,
+                    exchange=self.exchange
+                ).as_pandas()
+            elif self.end_date:
+                # the latest outputsize bars up to end_date
+                data = self.client.time_series(
+                    symbol=self.currency_pair,
+                    interval=self.interval,
+                    end_date=self.end_date,
+                    outputsize=self.outputsize,
+                    exchange=self.exchange
+                ).as_pandas()
             else:
                 data = self.client.time_series(
                     symbol=self.currency_pair,
@@ -39,6 +61,8 @@ class TwelveData:
             data.columns = ["Open", "High", "Low", "Close"]
             return data[::-1]
         except Exception as e:
+            if is_rate_limit_error(e):
+                RATE_LIMITER.drain("twelvedata", key=self.api_key)
             print(f"Error fetching data: {e}")
             return None
 
@@ -3,9 +3,11 @@ import requests
 import json
 from dotenv import load_dotenv
 import os
-from openai import OpenAI, AsyncOpenAI
 import asyncio
 import time
+from backend.utils.rate_limiter import RATE_LIMITER
+from backend.utils.llm_clients import LLM_CLIENTS
+from backend.utils.llm_executor import LLM_EXECUTOR
 
 class PerplexitySearch:
     def __init__(self, model="llama-3-sonar-large-32k-online", system_message = None):
@@ -21,8 +23,14 @@ class PerplexitySearch:
             self.system_message = """As an financial assistant, your task is to give a comprehensive answer to the user query based on the given information. 
             Your audience is financial experts focused on foreign exchange rates of euro to usd. Your summary will help financial experts make informed and acurate trading decision."""
         self.model = model
-        self.client = OpenAI(api_key=self.api_key, base_url="https://api.perplexity.ai")
-        self.async_client = AsyncOpenAI(api_key=self.api_key, base_url="https://api.perplexity.ai")
+
+    @property
+    def client(self):
+        return LLM_CLIENTS.perplexity_sync(self.api_key)
+
+    @property
+    def async_client(self):
+        return LLM_CLIENTS.perplexity(self.api_key)
 
     def search(self, query, temperature=0.2):
         messages = [
@@ -30,6 +38,7 @@ class PerplexitySearch:
             {"role": "user", "content": query}
         ]
         # chat completion without streaming
+        RATE_LIMITER.acquire_sync("perplexity", key=self.api_key)
         response = self.client.chat.completions.create(
             model=self.model,
             messages=messages,
@@ -42,11 +51,11 @@ class PerplexitySearch:
             {"role": "system", "content": self.system_message},
             {"role": "user", "content": query}
         ]
-        response = await self.async_client.chat.completions.create(
+        response = await LLM_EXECUTOR.run("perplexity", "perplexity_search", lambda: self.async_client.chat.completions.create(
             model=self.model,
             messages=messages,
             temperature=temperature
-        )
+        ), key=self.api_key)
         return response.choices[0].message.content
     
     async def multiple_search(self, queries, temperature=0.2):
@@ -8,15 +8,17 @@ from backend.service.data_collection import TechnicalIndicators
 from datetime import datetime
 from backend.utils.parameters import CURRENCY_TICKERS
 import asyncio
+from backend.utils.rate_limiter import PRIORITY_LIVE
 
 
 class TechnicalAnalysis:
-    def __init__(self, analysis_model = None, synthesis_model = None, gemini_model = None, gemini_api_key = None, currency_pair: str = "EUR/USD", ticker: str = "EURUSD=X"):
+    def __init__(self, analysis_model = None, synthesis_model = None, gemini_model = None, gemini_api_key = None, currency_pair: str = "EUR/USD", ticker: str = "EURUSD=X", priority: int = PRIORITY_LIVE):
         self.analysis_model = analysis_model if analysis_model is not None else Config(model_name="gpt-4o", temperature=0.2, max_tokens=512).get_model()
         self.synthesis_model = synthesis_model if synthesis_model is not None else Config(model_name="gpt-4o", temperature=0.2, max_tokens=1024).get_model()
         self.gemini_model = gemini_model if gemini_model is not None else "gemini-2.0-flash-exp"
         self.gemini_api_key = gemini_api_key if gemini_api_key is not None else os.environ["GEMINI_API_KEY_XIFAN"]
         self.currency_pair = currency_pair
+        self.priority = priority
         self.ticker = CURRENCY_TICKERS[self.currency_pair]
 
         self.system_prompt_analysis = f"""As an expert forex analyst specializing in {self.currency_pair} pair technical analysis. You will be provided with data of {self.currency_pair} rates and technical indicators.
@@ -300,6 +302,8 @@ Below are the technical indicators with an interval of {ti_interval}.
             model_name=model_name,
             generation_config=generation_config,
             api_key=self.gemini_api_key,
+            priority=self.priority,
+            agent=type(self).__name__,
             system_instruction=system_instruction
         )
 
@@ -374,6 +378,8 @@ Below are the technical indicators with an interval of {ti_interval}.
             model_name=model_name,
             generation_config=generation_config,
             api_key=self.gemini_api_key,
+            priority=self.priority,
+            agent=type(self).__name__,
             system_instruction=self.system_prompt_hourly_analysis
         )
         analysis_1h, _ = await self.get_technical_analysis(client, chart_files[0])
@@ -383,6 +389,8 @@ Below are the technical indicators with an interval of {ti_interval}.
             model_name=model_name,
             generation_config=generation_config,
             api_key=self.gemini_api_key,
+            priority=self.priority,
+            agent=type(self).__name__,
             system_instruction=self.system_prompt_5_min_analysis
         )
         analysis_5min, chat_session = await self.get_technical_analysis(client, chart_files[1], previous_analysis=analysis_1h, current_price=current_price, pivit_points=pivot_points)
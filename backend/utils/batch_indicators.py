@@ -0,0 +1,202 @@
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import Dict, Hashable, List, Tuple
+
+# --- NumPy kernels ---
+# All kernels take float arrays shaped (instrument, bars) and work along the bar axis.
+# Series shorter than the stack are left-padded with NaN; the padding is skipped the
+# same way pandas skips leading NaNs, so each row matches the `ta` result for that
+# instrument on its own.
+
+def ewm_mean(x: np.ndarray, alpha: float, min_periods: int) -> np.ndarray:
+    """Series.ewm(alpha=alpha, adjust=False, min_periods=min_periods).mean() for every row."""
+    out = np.full(x.shape, np.nan)
+    value = np.full(x.shape[0], np.nan)
+    count = np.zeros(x.shape[0], dtype=int)
+    for t in range(x.shape[1]):
+        xt = x[:, t]
+        valid = ~np.isnan(xt)
+        value = np.where(
+            valid,
+            np.where(np.isnan(value), xt, (1 - alpha) * value + alpha * xt),
+            value,
+        )
+        count += valid
+        out[:, t] = np.where(count >= min_periods, value, np.nan)
+    return out
+
+
+def ema_kernel(x: np.ndarray, window: int) -> np.ndarray:
+    return ewm_mean(x, alpha=2 / (window + 1), min_periods=window)
+
+
+def rolling_windows(x: np.ndarray, window: int) -> np.ndarray:
+    """View of shape (instrument, bars - window + 1, window); NaN windows propagate NaN."""
+    return sliding_window_view(x, window, axis=1)
+
+
+def rolling_mean(x: np.ndarray, window: int) -> np.ndarray:
+    out = np.full(x.shape, np.nan)
+    if x.shape[1] >= window:
+        out[:, window - 1:] = rolling_windows(x, window).mean(axis=-1)
+    return out
+
+
+def rolling_std(x: np.ndarray, window: int) -> np.ndarray:
+    """Population (ddof=0) rolling standard deviation, as used by Bollinger Bands."""
+    out = np.full(x.shape, np.nan)
+    if x.shape[1] >= window:
+        out[:, window - 1:] = rolling_windows(x, window).std(axis=-1)
+    return out
+
+
+def shift(x: np.ndarray, periods: int) -> np.ndarray:
+    out = np.full(x.shape, np.nan)
+    out[:, periods:] = x[:, :-periods]
+    return out
+
+
+def rsi_kernel(close: np.ndarray, window: int = 14) -> np.ndarray:
+    diff = close - shift(close, 1)
+    # the first real bar has no previous close and contributes 0 (as in `ta`); padding stays NaN
+    up = np.where(diff > 0, diff, 0.0)
+    down = np.where(diff < 0, -diff, 0.0)
+    padding = np.isnan(close)
+    up[padding] = np.nan
+    down[padding] = np.nan
+
+    ema_up = ewm_mean(up, alpha=1 / window, min_periods=window)
+    ema_down = ewm_mean(down, alpha=1 / window, min_periods=window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = np.where(ema_down == 0, 100.0, 100 - (100 / (1 + ema_up / ema_down)))
+    out[np.isnan(ema_down)] = np.nan
+    return out
+
+
+def true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    prev_close = shift(close, 1)
+    # fmax ignores the missing previous close of the first bar, leaving high - low
+    return np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+
+
+def atr_kernel(tr: np.ndarray, window: int = 14) -> np.ndarray:
+    """ta.volatility.AverageTrueRange: 0 during warm-up, seeded with the mean of the first `window` ranges."""
+    out = np.full(tr.shape, np.nan)
+    value = np.zeros(tr.shape[0])
+    tr_sum = np.zeros(tr.shape[0])
+    count = np.zeros(tr.shape[0], dtype=int)
+    for t in range(tr.shape[1]):
+        trt = tr[:, t]
+        valid = ~np.isnan(trt)
+        count += valid
+        tr_sum += np.where(valid & (count <= window), trt, 0.0)
+        value = np.where(
+            valid & (count == window),
+            tr_sum / window,
+            np.where(valid & (count > window), (value * (window - 1) + trt) / window, value),
+        )
+        out[:, t] = np.where(count >= window, value, np.where(valid, 0.0, np.nan))
+    return out
+
+
+def roc_kernel(close: np.ndarray, window: int = 12) -> np.ndarray:
+    prev = shift(close, window)
+    return (close - prev) / prev * 100
+
+
+class BatchIndicators:
+    """
+    Indicator set of TechnicalIndicators.calculate_technical_indicators for many
+    instruments at once. Every (currency_pair, interval) series becomes one row of
+    a stacked array, so the Python overhead is paid once per bar rather than once
+    per bar and series.
+    """
+
+    @staticmethod
+    def calculate(open_: np.ndarray, high: np.ndarray, low: np.ndarray, close: np.ndarray,
+                  sma=False, ema=True, rsi=True, macd=True, roc=True, bbands=True, atr=True) -> Dict[str, np.ndarray]:
+        """Return a columnar result: column name -> array shaped (instrument, bars)."""
+        open_, high, low, close = (np.atleast_2d(np.asarray(a, dtype=float)) for a in (open_, high, low, close))
+        result = {"Open": open_, "High": high, "Low": low, "Close": close}
+
+        # --- Simple Moving Average (SMA) ---
+        if sma:
+            for window in (10, 20, 50, 100):
+                result[f"SMA{window}"] = rolling_mean(close, window)
+
+        # --- Exponential Moving Average (EMA) ---
+        if ema:
+            for window in (10, 20, 50, 100):
+                result[f"EMA{window}"] = ema_kernel(close, window)
+
+        # --- Relative Strength Index (RSI) ---
+        if rsi:
+            result["RSI14"] = rsi_kernel(close, 14)
+
+        # --- Moving Average Convergence Divergence (MACD) ---
+        if macd:
+            macd_line = ema_kernel(close, 12) - ema_kernel(close, 26)
+            signal = ema_kernel(macd_line, 9)
+            result["MACD"] = macd_line
+            result["MACD_Signal"] = signal
+            result["MACD_Diff"] = macd_line - signal
+
+        # --- Rate of Change (ROC) ---
+        if roc:
+            result["ROC12"] = roc_kernel(close, 12)
+
+        # --- Bollinger Bands (20 SMA, ±2 std) ---
+        if bbands:
+            mid = rolling_mean(close, 20)
+            std = rolling_std(close, 20)
+            result["BB_Mid"] = mid
+            result["BB_Upper"] = mid + 2 * std
+            result["BB_Lower"] = mid - 2 * std
+
+        # --- Average True Range (ATR) ---
+        if atr:
+            result["ATR"] = atr_kernel(true_range(high, low, close), 14)
+
+        return result
+
+    @staticmethod
+    def stack_frames(frames: Dict[Hashable, pd.DataFrame], size: int = None) -> Tuple[List[Hashable], Dict[str, np.ndarray], List[pd.DatetimeIndex]]:
+        """
+        Stack OHLC frames into (instrument, bars) arrays aligned on their last bar.
+
+        Frames shorter than the longest one (or than `size`) are left-padded with NaN.
+        Returns the keys in row order, the OHLC arrays and each frame's own index.
+        """
+        keys = list(frames.keys())
+        if size is None:
+            size = max(len(df) for df in frames.values())
+
+        arrays = {column: np.full((len(keys), size), np.nan) for column in ("Open", "High", "Low", "Close")}
+        indexes = []
+        for row, key in enumerate(keys):
+            df = frames[key].tail(size)
+            for column, array in arrays.items():
+                array[row, size - len(df):] = df[column].to_numpy(dtype=float)
+            indexes.append(df.index)
+        return keys, arrays, indexes
+
+    @staticmethod
+    def calculate_frames(frames: Dict[Hashable, pd.DataFrame], size: int = None, **indicator_flags) -> Dict[Hashable, pd.DataFrame]:
+        """Batch counterpart of calling calculate_technical_indicators on every frame."""
+        for df in frames.values():
+            if not isinstance(df.index, pd.DatetimeIndex):
+                raise ValueError("DataFrame index must be a DateTimeIndex")
+
+        keys, arrays, indexes = BatchIndicators.stack_frames(frames, size)
+        result = BatchIndicators.calculate(arrays["Open"], arrays["High"], arrays["Low"], arrays["Close"], **indicator_flags)
+
+        n_bars = arrays["Close"].shape[1]
+        out = {}
+        for row, key in enumerate(keys):
+            index = indexes[row]
+            start = n_bars - len(index)
+            df = pd.DataFrame({column: values[row, start:] for column, values in result.items()}, index=index)
+            df["Date"] = df.index
+            out[key] = df
+        return out
@@ -0,0 +1,146 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+import numpy as np
+import pandas as pd
+from backend.utils.logger_config import get_logger
+
+logger = get_logger(__name__)
+
+
+def chart_key(currency_pair: str, interval: str, size: int, flags: Dict, df: pd.DataFrame, columns: Iterable[str]) -> str:
+    """
+    Content address of a chart: sha256 over its parameters, the last bar timestamp
+    and the raw bytes of the plotted tail. A new or revised bar changes the key.
+    """
+    tail = df.tail(size)
+    digest = hashlib.sha256()
+    params = {
+        "pair": currency_pair,
+        "interval": interval,
+        "size": size,
+        "flags": sorted(flags.items()),
+        "last": str(tail.index[-1]) if len(tail) else None,
+        "tz": str(getattr(tail.index, "tz", None)),
+    }
+    digest.update(json.dumps(params, default=str).encode())
+    digest.update(np.asarray(tail.index.asi8 if isinstance(tail.index, pd.DatetimeIndex) else tail.index).tobytes())
+    digest.update(np.ascontiguousarray(tail[list(columns)].to_numpy(dtype=float)).tobytes())
+    return digest.hexdigest()
+
+
+class ChartCache:
+    """
+    Two-tier cache of rendered charts: (PNG bytes, data dict) by content key.
+
+    The memory tier is an LRU bounded by `max_items`. The optional disk tier
+    under `disk_path` keeps `<key>.png` and `<key>.json` so charts survive
+    restarts and are shared between processes (Streamlit app, KnowledgeBase);
+    every `prune_every` writes it is pruned to `max_disk_items` entries, oldest first.
+    """
+
+    def __init__(self, max_items: int = 128, disk_path: Optional[str] = None, max_disk_items: int = 1000,
+                 prune_every: int = 100):
+        self.max_items = max_items
+        self.disk_path = disk_path
+        self.max_disk_items = max_disk_items
+        self.prune_every = prune_every
+        self._writes = 0
+        self._items: "OrderedDict[str, Tuple[Dict, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _paths(self, key: str) -> Tuple[str, str]:
+        return os.path.join(self.disk_path, f"{key}.png"), os.path.join(self.disk_path, f"{key}.json")
+
+    def _remember(self, key: str, value: Tuple[Dict, bytes]):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Tuple[Dict, bytes]]:
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                data, binary_data = self._items[key]
+                return dict(data), binary_data
+
+        if self.disk_path:
+            png_path, json_path = self._paths(key)
+            try:
+                with open(json_path) as f:
+                    data = json.load(f)
+                with open(png_path, "rb") as f:
+                    binary_data = f.read()
+            except (OSError, ValueError):
+                pass
+            else:
+                self.disk_hits += 1
+                self._remember(key, (data, binary_data))
+                return dict(data), binary_data
+
+        self.misses += 1
+        return None
+
+    def put(self, key: str, data: Dict, binary_data: bytes):
+        data = {name: float(value) for name, value in data.items()}
+        self._remember(key, (data, binary_data))
+        if not self.disk_path:
+            return
+
+        try:
+            os.makedirs(self.disk_path, exist_ok=True)
+            png_path, json_path = self._paths(key)
+            # write the png first: an entry only counts once its json exists
+            with open(png_path, "wb") as f:
+                f.write(binary_data)
+            with open(json_path, "w") as f:
+                json.dump(data, f)
+            with self._lock:
+                self._writes += 1
+                prune = self._writes % self.prune_every == 0
+            # scanning the directory costs as much as a write, so it is only done now and then
+            if prune:
+                self._prune()
+        except OSError as e:
+            logger.warning(f"Could not write chart cache entry {key}: {e}")
+
+    def _prune(self):
+        entries = [entry for entry in os.scandir(self.disk_path) if entry.name.endswith(".json")]
+        if len(entries) <= self.max_disk_items:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[:len(entries) - self.max_disk_items]:
+            key = entry.name[:-len(".json")]
+            for path in self._paths(key):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def metrics(self) -> Dict:
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "items": len(self._items),
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+        }
+
+
+# the disk tier is opt-in: set CHART_CACHE_DIR to share rendered charts between processes
+CHART_CACHE = ChartCache(disk_path=os.getenv("CHART_CACHE_DIR") or None)
@@ -0,0 +1,91 @@
+import io
+from dataclasses import dataclass
+from typing import Dict, Optional, Sequence, Tuple
+from PIL import Image
+
+MIME_TYPES = {"png": "image/png", "webp": "image/webp", "jpeg": "image/jpeg"}
+
+
+@dataclass(frozen=True)
+class ImageProfile:
+    """
+    How a rendered chart is encoded for the vision models.
+
+    `width` (pixels) or `dpi` set the render resolution; the figure is drawn at
+    that size rather than resampled. `colors` quantizes a PNG to a palette,
+    `quality` applies to WebP/JPEG, and `grayscale_panels` turns single-line
+    indicator panels (RSI, ROC, ATR) gray, where colour carries no information.
+    """
+    name: str
+    format: str = "png"
+    dpi: Optional[float] = None
+    width: Optional[int] = None
+    colors: Optional[int] = None
+    quality: int = 85
+    grayscale_panels: bool = False
+
+    @property
+    def mime_type(self) -> str:
+        return MIME_TYPES[self.format]
+
+    @property
+    def extension(self) -> str:
+        return "jpg" if self.format == "jpeg" else self.format
+
+    def render_dpi(self, width_inch: float) -> Optional[float]:
+        """DPI to draw a figure `width_inch` wide at; None keeps the figure's default."""
+        if self.width:
+            return self.width / width_inch
+        return self.dpi
+
+
+PROFILES: Dict[str, ImageProfile] = {
+    # what plot_chart has always produced: 2000px wide PNG at the default 100 dpi
+    "full": ImageProfile("full"),
+    "compact": ImageProfile("compact", width=1280, colors=64, grayscale_panels=True),
+    "webp": ImageProfile("webp", format="webp", width=1280, quality=80),
+    "jpeg": ImageProfile("jpeg", format="jpeg", width=1280, quality=85),
+    "small": ImageProfile("small", width=1024, colors=32, grayscale_panels=True),
+}
+
+
+def get_profile(profile) -> ImageProfile:
+    if isinstance(profile, ImageProfile):
+        return profile
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown image profile {profile!r}. Choose from {sorted(PROFILES)}.")
+    return PROFILES[profile]
+
+
+def image_mime_type(data: bytes) -> str:
+    """Mime type of PNG/WebP/JPEG bytes from their magic number; PNG otherwise."""
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    if data[:3] == b"\xff\xd8\xff":
+        return "image/jpeg"
+    return "image/png"
+
+
+def desaturate(image: Image.Image, boxes: Sequence[Tuple[int, int, int, int]]) -> Image.Image:
+    """Turn the (left, top, right, bottom) pixel boxes of an RGB image gray, in place."""
+    for box in boxes:
+        image.paste(image.crop(box).convert("L").convert("RGB"), box[:2])
+    return image
+
+
+def encode_image(image: Image.Image, profile: ImageProfile, gray_boxes: Sequence[Tuple[int, int, int, int]] = ()) -> bytes:
+    """Encode an RGB(A) chart image with `profile`; `gray_boxes` are (left, top, right, bottom) pixel boxes to desaturate."""
+    image = desaturate(image.convert("RGB"), gray_boxes)
+
+    buf = io.BytesIO()
+    if profile.format == "png":
+        if profile.colors:
+            image = image.quantize(colors=profile.colors, method=Image.Quantize.MEDIANCUT, dither=Image.Dither.NONE)
+        image.save(buf, format="PNG", optimize=bool(profile.colors))
+    elif profile.format == "webp":
+        image.save(buf, format="WEBP", quality=profile.quality, method=4)
+    elif profile.format == "jpeg":
+        image.save(buf, format="JPEG", quality=profile.quality, optimize=True)
+    else:
+        raise ValueError(f"Unsupported image format {profile.format!r}.")
+    return buf.getvalue()
@@ -0,0 +1,102 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Tuple
+from backend.utils.technical_charts import ChartJob, render_job, render_composite
+from backend.utils.logger_config import get_logger
+
+logger = get_logger(__name__)
+
+
+def _warm_worker():
+    # importing the chart module loads matplotlib and the Agg backend once per worker
+    import backend.utils.technical_charts  # noqa: F401
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+class ChartRenderer:
+    """
+    Renders ChartJobs in a pool of worker processes and hands back PNG bytes as awaitables.
+
+    matplotlib holds the GIL while drawing, so threads cannot render charts in
+    parallel. Workers are spawned once with matplotlib preloaded and keep their
+    own figure pool, so repeated layouts stay warm. Jobs travel as plain arrays.
+    With `max_workers=0` (the default), or if the pool breaks, charts render in
+    a thread of this process instead.
+
+    Spawned workers re-import the `__main__` module of the parent, so a program
+    that opts into the pool must start under an `if __name__ == "__main__":`
+    guard; a worker that reaches a render while importing it raises RuntimeError
+    instead of spawning workers of its own.
+    """
+
+    def __init__(self, max_workers: int = 0):
+        self.max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # set while a spawned process re-imports the parent's __main__ (the check multiprocessing itself uses)
+        if getattr(multiprocessing.current_process(), "_inheriting", False):
+            raise RuntimeError("Chart render pool requested while a worker imports __main__; start the program "
+                               "that uses it under an `if __name__ == \"__main__\":` guard")
+        with self._lock:
+            if self._executor is None:
+                # spawn: forking a process that runs event loops and client threads is unsafe
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_warm_worker,
+                )
+            return self._executor
+
+    def start(self):
+        """Spawn the workers now instead of on the first render."""
+        if not self.max_workers:
+            return
+        executor = self._get_executor()
+        for future in [executor.submit(_ping) for _ in range(self.max_workers)]:
+            future.result()
+
+    async def _run(self, func, *args):
+        if not self.max_workers:
+            return await asyncio.to_thread(func, *args)
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        try:
+            return await loop.run_in_executor(executor, func, *args)
+        except BrokenProcessPool:
+            logger.warning("Chart render pool broke; rendering in-process and restarting the pool")
+            self._reset(executor)
+            return await asyncio.to_thread(func, *args)
+
+    async def render(self, job: ChartJob) -> bytes:
+        return await self._run(render_job, job)
+
+    async def render_composite(self, job: ChartJob, exports: Dict[str, Tuple[str, ...]], overlays: Tuple[str, ...] = ()) -> Dict[str, bytes]:
+        return await self._run(render_composite, job, exports, overlays)
+
+    async def render_many(self, jobs: List[ChartJob]) -> List[bytes]:
+        return await asyncio.gather(*(self.render(job) for job in jobs))
+
+    def _reset(self, executor: ProcessPoolExecutor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+
+# opt-in: CHART_RENDER_WORKERS=4 renders in 4 worker processes, unset renders in a thread
+CHART_RENDERER = ChartRenderer(int(os.getenv("CHART_RENDER_WORKERS", "0")))
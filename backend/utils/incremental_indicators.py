@@ -0,0 +1,411 @@
+import math
+from collections import deque
+from typing import Dict, List, Tuple
+
+import pandas as pd
+from backend.utils.indicator_registry import analysis_flags
+
+
+# --- Recursive indicator states ---
+# Each state reproduces the exact recursion used by `ta` so that feeding the
+# same bars one at a time gives the same values as the batch computation.
+
+class _EMAState:
+    """Series.ewm(alpha=alpha, adjust=False, min_periods=min_periods).mean() one value at a time."""
+
+    def __init__(self, alpha: float, min_periods: int):
+        self.alpha = alpha
+        self.min_periods = min_periods
+        self.value = None
+        self.count = 0
+
+    def update(self, x: float) -> float:
+        if self.value is None:
+            # leading NaNs (e.g. MACD before the slow EMA is ready) are skipped by pandas
+            if math.isnan(x):
+                return math.nan
+            self.value = x
+        else:
+            self.value = (1 - self.alpha) * self.value + self.alpha * x
+        self.count += 1
+        return self.value if self.count >= self.min_periods else math.nan
+
+    def save(self) -> Tuple:
+        return self.value, self.count
+
+    def restore(self, saved: Tuple):
+        self.value, self.count = saved
+
+
+class _RollingState:
+    """Rolling mean and population std over a fixed window (sliding Welford update)."""
+
+    def __init__(self, window: int):
+        self.window = window
+        self.values = deque()
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.slides = 0
+
+    def update(self, x: float) -> Tuple[float, float]:
+        self.values.append(x)
+        if len(self.values) > self.window:
+            old = self.values.popleft()
+            old_mean = self.mean
+            self.mean += (x - old) / self.window
+            self.m2 += (x - old) * (x - self.mean + old - old_mean)
+            self.slides += 1
+            # re-anchor once per window so rounding error cannot drift over days of uptime
+            if self.slides >= self.window:
+                self._resync()
+        else:
+            delta = x - self.mean
+            self.mean += delta / len(self.values)
+            self.m2 += delta * (x - self.mean)
+
+        if len(self.values) < self.window:
+            return math.nan, math.nan
+        return self.mean, math.sqrt(max(self.m2, 0.0) / self.window)
+
+    def _resync(self):
+        self.mean = sum(self.values) / self.window
+        self.m2 = sum((v - self.mean) ** 2 for v in self.values)
+        self.slides = 0
+
+    def save(self) -> Tuple:
+        # the only window value an update can drop is the oldest one
+        oldest = self.values[0] if len(self.values) >= self.window else None
+        return self.mean, self.m2, self.slides, oldest
+
+    def restore(self, saved: Tuple):
+        self.mean, self.m2, self.slides, oldest = saved
+        self.values.pop()
+        if oldest is not None:
+            self.values.appendleft(oldest)
+
+
+class _RSIState:
+    """Wilder RSI as computed by ta.momentum.RSIIndicator."""
+
+    def __init__(self, window: int):
+        self.prev_close = None
+        self.up = _EMAState(alpha=1 / window, min_periods=window)
+        self.down = _EMAState(alpha=1 / window, min_periods=window)
+
+    def update(self, close: float) -> float:
+        diff = math.nan if self.prev_close is None else close - self.prev_close
+        self.prev_close = close
+        # NaN compares False, so the first bar contributes 0 to both averages like in `ta`
+        ema_up = self.up.update(diff if diff > 0 else 0.0)
+        ema_down = self.down.update(-diff if diff < 0 else 0.0)
+        if math.isnan(ema_down):
+            return math.nan
+        if ema_down == 0:
+            return 100.0
+        return 100 - (100 / (1 + ema_up / ema_down))
+
+    def save(self) -> Tuple:
+        return self.prev_close, self.up.save(), self.down.save()
+
+    def restore(self, saved: Tuple):
+        self.prev_close, up, down = saved
+        self.up.restore(up)
+        self.down.restore(down)
+
+
+class _ATRState:
+    """Wilder ATR as computed by ta.volatility.AverageTrueRange (0 during warm-up)."""
+
+    def __init__(self, window: int):
+        self.window = window
+        self.prev_close = None
+        self.count = 0
+        self.tr_sum = 0.0
+        self.value = 0.0
+
+    def update(self, high: float, low: float, close: float) -> float:
+        if self.prev_close is None:
+            true_range = high - low
+        else:
+            true_range = max(high - low, abs(high - self.prev_close), abs(low - self.prev_close))
+        self.prev_close = close
+        self.count += 1
+
+        if self.count < self.window:
+            self.tr_sum += true_range
+            return 0.0
+        if self.count == self.window:
+            self.value = (self.tr_sum + true_range) / self.window
+        else:
+            self.value = (self.value * (self.window - 1) + true_range) / self.window
+        return self.value
+
+    def save(self) -> Tuple:
+        return self.prev_close, self.count, self.tr_sum, self.value
+
+    def restore(self, saved: Tuple):
+        self.prev_close, self.count, self.tr_sum, self.value = saved
+
+
+class _ROCState:
+    def __init__(self, window: int):
+        self.closes = deque(maxlen=window + 1)
+
+    def update(self, close: float) -> float:
+        self.closes.append(close)
+        if len(self.closes) < self.closes.maxlen:
+            return math.nan
+        return (close - self.closes[0]) / self.closes[0] * 100
+
+    def save(self) -> Tuple:
+        return (self.closes[0] if len(self.closes) == self.closes.maxlen else None,)
+
+    def restore(self, saved: Tuple):
+        (oldest,) = saved
+        self.closes.pop()
+        if oldest is not None:
+            self.closes.appendleft(oldest)
+
+
+class IncrementalIndicators:
+    """
+    Stateful counterpart of TechnicalIndicators.calculate_technical_indicators.
+
+    Bars are appended one at a time and every indicator is updated from its
+    recursive state in constant time. Re-sending the latest timestamp (the
+    vendor's still-forming bar) rolls that bar back and applies it again; only
+    the scalar state the latest bar changed is saved for that, so a revisable
+    update stays O(1) as well.
+
+    The recursive indicators (EMA, RSI, MACD, ATR) are seeded by the first
+    bar fed, so the values equal the batch function over the bars since
+    `first_timestamp`, not over a later window of them.
+    """
+
+    SMA_WINDOWS = (10, 20, 50, 100)
+    EMA_WINDOWS = (10, 20, 50, 100)
+
+    def __init__(self, sma=False, ema=True, rsi=True, macd=True, roc=True, bbands=True, atr=True, max_bars: int = 1000):
+        self.sma = sma
+        self.ema = ema
+        self.rsi = rsi
+        self.macd = macd
+        self.roc = roc
+        self.bbands = bbands
+        self.atr = atr
+        self.max_bars = max_bars
+
+        self.columns = self._get_columns()
+        self.history: Dict[str, List[float]] = {column: [] for column in self.columns}
+        self.timestamps: List[pd.Timestamp] = []
+        self.first_timestamp = None
+        self.index_name = None
+
+        self._state = self._init_state()
+        self._states = [state for value in self._state.values() for state in (value.values() if isinstance(value, dict) else [value])]
+        # saved state of every indicator before the latest bar; None when that bar cannot be revised
+        self._snapshot = None
+
+    def _get_columns(self) -> List[str]:
+        # same column order as the batch function
+        columns = ["Open", "High", "Low", "Close"]
+        if self.sma:
+            columns += [f"SMA{window}" for window in self.SMA_WINDOWS]
+        if self.ema:
+            columns += [f"EMA{window}" for window in self.EMA_WINDOWS]
+        if self.rsi:
+            columns += ["RSI14"]
+        if self.macd:
+            columns += ["MACD", "MACD_Signal", "MACD_Diff"]
+        if self.roc:
+            columns += ["ROC12"]
+        if self.bbands:
+            columns += ["BB_Mid", "BB_Upper", "BB_Lower"]
+        if self.atr:
+            columns += ["ATR"]
+        return columns
+
+    def _init_state(self) -> Dict:
+        state = {}
+        if self.sma:
+            state["sma"] = {window: _RollingState(window) for window in self.SMA_WINDOWS}
+        if self.ema:
+            state["ema"] = {window: _EMAState(alpha=2 / (window + 1), min_periods=window) for window in self.EMA_WINDOWS}
+        if self.rsi:
+            state["rsi"] = _RSIState(window=14)
+        if self.macd:
+            state["macd_fast"] = _EMAState(alpha=2 / 13, min_periods=12)
+            state["macd_slow"] = _EMAState(alpha=2 / 27, min_periods=26)
+            state["macd_signal"] = _EMAState(alpha=2 / 10, min_periods=9)
+        if self.roc:
+            state["roc"] = _ROCState(window=12)
+        if self.bbands:
+            state["bbands"] = _RollingState(window=20)
+        if self.atr:
+            state["atr"] = _ATRState(window=14)
+        return state
+
+    @property
+    def last_timestamp(self):
+        return self.timestamps[-1] if self.timestamps else None
+
+    def _step(self, open_: float, high: float, low: float, close: float) -> Dict[str, float]:
+        state = self._state
+        row = {"Open": open_, "High": high, "Low": low, "Close": close}
+
+        if self.sma:
+            for window, rolling in state["sma"].items():
+                row[f"SMA{window}"], _ = rolling.update(close)
+        if self.ema:
+            for window, ema in state["ema"].items():
+                row[f"EMA{window}"] = ema.update(close)
+        if self.rsi:
+            row["RSI14"] = state["rsi"].update(close)
+        if self.macd:
+            macd = state["macd_fast"].update(close) - state["macd_slow"].update(close)
+            signal = state["macd_signal"].update(macd)
+            row["MACD"] = macd
+            row["MACD_Signal"] = signal
+            row["MACD_Diff"] = macd - signal
+        if self.roc:
+            row["ROC12"] = state["roc"].update(close)
+        if self.bbands:
+            mid, std = state["bbands"].update(close)
+            row["BB_Mid"] = mid
+            row["BB_Upper"] = mid + 2 * std
+            row["BB_Lower"] = mid - 2 * std
+        if self.atr:
+            row["ATR"] = state["atr"].update(high, low, close)
+
+        return row
+
+    def update(self, timestamp, open_: float, high: float, low: float, close: float, revisable: bool = True) -> Dict[str, float]:
+        """
+        Append one bar (or revise the latest one) and return its indicator values.
+
+        Pass revisable=False for closed bars: no rollback state is saved for them.
+        """
+        last_timestamp = self.last_timestamp
+        if last_timestamp is not None and timestamp < last_timestamp:
+            raise ValueError(f"Bar at {timestamp} is older than the latest bar {last_timestamp}")
+
+        if last_timestamp is not None and timestamp == last_timestamp:
+            if self._snapshot is None:
+                raise ValueError(f"Bar at {timestamp} was added as closed and cannot be revised")
+            for state, saved in zip(self._states, self._snapshot):
+                state.restore(saved)
+            self.timestamps.pop()
+            for values in self.history.values():
+                values.pop()
+
+        if self.first_timestamp is None:
+            self.first_timestamp = timestamp
+        self._snapshot = [state.save() for state in self._states] if revisable else None
+        row = self._step(float(open_), float(high), float(low), float(close))
+
+        self.timestamps.append(timestamp)
+        for column in self.columns:
+            self.history[column].append(row[column])
+        self._trim_history()
+
+        return row
+
+    def _trim_history(self):
+        # trim in chunks so appends stay amortized O(1)
+        if len(self.timestamps) > 2 * self.max_bars:
+            del self.timestamps[:-self.max_bars]
+            for values in self.history.values():
+                del values[:-self.max_bars]
+
+    def extend(self, df: pd.DataFrame):
+        """Feed every bar of an OHLC frame in order; only the last one stays revisable."""
+        if self.index_name is None:
+            self.index_name = df.index.name
+        last = len(df) - 1
+        bars = zip(
+            df.index,
+            df["Open"].to_numpy(dtype=float).tolist(),
+            df["High"].to_numpy(dtype=float).tolist(),
+            df["Low"].to_numpy(dtype=float).tolist(),
+            df["Close"].to_numpy(dtype=float).tolist(),
+        )
+        for position, (timestamp, open_, high, low, close) in enumerate(bars):
+            self.update(timestamp, open_, high, low, close, revisable=position == last)
+
+    def can_extend(self, df: pd.DataFrame) -> bool:
+        """True if `df` continues the stored history, i.e. it still contains our latest bar."""
+        return self.last_timestamp is not None and self.last_timestamp in df.index
+
+    def to_frame(self, size: int = None) -> pd.DataFrame:
+        timestamps = self.timestamps if size is None else self.timestamps[-size:]
+        data = {
+            column: values if size is None else values[-size:]
+            for column, values in self.history.items()
+        }
+        df = pd.DataFrame(data, index=pd.DatetimeIndex(timestamps, name=self.index_name))
+        df["Date"] = df.index
+        return df
+
+
+class IncrementalIndicatorEngine:
+    """
+    Keeps one IncrementalIndicators state per (currency_pair, interval, indicator set).
+
+    `sync` only feeds the bars that are new since the previous call while the
+    frame keeps its first bar (a revised forming bar, or bars appended to a
+    growing frame), at one O(1) update per indicator. A frame that starts
+    elsewhere, e.g. a fixed-size window that slid, reseeds the state from that
+    frame, so the values always equal calculate_technical_indicators over it.
+    """
+
+    def __init__(self, max_bars: int = 1000, **indicator_flags):
+        self.max_bars = max_bars
+        # IncrementalIndicators' defaults, overridden by the engine's flags
+        self.indicator_flags = {"sma": False, "ema": True, "rsi": True, "macd": True, "roc": True, "bbands": True, "atr": True,
+                                **indicator_flags}
+        self._states: Dict[Tuple, IncrementalIndicators] = {}
+
+    def _flags(self, analysis_types: List[str] = None) -> Dict[str, bool]:
+        return self.indicator_flags if analysis_types is None else analysis_flags(analysis_types)
+
+    @staticmethod
+    def _key(currency_pair: str, interval: str, flags: Dict[str, bool]) -> Tuple:
+        return currency_pair, interval, tuple(sorted(group for group, enabled in flags.items() if enabled))
+
+    def get_state(self, currency_pair: str, interval: str, analysis_types: List[str] = None) -> IncrementalIndicators:
+        return self._states.get(self._key(currency_pair, interval, self._flags(analysis_types)))
+
+    def reset(self, currency_pair: str = None, interval: str = None):
+        if currency_pair is None:
+            self._states.clear()
+        else:
+            for key in [key for key in self._states if key[:2] == (currency_pair, interval)]:
+                del self._states[key]
+
+    def sync(self, currency_pair: str, interval: str, df: pd.DataFrame, analysis_types: List[str] = None) -> pd.DataFrame:
+        """
+        Bring the state up to date with `df` and return the indicator frame for the bars of `df`.
+
+        The values equal calculate_technical_indicators(df) within float tolerance.
+        `analysis_types` (e.g. ["rsi"]) restricts the state to the indicators those analyses read.
+        """
+        if not isinstance(df.index, pd.DatetimeIndex):
+            raise ValueError("DataFrame index must be a DateTimeIndex")
+
+        flags = self._flags(analysis_types)
+        key = self._key(currency_pair, interval, flags)
+        state = self._states.get(key)
+
+        if state is None or state.first_timestamp != df.index[0] or not state.can_extend(df):
+            # first call, a gap or a different window: the recursive indicators have to be seeded from its first bar
+            state = IncrementalIndicators(max_bars=max(self.max_bars, len(df)), **flags)
+            self._states[key] = state
+            state.extend(df)
+        else:
+            state.max_bars = max(state.max_bars, len(df))
+            state.extend(df.loc[df.index >= state.last_timestamp])
+
+        return state.to_frame(size=len(df))
+
+
+INDICATOR_ENGINE = IncrementalIndicatorEngine()
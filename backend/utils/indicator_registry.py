@@ -0,0 +1,190 @@
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Tuple
+
+
+@dataclass(frozen=True)
+class IndicatorSpec:
+    """
+    Declarative description of one indicator.
+
+    `params` holds the kind-specific extras: (fast, signal) for "macd" where
+    `window` is the slow span, and (window_dev,) for "bbands".
+    """
+    kind: str
+    window: int
+    source: str = "Close"
+    params: Tuple = ()
+
+    @property
+    def columns(self) -> List[str]:
+        if self.kind == "macd":
+            return ["MACD", "MACD_Signal", "MACD_Diff"]
+        if self.kind == "bbands":
+            return ["BB_Mid", "BB_Upper", "BB_Lower"]
+        if self.kind == "atr":
+            return ["ATR"]
+        prefix = self.kind.upper()
+        suffix = "" if self.source == "Close" else f"_{self.source}"
+        return [f"{prefix}{self.window}{suffix}"]
+
+
+# --- Registry: the indicator groups behind the flags of calculate_technical_indicators, in output order ---
+INDICATOR_REGISTRY: Dict[str, List[IndicatorSpec]] = {
+    "sma": [IndicatorSpec("sma", window) for window in (10, 20, 50, 100)],
+    "ema": [IndicatorSpec("ema", window) for window in (10, 20, 50, 100)],
+    "rsi": [IndicatorSpec("rsi", 14)],
+    "macd": [IndicatorSpec("macd", 26, params=(12, 9))],
+    "roc": [IndicatorSpec("roc", 12)],
+    "bbands": [IndicatorSpec("bbands", 20, params=(2,))],
+    "atr": [IndicatorSpec("atr", 14)],
+}
+
+# Indicator groups each analysis type (chart + context) reads
+ANALYSIS_INDICATORS: Dict[str, List[str]] = {
+    "ema": ["ema"],
+    "rsi": ["rsi"],
+    "macd": ["macd"],
+    "atr": ["atr"],
+    "normal": [],
+}
+
+
+def resolve_specs(groups: Iterable[str]) -> List[IndicatorSpec]:
+    """Specs for the requested registry groups, deduplicated and in registry order."""
+    groups = set(groups)
+    unknown = groups - set(INDICATOR_REGISTRY)
+    if unknown:
+        raise ValueError(f"Unknown indicator groups: {sorted(unknown)}")
+
+    specs = []
+    for group, group_specs in INDICATOR_REGISTRY.items():
+        if group in groups:
+            specs.extend(spec for spec in group_specs if spec not in specs)
+    return specs
+
+
+def specs_for_analysis(analysis_types: Iterable[str]) -> List[IndicatorSpec]:
+    groups = []
+    for analysis_type in analysis_types:
+        if analysis_type not in ANALYSIS_INDICATORS:
+            raise ValueError(f"Invalid analysis type: {analysis_type}. Choose from {list(ANALYSIS_INDICATORS)}.")
+        groups.extend(ANALYSIS_INDICATORS[analysis_type])
+    return resolve_specs(groups)
+
+
+def analysis_flags(analysis_types: Iterable[str]) -> Dict[str, bool]:
+    """calculate_technical_indicators-style group flags for what the analyses read."""
+    groups = {spec.kind for spec in specs_for_analysis(analysis_types)}
+    return {group: group in groups for group in INDICATOR_REGISTRY}
+
+
+class IndicatorPlanner:
+    """
+    Computes a list of IndicatorSpecs over one OHLC frame.
+
+    Intermediates (EMAs of a given span, rolling means/stds, true range, ...)
+    are memoized by (operation, source, window), so e.g. SMA20 and the
+    Bollinger middle band share one rolling mean, and an EMA12 spec reuses
+    the fast MACD EMA. Every kernel is a vectorized pandas operation giving
+    the same values as `ta`; stacked multi-series work goes through
+    BatchIndicators instead.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self._cache: Dict[Tuple, pd.Series] = {}
+
+    @property
+    def computed(self) -> List[Tuple]:
+        """Keys of the intermediates computed so far."""
+        return list(self._cache)
+
+    def _memo(self, key: Tuple, compute) -> pd.Series:
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    def source(self, column: str) -> pd.Series:
+        return self._memo(("source", column), lambda: self.df[column].astype(float))
+
+    def ema(self, column: str, window: int) -> pd.Series:
+        return self._memo(("ema", column, window),
+                          lambda: self.source(column).ewm(span=window, min_periods=window, adjust=False).mean())
+
+    def rolling_mean(self, column: str, window: int) -> pd.Series:
+        return self._memo(("rolling_mean", column, window),
+                          lambda: self.source(column).rolling(window, min_periods=window).mean())
+
+    def rolling_std(self, column: str, window: int) -> pd.Series:
+        # population std, as in ta's Bollinger Bands
+        return self._memo(("rolling_std", column, window),
+                          lambda: self.source(column).rolling(window, min_periods=window).std(ddof=0))
+
+    def true_range(self) -> pd.Series:
+        def compute():
+            high, low, prev_close = self.source("High"), self.source("Low"), self.source("Close").shift(1)
+            # the missing previous close of the first bar is skipped, leaving high - low
+            return pd.concat([high - low, (high - prev_close).abs(), (low - prev_close).abs()], axis=1).max(axis=1)
+        return self._memo(("true_range",), compute)
+
+    def macd_line(self, column: str, fast: int, slow: int) -> pd.Series:
+        return self._memo(("macd", column, fast, slow), lambda: self.ema(column, fast) - self.ema(column, slow))
+
+    def _rsi(self, column: str, window: int) -> pd.Series:
+        diff = self.source(column).diff(1)
+        # the first bar has no previous close and contributes 0, as in ta
+        up = diff.where(diff > 0, 0.0).ewm(alpha=1 / window, min_periods=window, adjust=False).mean()
+        down = (-diff.where(diff < 0, 0.0)).ewm(alpha=1 / window, min_periods=window, adjust=False).mean()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rsi = np.where(down == 0, 100.0, 100 - (100 / (1 + up / down)))
+        return pd.Series(rsi, index=diff.index).where(down.notna())
+
+    def _atr(self, window: int) -> pd.Series:
+        # Wilder smoothing seeded with the mean of the first `window` ranges, 0 during warm-up (ta's loop, vectorized)
+        tr = self.true_range()
+        atr = pd.Series(0.0, index=tr.index)
+        if len(tr) >= window:
+            seeded = tr.iloc[window - 1:].copy()
+            seeded.iloc[0] = tr.iloc[:window].mean()
+            atr.iloc[window - 1:] = seeded.ewm(alpha=1 / window, adjust=False).mean().to_numpy()
+        return atr
+
+    def compute(self, spec: IndicatorSpec) -> Dict[str, np.ndarray]:
+        column, window = spec.source, spec.window
+
+        if spec.kind == "sma":
+            values = [self.rolling_mean(column, window)]
+        elif spec.kind == "ema":
+            values = [self.ema(column, window)]
+        elif spec.kind == "rsi":
+            values = [self._memo(("rsi", column, window), lambda: self._rsi(column, window))]
+        elif spec.kind == "roc":
+            def roc():
+                prev = self.source(column).shift(window)
+                return (self.source(column) - prev) / prev * 100
+            values = [self._memo(("roc", column, window), roc)]
+        elif spec.kind == "macd":
+            fast, signal_window = spec.params
+            macd = self.macd_line(column, fast, window)
+            signal = self._memo(("macd_signal", column, fast, window, signal_window),
+                                lambda: macd.ewm(span=signal_window, min_periods=signal_window, adjust=False).mean())
+            values = [macd, signal, macd - signal]
+        elif spec.kind == "bbands":
+            (window_dev,) = spec.params
+            mid = self.rolling_mean(column, window)
+            std = self.rolling_std(column, window)
+            values = [mid, mid + window_dev * std, mid - window_dev * std]
+        elif spec.kind == "atr":
+            values = [self._memo(("atr", window), lambda: self._atr(window))]
+        else:
+            raise ValueError(f"Unknown indicator kind: {spec.kind}")
+
+        return {name: value.to_numpy() for name, value in zip(spec.columns, values)}
+
+    def run(self, specs: Iterable[IndicatorSpec]) -> Dict[str, np.ndarray]:
+        result = {}
+        for spec in specs:
+            result.update(self.compute(spec))
+        return result
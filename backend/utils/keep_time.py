@@ -1,9 +1,22 @@
+import functools
+import inspect
 import time
 
 def time_it(func):
     """
-    Decorator to time the execution of a function.
+    Decorator to time the execution of a function, awaiting coroutine functions.
     """
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            start_time = time.time()
+            result = await func(*args, **kwargs)
+            execution_time = time.time() - start_time
+            print(f"Execution time of {func.__name__}: {execution_time:.2f} seconds")
+            return result
+        return async_wrapper
+
+    @functools.wraps(func)
     def wrapper(*args, **kwargs):
         start_time = time.time()
         result = func(*args, **kwargs)
@@ -11,4 +24,4 @@ def time_it(func):
         execution_time = end_time - start_time
         print(f"Execution time of {func.__name__}: {execution_time:.2f} seconds")
         return result
-    return wrapper
\ No newline at end of file
+    return wrapper
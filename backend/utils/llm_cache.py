@@ -0,0 +1,179 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+from backend.utils.logger_config import get_logger
+
+logger = get_logger(__name__)
+
+# Seconds a response stays valid, by call site: the agent name a client carries, else its API method.
+# A new bar changes the chart and context, and so the key, anyway.
+CALL_SITE_TTLS = {
+    "MAAgent": 3600,
+    "RSIAgent": 3600,
+    "MACDAgent": 3600,
+    "ATRAgent": 3600,
+    "AggAgent": 3600,
+    "CalenderAgent": 4 * 3600,
+    # an article reads the same until it drops off the news list
+    "SummaryAgent": 12 * 3600,
+}
+DEFAULT_TTL = 3600
+
+
+def _stable(value: Any) -> Any:
+    """JSON-able form of a request part: bytes by digest, pydantic models and SDK types by their dump."""
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return {"sha256": hashlib.sha256(bytes(value)).hexdigest()}
+    if isinstance(value, dict):
+        return {str(k): _stable(v) for k, v in sorted(value.items(), key=lambda item: str(item[0]))}
+    if isinstance(value, (list, tuple)):
+        return [_stable(v) for v in value]
+    if isinstance(value, type) and hasattr(value, "model_json_schema"):
+        return {"schema": value.model_json_schema()}
+    if hasattr(value, "model_dump"):
+        return _stable(value.model_dump(mode="json", exclude_none=True))
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+def request_key(call_site: str, **request) -> str:
+    """Content address of an LLM request: sha256 over the call site and every request part."""
+    payload = json.dumps({"call_site": call_site, "request": _stable(request)}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class LLMCache:
+    """
+    SQLite store of LLM responses by request key.
+
+    Entries expire after the TTL of their call site (CALL_SITE_TTLS, or the ttl
+    passed to put) and the store is pruned to `max_items`, least recently used
+    first. A hit only reads: access times are kept in memory and written in
+    one batch on the next put or every `flush_every` hits. Disk errors are
+    logged and treated as misses, so the cache never fails an LLM call.
+    Coroutines use aget/aput, which run the SQLite I/O in a worker thread.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_items: int = 5000, flush_every: int = 64):
+        self.path = path
+        self.max_items = max_items
+        self.flush_every = flush_every
+        self._lock = threading.Lock()
+        self._conn = None
+        self._accessed: Dict[str, float] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.by_call_site: Dict[str, Dict[str, int]] = {}
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if self.path and os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._conn = sqlite3.connect(self.path or ":memory:", timeout=10, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, call_site TEXT, response TEXT, created REAL, expires REAL, accessed REAL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        return self._conn
+
+    def _count(self, call_site: str, outcome: str):
+        counts = self.by_call_site.setdefault(call_site, {"hits": 0, "misses": 0})
+        counts[outcome] += 1
+
+    def get(self, call_site: str, key: str) -> Optional[str]:
+        now = time.time()
+        row = None
+        with self._lock:
+            try:
+                conn = self._connect()
+                row = conn.execute("SELECT response, expires FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is not None and row[1] < now:
+                    # expired rows are deleted by the next put's prune
+                    self.expired += 1
+                    row = None
+                elif row is not None:
+                    self._accessed[key] = now
+                    if len(self._accessed) >= self.flush_every:
+                        self._flush(conn)
+                        conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"LLM cache read failed for {call_site}: {e}")
+                row = None
+
+            if row is None:
+                self.misses += 1
+                self._count(call_site, "misses")
+                return None
+            self.hits += 1
+            self._count(call_site, "hits")
+            return row[0]
+
+    def put(self, call_site: str, key: str, response: str, ttl: Optional[float] = None):
+        now = time.time()
+        ttl = ttl if ttl is not None else CALL_SITE_TTLS.get(call_site, DEFAULT_TTL)
+        with self._lock:
+            try:
+                conn = self._connect()
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, call_site, response, created, expires, accessed) VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, call_site, response, now, now + ttl, now),
+                )
+                self._accessed.pop(key, None)
+                self._flush(conn)
+                self._prune(conn, now)
+                conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"LLM cache write failed for {call_site}: {e}")
+
+    async def aget(self, call_site: str, key: str) -> Optional[str]:
+        return await asyncio.to_thread(self.get, call_site, key)
+
+    async def aput(self, call_site: str, key: str, response: str, ttl: Optional[float] = None):
+        await asyncio.to_thread(self.put, call_site, key, response, ttl)
+
+    def _flush(self, conn: sqlite3.Connection):
+        """Write the access times of the hits since the last flush; callers hold self._lock and commit."""
+        if self._accessed:
+            conn.executemany("UPDATE responses SET accessed = ? WHERE key = ?",
+                             [(accessed, key) for key, accessed in self._accessed.items()])
+            self._accessed.clear()
+
+    def _prune(self, conn: sqlite3.Connection, now: float):
+        conn.execute("DELETE FROM responses WHERE expires < ?", (now,))
+        (count,) = conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+        if count > self.max_items:
+            conn.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY accessed LIMIT ?)",
+                (count - self.max_items,),
+            )
+
+    def clear(self):
+        with self._lock:
+            self._accessed.clear()
+            try:
+                self._connect().execute("DELETE FROM responses")
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Could not clear the LLM cache: {e}")
+
+    def metrics(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "by_call_site": {call_site: dict(counts) for call_site, counts in self.by_call_site.items()},
+        }
+
+
+LLM_CACHE = LLMCache(path=os.path.join("data", "llm_cache.sqlite3"))
@@ -0,0 +1,86 @@
+import asyncio
+import threading
+import weakref
+from typing import Any, Callable, Dict, Optional, Tuple
+from google import genai
+from openai import AsyncOpenAI, OpenAI
+from backend.utils.logger_config import get_logger
+
+logger = get_logger(__name__)
+
+PERPLEXITY_BASE_URL = "https://api.perplexity.ai"
+
+
+class _Entry:
+    def __init__(self, client: Any, loop: Optional[asyncio.AbstractEventLoop]):
+        self.client = client
+        # async SDK clients hold connection pools bound to the loop they were first used on
+        self.loop_ref = weakref.ref(loop) if loop is not None else None
+
+    def alive(self) -> bool:
+        if self.loop_ref is None:
+            return True
+        loop = self.loop_ref()
+        return loop is not None and not loop.is_closed()
+
+
+class ClientRegistry:
+    """
+    Process-wide SDK clients keyed by (provider, API key), so agents and pipelines
+    share connection pools and TLS sessions instead of building a client per call.
+
+    Async clients are additionally scoped to the running event loop: their HTTP
+    pools cannot cross loops, and the Streamlit app runs each request in its own
+    asyncio.run. Entries of closed loops are dropped on the next lookup. Creation
+    holds a lock and never awaits, so concurrent first calls build one client.
+    """
+
+    def __init__(self):
+        self._clients: Dict[Tuple, _Entry] = {}
+        self._lock = threading.Lock()
+        self.created = 0
+
+    @staticmethod
+    def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+        try:
+            return asyncio.get_running_loop()
+        except RuntimeError:
+            return None
+
+    def get(self, provider: str, api_key: str, factory: Callable[[], Any], loop_scoped: bool = True) -> Any:
+        loop = self._running_loop() if loop_scoped else None
+        key = (provider, api_key, id(loop) if loop is not None else None)
+        with self._lock:
+            for stale in [k for k, entry in self._clients.items() if not entry.alive()]:
+                del self._clients[stale]
+            entry = self._clients.get(key)
+            # a new loop can reuse the id of a closed one
+            if entry is None or (entry.loop_ref is not None and entry.loop_ref() is not loop):
+                entry = _Entry(factory(), loop)
+                self._clients[key] = entry
+                self.created += 1
+                logger.debug(f"Created {provider} client ({self.created} total)")
+            return entry.client
+
+    def gemini(self, api_key: str) -> genai.Client:
+        return self.get("gemini", api_key, lambda: genai.Client(api_key=api_key))
+
+    def openai(self, api_key: str) -> AsyncOpenAI:
+        return self.get("openai", api_key, lambda: AsyncOpenAI(api_key=api_key))
+
+    def perplexity(self, api_key: str) -> AsyncOpenAI:
+        return self.get("perplexity", api_key, lambda: AsyncOpenAI(api_key=api_key, base_url=PERPLEXITY_BASE_URL))
+
+    def perplexity_sync(self, api_key: str) -> OpenAI:
+        return self.get("perplexity_sync", api_key, lambda: OpenAI(api_key=api_key, base_url=PERPLEXITY_BASE_URL), loop_scoped=False)
+
+    def clear(self):
+        with self._lock:
+            self._clients.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"clients": len(self._clients), "created": self.created}
+
+
+LLM_CLIENTS = ClientRegistry()
@@ -0,0 +1,310 @@
+import asyncio
+import bisect
+import random
+import threading
+import time
+import weakref
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+from backend.utils.rate_limiter import RATE_LIMITER, PRIORITY_DEFAULT, is_rate_limit_error
+from backend.utils.logger_config import get_logger
+
+logger = get_logger(__name__)
+
+# Calls in flight per provider, across every agent and pipeline of the process
+PROVIDER_CONCURRENCY = {"gemini": 8, "openai": 16, "perplexity": 4}
+DEFAULT_CONCURRENCY = 8
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.5, 1, 2, 5, 10, 20, 40, 80, 160)
+
+
+@dataclass
+class RetryPolicy:
+    """Attempts per call, full-jitter exponential backoff between them and the timeout of each attempt."""
+    max_attempts: int = 4
+    base_delay: float = 1.0
+    max_delay: float = 30.0
+    timeout: Optional[float] = 120.0
+
+    def __post_init__(self):
+        if self.max_attempts < 1:
+            raise ValueError(f"max_attempts must be at least 1, got {self.max_attempts}")
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+DEFAULT_POLICY = RetryPolicy()
+
+
+@dataclass
+class Fallback:
+    """Where a hedged duplicate goes: another model, another API key, or both (None keeps the primary's)."""
+    model: Optional[str] = None
+    api_key: Optional[str] = None
+
+
+@dataclass
+class HedgePolicy:
+    """
+    Fire the next fallback when a call has not returned within the `quantile` of
+    recent latencies of its call site (`initial_delay` until `min_samples` are
+    seen), clamped to [min_delay, max_delay]. A failed call fires the next one at once.
+    """
+    fallbacks: List[Fallback] = field(default_factory=list)
+    quantile: float = 0.9
+    initial_delay: float = 30.0
+    min_delay: float = 2.0
+    max_delay: float = 120.0
+    min_samples: int = 20
+
+
+@dataclass
+class LLMResult:
+    """
+    Outcome of one governed call: the value, or the error that ended it after `attempts` tries.
+
+    `latency` is the wall time of the whole call; `queue_delay` the part spent waiting
+    for the provider semaphore and rate-limit credits, and `network` the part spent
+    in the SDK call itself, both summed over attempts.
+    """
+    provider: str
+    call_site: str
+    ok: bool
+    value: Any = None
+    error: Optional[str] = None
+    error_type: Optional[str] = None
+    status: Optional[int] = None
+    attempts: int = 0
+    latency: float = 0.0
+    queue_delay: float = 0.0
+    network: float = 0.0
+
+    def unwrap(self) -> Any:
+        if not self.ok:
+            raise LLMCallError(self)
+        return self.value
+
+
+class LLMCallError(Exception):
+    def __init__(self, result: LLMResult):
+        self.result = result
+        super().__init__(
+            f"{result.provider} {result.call_site} failed after {result.attempts} attempt(s): "
+            f"{result.error_type}{f' ({result.status})' if result.status else ''}: {result.error}"
+        )
+
+
+def error_status(error: Exception) -> Optional[int]:
+    for attribute in ("status_code", "code", "status"):
+        status = getattr(error, attribute, None)
+        if isinstance(status, int):
+            return status
+    return 429 if is_rate_limit_error(error) else None
+
+
+def is_retryable(error: Exception) -> bool:
+    """Quota rejections, server errors, timeouts and dropped connections are worth another attempt."""
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    status = error_status(error)
+    if status is not None:
+        return status == 429 or status >= 500
+    # SDK transport errors (openai.APIConnectionError, httpx.TransportError, ...) carry no status
+    return any(word in type(error).__name__ for word in ("Connection", "Timeout", "Transport"))
+
+
+class LatencyHistogram:
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS, window: int = 256):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+        # exact recent samples, for percentiles finer than the buckets
+        self.recent = deque(maxlen=window)
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+        self.recent.append(seconds)
+
+    def recent_quantile(self, q: float) -> Optional[float]:
+        if not self.recent:
+            return None
+        samples = sorted(self.recent)
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-quantile; inf when it lies past the last bucket."""
+        if not self.count:
+            return None
+        seen = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            seen += count
+            if seen >= q * self.count:
+                return bound
+        return float("inf")
+
+    def snapshot(self) -> Dict:
+        labels = [f"<={bound}s" for bound in self.buckets] + [f">{self.buckets[-1]}s"]
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else None,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+class LLMExecutor:
+    """
+    Runs every LLM call of the process through one governor.
+
+    Each provider has a semaphore bounding its calls in flight (per event loop,
+    as asyncio primitives cannot cross loops). Each attempt takes a credit from
+    RATE_LIMITER before it queues for the semaphore, so a call waiting out the
+    quota never holds a slot, and runs under the policy's timeout; 429s, 5xx,
+    timeouts and connection errors are retried with full-jitter exponential
+    backoff, slept outside the semaphore. Latency of every attempt is kept in a
+    histogram per (provider, call site).
+    """
+
+    def __init__(self, concurrency: Dict[str, int] = None, policy: RetryPolicy = DEFAULT_POLICY):
+        self.concurrency = dict(PROVIDER_CONCURRENCY if concurrency is None else concurrency)
+        self.policy = policy
+        self._semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._stats: Dict[Tuple[str, str], Dict] = {}
+
+    def _semaphore(self, provider: str) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            semaphores = self._semaphores.setdefault(loop, {})
+            if provider not in semaphores:
+                semaphores[provider] = asyncio.Semaphore(self.concurrency.get(provider, DEFAULT_CONCURRENCY))
+            return semaphores[provider]
+
+    def _entry(self, provider: str, call_site: str) -> Dict:
+        # callers hold self._lock
+        return self._stats.setdefault((provider, call_site), {
+            "calls": 0, "ok": 0, "retries": 0, "failures": 0, "hedges": 0, "hedge_wins": 0,
+            "latency": LatencyHistogram(),
+        })
+
+    def _record(self, provider: str, call_site: str, latency: float, outcome: str):
+        with self._lock:
+            stats = self._entry(provider, call_site)
+            stats["latency"].observe(latency)
+            stats[outcome] += 1
+
+    async def run_result(self, provider: str, call_site: str, func: Callable[[], Awaitable], key: str = None,
+                         priority: int = PRIORITY_DEFAULT, policy: RetryPolicy = None) -> LLMResult:
+        """Call the coroutine function `func` under the governor; never raises for call errors."""
+        policy = policy or self.policy
+        semaphore = self._semaphore(provider)
+        started = time.monotonic()
+        queue_delay = network = 0.0
+        with self._lock:
+            self._entry(provider, call_site)["calls"] += 1
+
+        for attempt in range(1, policy.max_attempts + 1):
+            queued = time.monotonic()
+            await RATE_LIMITER.acquire(provider, key=key, priority=priority)
+            async with semaphore:
+                attempt_started = time.monotonic()
+                queue_delay += attempt_started - queued
+                try:
+                    value = await asyncio.wait_for(func(), timeout=policy.timeout)
+                except Exception as e:
+                    error = e
+                    if is_rate_limit_error(e):
+                        RATE_LIMITER.drain(provider, key=key)
+                else:
+                    elapsed = time.monotonic() - attempt_started
+                    self._record(provider, call_site, elapsed, "ok")
+                    return LLMResult(provider, call_site, ok=True, value=value, attempts=attempt,
+                                     latency=time.monotonic() - started, queue_delay=queue_delay,
+                                     network=network + elapsed)
+
+            elapsed = time.monotonic() - attempt_started
+            network += elapsed
+            retry = attempt < policy.max_attempts and is_retryable(error)
+            self._record(provider, call_site, elapsed, "retries" if retry else "failures")
+            if not retry:
+                break
+            delay = policy.backoff(attempt)
+            logger.warning(f"{provider} {call_site} attempt {attempt} failed ({type(error).__name__}: {error}); retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+        return LLMResult(provider, call_site, ok=False, error=str(error), error_type=type(error).__name__,
+                         status=error_status(error), attempts=attempt, latency=time.monotonic() - started,
+                         queue_delay=queue_delay, network=network)
+
+    async def run(self, provider: str, call_site: str, func: Callable[[], Awaitable], key: str = None,
+                  priority: int = PRIORITY_DEFAULT, policy: RetryPolicy = None) -> Any:
+        """Like run_result, but returns the value and raises LLMCallError when the call failed."""
+        result = await self.run_result(provider, call_site, func, key=key, priority=priority, policy=policy)
+        return result.unwrap()
+
+    def hedge_delay(self, provider: str, call_site: str, policy: HedgePolicy) -> float:
+        with self._lock:
+            latency = self._entry(provider, call_site)["latency"]
+            delay = latency.recent_quantile(policy.quantile) if len(latency.recent) >= policy.min_samples else None
+        if delay is None:
+            delay = policy.initial_delay
+        return min(policy.max_delay, max(policy.min_delay, delay))
+
+    async def hedge(self, provider: str, call_site: str, calls: Sequence[Callable[[], Awaitable]], policy: HedgePolicy) -> Any:
+        """
+        Run the coroutine functions `calls` as hedges of one request: the first
+        starts at once, each next one when the ones in flight are slower than
+        the hedge delay or have all failed. The first success wins and the rest
+        are cancelled; when every call fails, the last error is raised.
+        """
+        if not calls:
+            raise ValueError(f"{provider} {call_site}: hedge needs at least one call")
+        delay = self.hedge_delay(provider, call_site, policy)
+        tasks: List[asyncio.Task] = []
+        pending = set()
+        error = None
+        try:
+            for index, call in enumerate(calls):
+                if index:
+                    with self._lock:
+                        self._entry(provider, call_site)["hedges"] += 1
+                    logger.info(f"{provider} {call_site}: firing hedge {index} (hedge delay {delay:.1f}s)")
+                task = asyncio.ensure_future(call())
+                tasks.append(task)
+                pending.add(task)
+                last = index == len(calls) - 1
+                while pending:
+                    done, pending = await asyncio.wait(pending, timeout=None if last else delay,
+                                                       return_when=asyncio.FIRST_COMPLETED)
+                    if not done:
+                        break
+                    for finished in done:
+                        if finished.exception() is None:
+                            if tasks.index(finished):
+                                with self._lock:
+                                    self._entry(provider, call_site)["hedge_wins"] += 1
+                            return finished.result()
+                        error = finished.exception()
+                    if not last:
+                        break
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def metrics(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {
+                f"{provider}:{call_site}": {**{k: v for k, v in stats.items() if k != "latency"}, "latency": stats["latency"].snapshot()}
+                for (provider, call_site), stats in self._stats.items()
+            }
+
+
+LLM_EXECUTOR = LLMExecutor()
@@ -5,10 +5,15 @@ import mimetypes
 import aiofiles  # Install with: pip install aiofiles
 from google import genai
 from google.genai import types
-from openai import AsyncOpenAI
 from dotenv import load_dotenv
 from typing import List
 from pydantic import BaseModel
+from backend.utils.chart_profiles import image_mime_type
+from backend.utils.llm_cache import LLMCache, request_key
+from backend.utils.llm_clients import LLM_CLIENTS
+from backend.utils.rate_limiter import PRIORITY_DEFAULT
+from backend.utils.llm_executor import LLM_EXECUTOR
+from backend.utils.llm_metrics import LLMMetrics, LLM_METRICS, gemini_image_tokens
 
 class Config:
     def __init__(self, model_name: str = "gpt-4o-mini", temperature: float = 0, max_tokens: int = None):
@@ -19,55 +24,111 @@ class Config:
     def get_model(self):
         return ChatOpenAI(model=self.model_name, temperature=self.temperature, max_tokens=self.max_tokens)
 
+def cache_for(cache: LLMCache, temperature: float, cache_sampled: bool) -> LLMCache:
+    """The cache a client may use: sampled responses (temperature > 0) are only reused when the caller opts in."""
+    if cache is None or (temperature and not cache_sampled):
+        return None
+    return cache
+
+
 class OpenAIClient:
-    def __init__(self, model: str, temperature: float = 0.2, reasoning_effort: str = "medium"):
+    def __init__(self, model: str, temperature: float = 0.2, reasoning_effort: str = "medium", priority: int = PRIORITY_DEFAULT, cache: LLMCache = None,
+                 agent: str = None, metrics: LLMMetrics = LLM_METRICS, cache_sampled: bool = False):
         load_dotenv()
-        self.client = AsyncOpenAI(api_key=os.environ["OPENAI_API_KEY"])
+        self.api_key = os.environ["OPENAI_API_KEY"]
+        self.priority = priority
         self.model = model
         self.temperature = temperature
         self.reading_effort = reasoning_effort
+        # calls are recorded under this agent name for the per-run reports, and cached under its TTL
+        self.agent = agent
+        # opt-in (e.g. LLM_CACHE): identical requests are answered from here until their TTL runs out
+        self.cache = cache_for(cache, temperature, cache_sampled)
+        self.metrics = metrics
+
+    @property
+    def client(self):
+        # shared per API key and event loop, so connections are reused across agents
+        return LLM_CLIENTS.openai(self.api_key)
 
-    async def chat_completion(self, messages,  **kwargs) -> str:
+    async def chat_completion(self, messages, ttl: float = None, **kwargs) -> str:
+        key = None
+        if self.cache is not None:
+            key = request_key("openai_chat", model=self.model, temperature=self.temperature, messages=messages, kwargs=kwargs)
+            cached = await self.cache.aget(self.agent or "openai_chat", key)
+            if cached is not None:
+                self.metrics.record("openai", "openai_chat", self.model, self.agent, cache_hit=True)
+                return cached
         try:
-            response = await self.client.chat.completions.create(
+            # rate limit, concurrency, timeout and retries are handled by the executor
+            result = await LLM_EXECUTOR.run_result("openai", "openai_chat", lambda: self.client.chat.completions.create(
                 model=self.model,
                 messages=messages,
                 temperature=self.temperature,
                 **kwargs
-            )
-            return response.choices[0].message.content.strip()
+            ), key=self.api_key, priority=self.priority)
+            self.metrics.record("openai", "openai_chat", self.model, self.agent, result=result, response=result.value)
+            response = result.unwrap()
+            content = response.choices[0].message.content.strip()
+            if key is not None:
+                await self.cache.aput(self.agent or "openai_chat", key, content, ttl=ttl)
+            return content
         except Exception as e:
             print(f"Error in chat_completion: {e}")
             raise e
     
-    async def structured_chat_completion(self, messages: List, response_format: BaseModel, **kwargs) -> BaseModel:
+    async def structured_chat_completion(self, messages: List, response_format: BaseModel, ttl: float = None, **kwargs) -> BaseModel:
+        key = None
+        if self.cache is not None:
+            key = request_key("openai_structured", model=self.model, temperature=self.temperature, messages=messages,
+                              response_format=response_format, kwargs=kwargs)
+            cached = await self.cache.aget(self.agent or "openai_structured", key)
+            if cached is not None:
+                self.metrics.record("openai", "openai_structured", self.model, self.agent, cache_hit=True)
+                return response_format.model_validate_json(cached)
         try:
-            response = await self.client.beta.chat.completions.parse(
+            result = await LLM_EXECUTOR.run_result("openai", "openai_structured", lambda: self.client.beta.chat.completions.parse(
                 model=self.model,
                 messages=messages,
                 response_format=response_format,
                 temperature=self.temperature,
                 **kwargs
-            )
+            ), key=self.api_key, priority=self.priority)
+            self.metrics.record("openai", "openai_structured", self.model, self.agent, result=result, response=result.value)
+            response = result.unwrap()
 
-            return response.choices[0].message.parsed
+            parsed = response.choices[0].message.parsed
+            if key is not None and parsed is not None:
+                await self.cache.aput(self.agent or "openai_structured", key, parsed.model_dump_json(), ttl=ttl)
+            return parsed
 
         except Exception as e:
             print(f"Error in structured_chat_completion: {e}")
             raise e
 
 class GeminiClient:
-    def __init__(self, model_name: str, generation_config: dict, api_key: str, system_instruction: str = None):
+    def __init__(self, model_name: str, generation_config: dict, api_key: str, system_instruction: str = None, priority: int = PRIORITY_DEFAULT, cache: LLMCache = None,
+                 agent: str = None, metrics: LLMMetrics = LLM_METRICS, cache_sampled: bool = False):
+        self.priority = priority
+        # calls are recorded under this agent name for the per-run reports, and cached under its TTL
+        self.agent = agent
+        # opt-in (e.g. LLM_CACHE): identical requests are answered from here until their TTL runs out;
+        # Gemini samples at temperature 1 unless the config says otherwise
+        self.cache = cache_for(cache, generation_config.get("temperature", 1.0), cache_sampled)
+        self.metrics = metrics
         self.model_name = model_name
         self.generation_config = generation_config
         self.system_instruction = "You are a helpful assistant" if system_instruction is None else system_instruction
         self.generation_config["system_instruction"] = self.system_instruction
         self.api_key = api_key
-        self.client = self.get_client()
+
+    @property
+    def client(self):
+        return self.get_client()
     
     def get_client(self):
-        client = genai.Client(api_key=self.api_key)
-        return client
+        # shared per API key and event loop instead of one genai.Client per wrapper
+        return LLM_CLIENTS.gemini(self.api_key)
 
     def upload_to_gemini(self, path, mime_type=None):
         """Uploads the given file to Gemini.
@@ -84,12 +145,19 @@ class GeminiClient:
             return await f.read()
 
 
-    async def call_gemini_vision_api(self, user_message, history=[], image_path=None, image_data=None):
+    def _request_key(self, call_site: str, history, parts) -> str:
+        return request_key(call_site, model=self.model_name, config=self.generation_config, history=history, parts=parts)
+
+    def _cached_session(self, history, user_parts, response_text: str):
+        """A chat session that continues from a cached exchange as if it had just happened."""
+        history = list(history) + [
+            types.Content(role="user", parts=user_parts),
+            types.Content(role="model", parts=[types.Part.from_text(text=response_text)]),
+        ]
+        return self.client.aio.chats.create(history=history, model=self.model_name, config=self.generation_config)
+
+    async def call_gemini_vision_api(self, user_message, history=[], image_path=None, image_data=None, ttl: float = None):
         try:
-            chat_session = self.client.aio.chats.create(history=history,
-                                                    model=self.model_name,
-                                                    config=self.generation_config
-                                                    )
             parts = [user_message]
             if image_path:
                 if not os.path.exists(image_path):
@@ -99,36 +167,68 @@ class GeminiClient:
                 mime_type, _ = mimetypes.guess_type(image_path)
                 image_data = await self.read_file_async(image_path)
             elif image_data:
-                mime_type = "image/png" 
+                # charts may be PNG, WebP or JPEG depending on their output profile
+                mime_type = image_mime_type(image_data)
                 
             parts.append(
             types.Part.from_bytes(data=image_data, mime_type=mime_type)
             )
 
-            response = await chat_session.send_message(parts)
+            key = None
+            if self.cache is not None:
+                key = self._request_key("gemini_vision", history, [user_message, image_data, mime_type])
+                cached = await self.cache.aget(self.agent or "gemini_vision", key)
+                if cached is not None:
+                    self.metrics.record("gemini", "gemini_vision", self.model_name, self.agent, cache_hit=True)
+                    return cached, self._cached_session(history, [types.Part.from_text(text=user_message), parts[1]], cached)
+
+            chat_session = self.client.aio.chats.create(history=history,
+                                                    model=self.model_name,
+                                                    config=self.generation_config
+                                                    )
+            # a failed send_message leaves the session history untouched, so retries reuse it
+            result = await LLM_EXECUTOR.run_result("gemini", "gemini_vision", lambda: chat_session.send_message(parts),
+                                                   key=self.api_key, priority=self.priority)
+            self.metrics.record("gemini", "gemini_vision", self.model_name, self.agent, result=result,
+                                response=result.value, image_tokens=gemini_image_tokens(image_data))
+            response = result.unwrap()
             response_text = response.text
+            if key is not None and response_text is not None:
+                await self.cache.aput(self.agent or "gemini_vision", key, response_text, ttl=ttl)
             return response_text, chat_session
         
         except Exception as e:
             print(f"Error in call_api: {e}, api is {self.api_key}")
             raise e
     
-    async def call_gemini_api(self, user_message, history=[]):
+    async def call_gemini_api(self, user_message, history=[], ttl: float = None):
         try:
+            key = None
+            if self.cache is not None:
+                key = self._request_key("gemini_text", history, [user_message])
+                cached = await self.cache.aget(self.agent or "gemini_text", key)
+                if cached is not None:
+                    self.metrics.record("gemini", "gemini_text", self.model_name, self.agent, cache_hit=True)
+                    return cached, self._cached_session(history, [types.Part.from_text(text=user_message)], cached)
+
             chat_session = self.client.aio.chats.create(
                 history=history,
                 model=self.model_name,
                 config=self.generation_config
             )
-            response = await chat_session.send_message(user_message) # Pass user_message directly
+            result = await LLM_EXECUTOR.run_result("gemini", "gemini_text", lambda: chat_session.send_message(user_message),
+                                                   key=self.api_key, priority=self.priority)
+            self.metrics.record("gemini", "gemini_text", self.model_name, self.agent, result=result, response=result.value)
+            response = result.unwrap()
             response_text = response.text
+            if key is not None and response_text is not None:
+                await self.cache.aput(self.agent or "gemini_text", key, response_text, ttl=ttl)
             return response_text, chat_session
 
         except Exception as e:
             print(f"Error in call_gemini_api: {e}, api key is {self.api_key}")
             raise e
 
-
 async def main():
 
     generation_config = {
@@ -0,0 +1,298 @@
+import atexit
+import contextvars
+import io
+import json
+import math
+import os
+import queue
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from PIL import Image
+from backend.utils.logger_config import get_logger
+
+logger = get_logger(__name__)
+
+# USD per million (prompt, completion) tokens; the longest matching model prefix wins
+PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+    "gemini-2.0-flash": (0.10, 0.40),
+    "gemini-2.5-flash": (0.15, 0.60),
+    "gemini-2.5-pro": (1.25, 10.00),
+}
+
+# Gemini bills an image as 258 tokens, per 768px tile once either side exceeds 384px
+GEMINI_IMAGE_TOKENS = 258
+GEMINI_TILE = 768
+
+# the jsonl export is opt-in: set LLM_METRICS_DIR (e.g. data/metrics) to write calls and runs to disk
+METRICS_DIR = os.getenv("LLM_METRICS_DIR") or None
+
+
+def model_cost(model: str, prompt_tokens: Optional[int], completion_tokens: Optional[int]) -> Optional[float]:
+    matches = [prefix for prefix in PRICES if model and model.startswith(prefix)]
+    if not matches or prompt_tokens is None:
+        return None
+    prompt_price, completion_price = PRICES[max(matches, key=len)]
+    return (prompt_tokens * prompt_price + (completion_tokens or 0) * completion_price) / 1e6
+
+
+def gemini_image_tokens(image_data: bytes) -> Optional[int]:
+    """Tokens Gemini bills for an image, from its size; the SDK does not break prompt tokens down by modality."""
+    try:
+        width, height = Image.open(io.BytesIO(image_data)).size
+    except Exception:
+        return None
+    if width <= 384 and height <= 384:
+        return GEMINI_IMAGE_TOKENS
+    return math.ceil(width / GEMINI_TILE) * math.ceil(height / GEMINI_TILE) * GEMINI_IMAGE_TOKENS
+
+
+def openai_usage(response) -> Dict[str, Optional[int]]:
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return {}
+    details = getattr(usage, "prompt_tokens_details", None)
+    return {
+        "prompt_tokens": usage.prompt_tokens,
+        "completion_tokens": usage.completion_tokens,
+        "cached_tokens": getattr(details, "cached_tokens", None),
+    }
+
+
+def gemini_usage(response) -> Dict[str, Optional[int]]:
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None or usage.prompt_token_count is None:
+        return {}
+    # thinking tokens are billed as output but only show up in the total
+    if usage.total_token_count:
+        completion = usage.total_token_count - usage.prompt_token_count
+    else:
+        completion = usage.candidates_token_count
+    return {
+        "prompt_tokens": usage.prompt_token_count,
+        "completion_tokens": completion,
+        "cached_tokens": usage.cached_content_token_count,
+    }
+
+
+@dataclass
+class CallRecord:
+    """One LLM call as seen by OpenAIClient or GeminiClient."""
+    provider: str
+    call_site: str
+    model: str
+    agent: Optional[str] = None
+    run_id: Optional[str] = None
+    pipeline: Optional[str] = None
+    stage: Optional[str] = None
+    ok: bool = True
+    cache_hit: bool = False
+    error_type: Optional[str] = None
+    attempts: int = 0
+    latency: float = 0.0
+    queue_delay: float = 0.0
+    network: float = 0.0
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    cached_tokens: Optional[int] = None
+    image_tokens: Optional[int] = None
+    cost_usd: Optional[float] = None
+    timestamp: float = field(default_factory=time.time)
+
+
+class RunReport:
+    """Calls of one pipeline run, totalled per agent and per stage."""
+
+    def __init__(self, pipeline: str, **tags):
+        self.run_id = uuid.uuid4().hex[:12]
+        self.pipeline = pipeline
+        self.tags = tags
+        self.started = time.time()
+        self.finished = None
+        self.calls: List[CallRecord] = []
+
+    @staticmethod
+    def _totals(calls: List[CallRecord]) -> Dict[str, Any]:
+        def total(attribute):
+            values = [getattr(call, attribute) for call in calls if getattr(call, attribute) is not None]
+            return sum(values) if values else None
+
+        return {
+            "calls": len(calls),
+            "cache_hits": sum(call.cache_hit for call in calls),
+            "failures": sum(not call.ok for call in calls),
+            "prompt_tokens": total("prompt_tokens"),
+            "completion_tokens": total("completion_tokens"),
+            "image_tokens": total("image_tokens"),
+            "cost_usd": total("cost_usd"),
+            "queue_delay": total("queue_delay"),
+            "network": total("network"),
+            "max_latency": max((call.latency for call in calls), default=0.0),
+        }
+
+    def _group(self, attribute: str) -> Dict[str, Dict]:
+        groups: Dict[str, List[CallRecord]] = {}
+        for call in self.calls:
+            groups.setdefault(getattr(call, attribute) or "-", []).append(call)
+        return {name: self._totals(calls) for name, calls in groups.items()}
+
+    def summary(self) -> Dict[str, Any]:
+        finished = self.finished or time.time()
+        return {
+            "run_id": self.run_id,
+            "pipeline": self.pipeline,
+            "tags": self.tags,
+            "started": self.started,
+            "wall_time": finished - self.started,
+            "total": self._totals(self.calls),
+            "by_stage": self._group("stage"),
+            "by_agent": self._group("agent"),
+            "by_model": self._group("model"),
+        }
+
+
+_run: contextvars.ContextVar[Optional[RunReport]] = contextvars.ContextVar("llm_run", default=None)
+_stage: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("llm_stage", default=None)
+
+
+class LLMMetrics:
+    """
+    Collects a CallRecord for every LLM call and, when `directory` is set,
+    appends it to `calls.jsonl` under it. Calls made inside `run(...)` are
+    attributed to that run and to the innermost `stage(...)`; the context is
+    carried into tasks created within it, so gathered agents are counted too.
+    A report per run is appended to `runs.jsonl` when the run ends.
+
+    Records are queued in memory and written in batches by a background
+    thread, so recording never touches the disk on the event loop. Before a
+    batch would take a file past `max_bytes`, the file is rotated to
+    `<name>.1`. Write errors are logged and never fail a call.
+    """
+
+    def __init__(self, directory: Optional[str] = METRICS_DIR, max_bytes: int = 10 * 2**20):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._queue: "queue.Queue[Optional[Tuple[str, str]]]" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def _append(self, name: str, payload: Dict):
+        if not self.directory:
+            return
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="llm-metrics-writer", daemon=True)
+                self._writer.start()
+        self._queue.put((name, json.dumps(payload, default=str) + "\n"))
+
+    def _write_loop(self):
+        while True:
+            item = self._queue.get()
+            batch = [item]
+            # write everything queued meanwhile in one go
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            lines: Dict[str, List[str]] = {}
+            for entry in batch:
+                if entry is not None:
+                    lines.setdefault(entry[0], []).append(entry[1])
+            for name, chunk in lines.items():
+                self._write(name, "".join(chunk))
+            for _ in batch:
+                self._queue.task_done()
+            if None in batch:
+                return
+
+    def _write(self, name: str, data: str):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(self.directory, name)
+            if os.path.exists(path) and os.path.getsize(path) + len(data) > self.max_bytes:
+                os.replace(path, f"{path}.1")
+            with open(path, "a") as f:
+                f.write(data)
+        except OSError as e:
+            logger.warning(f"Could not write LLM metrics to {name}: {e}")
+
+    def flush(self):
+        """Block until every queued record is written (call from a thread, not the event loop)."""
+        if self._writer is not None:
+            self._queue.join()
+
+    def close(self):
+        with self._lock:
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            self._queue.put(None)
+            writer.join()
+
+    @contextmanager
+    def run(self, pipeline: str, **tags) -> Iterator[RunReport]:
+        report = RunReport(pipeline, **tags)
+        token = _run.set(report)
+        try:
+            yield report
+        finally:
+            _run.reset(token)
+            report.finished = time.time()
+            summary = report.summary()
+            total = summary["total"]
+            cost = f"${total['cost_usd']:.4f}" if total["cost_usd"] is not None else "n/a"
+            logger.info(f"{pipeline} run {report.run_id}: {total['calls']} LLM calls, "
+                        f"{total['prompt_tokens'] or 0}+{total['completion_tokens'] or 0} tokens, {cost} "
+                        f"in {summary['wall_time']:.1f}s")
+            self._append("runs.jsonl", summary)
+
+    @contextmanager
+    def stage(self, name: str):
+        token = _stage.set(name)
+        try:
+            yield
+        finally:
+            _stage.reset(token)
+
+    def record(self, provider: str, call_site: str, model: str, agent: str = None, result=None,
+               response=None, cache_hit: bool = False, image_tokens: int = None) -> CallRecord:
+        """Record a call from its executor LLMResult and SDK response, or a cache hit."""
+        usage = {}
+        if response is not None:
+            usage = openai_usage(response) if provider == "openai" else gemini_usage(response)
+        report = _run.get()
+        call = CallRecord(
+            provider=provider,
+            call_site=call_site,
+            model=model,
+            agent=agent,
+            run_id=report.run_id if report else None,
+            pipeline=report.pipeline if report else None,
+            stage=_stage.get(),
+            ok=result.ok if result is not None else True,
+            cache_hit=cache_hit,
+            error_type=result.error_type if result is not None else None,
+            attempts=result.attempts if result is not None else 0,
+            latency=result.latency if result is not None else 0.0,
+            queue_delay=result.queue_delay if result is not None else 0.0,
+            network=result.network if result is not None else 0.0,
+            image_tokens=image_tokens if not cache_hit else None,
+            **usage,
+        )
+        call.cost_usd = 0.0 if cache_hit else model_cost(model, call.prompt_tokens, call.completion_tokens)
+        if report is not None:
+            report.calls.append(call)
+        self._append("calls.jsonl", asdict(call))
+        return call
+
+
+LLM_METRICS = LLMMetrics()
+atexit.register(LLM_METRICS.close)
@@ -0,0 +1,285 @@
+import asyncio
+import hashlib
+import heapq
+import itertools
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from backend.utils.logger_config import get_logger
+
+logger = get_logger(__name__)
+
+# --- Priority lanes: lower value is served first ---
+PRIORITY_LIVE = 0
+PRIORITY_DEFAULT = 1
+PRIORITY_BACKTEST = 2
+
+LANE_NAMES = {PRIORITY_LIVE: "live", PRIORITY_DEFAULT: "default", PRIORITY_BACKTEST: "backtest"}
+
+
+@dataclass
+class RateLimit:
+    """
+    Quota of one provider: `per_key` requests (credits) per `period` seconds for
+    each API key, and optionally `per_provider` across all keys (e.g. an org limit).
+    `burst` caps how many unused credits a bucket can bank; defaults to the quota.
+    """
+    per_key: float
+    period: float = 60.0
+    per_provider: Optional[float] = None
+    burst: Optional[float] = None
+
+
+# Defaults match the plans we run on; override with RATE_LIMITER.configure(...)
+PROVIDER_LIMITS: Dict[str, RateLimit] = {
+    "twelvedata": RateLimit(per_key=8),
+    "jina": RateLimit(per_key=200),
+    "openai": RateLimit(per_key=500),
+    "gemini": RateLimit(per_key=15),
+    "perplexity": RateLimit(per_key=50),
+}
+
+
+class _Waiter:
+    """A queued acquire; woken when it reaches the head of its bucket's queue."""
+
+    def __init__(self, priority: int, seq: int, loop: asyncio.AbstractEventLoop = None):
+        self.priority = priority
+        self.seq = seq
+        self.loop = loop
+        self.enqueued = time.monotonic()
+        self.event = asyncio.Event() if loop is not None else threading.Event()
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+    def wake(self):
+        if self.loop is None:
+            self.event.set()
+        elif not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.event.set)
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at `rate` tokens per second up to `capacity`.
+
+    Waiters queue in (priority, arrival) order and only the head may take tokens,
+    so a backtest request never overtakes a queued live one. The head sleeps
+    exactly until enough tokens have refilled instead of polling.
+    """
+
+    def __init__(self, name: str, rate: float, capacity: float):
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+        self._lock = threading.Lock()
+        self._waiters: List[_Waiter] = []
+        self._seq = itertools.count()
+
+        # metrics
+        self.granted = 0
+        self.throttled = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.max_depth = 0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _try_take(self, waiter: _Waiter, cost: float) -> Optional[float]:
+        """None if `waiter` was granted, else the seconds to sleep before trying again (inf if not head)."""
+        with self._lock:
+            if self._waiters[0] is not waiter:
+                return float("inf")
+            now = time.monotonic()
+            self._refill(now)
+            if self.tokens < cost:
+                return (cost - self.tokens) / self.rate
+            self.tokens -= cost
+            heapq.heappop(self._waiters)
+            self._record(now - waiter.enqueued)
+            if self._waiters:
+                self._waiters[0].wake()
+            return None
+
+    def _enqueue(self, priority: int, loop: asyncio.AbstractEventLoop = None) -> _Waiter:
+        waiter = _Waiter(priority, next(self._seq), loop)
+        with self._lock:
+            heapq.heappush(self._waiters, waiter)
+            self.max_depth = max(self.max_depth, len(self._waiters))
+        return waiter
+
+    def _discard(self, waiter: _Waiter):
+        with self._lock:
+            if waiter not in self._waiters:
+                return
+            self._waiters.remove(waiter)
+            heapq.heapify(self._waiters)
+            if self._waiters:
+                self._waiters[0].wake()
+
+    def _record(self, wait: float):
+        self.granted += 1
+        if wait > 0.001:
+            self.throttled += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+
+    def _check_cost(self, cost: float):
+        # the bucket never holds more than `capacity` tokens, so a larger cost would wait forever
+        if cost > self.capacity:
+            raise ValueError(f"Cost {cost} exceeds the capacity {self.capacity} of bucket {self.name}")
+
+    async def acquire(self, cost: float = 1, priority: int = PRIORITY_DEFAULT):
+        self._check_cost(cost)
+        waiter = self._enqueue(priority, asyncio.get_running_loop())
+        try:
+            while (delay := self._try_take(waiter, cost)) is not None:
+                waiter.event.clear()
+                timeout = None if delay == float("inf") else delay
+                try:
+                    # a higher-priority arrival or a cancelled head wakes us early
+                    await asyncio.wait_for(waiter.event.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            self._discard(waiter)
+            raise
+
+    def acquire_sync(self, cost: float = 1, priority: int = PRIORITY_DEFAULT):
+        """
+        Blocking acquire for synchronous callers; shares the queue with async waiters.
+        Raises RuntimeError on a thread running an event loop, which the wait would freeze.
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            pass
+        else:
+            raise RuntimeError(f"acquire_sync on {self.name} would block the running event loop; "
+                               "await acquire or run the caller in a thread")
+        self._check_cost(cost)
+        waiter = self._enqueue(priority)
+        try:
+            while (delay := self._try_take(waiter, cost)) is not None:
+                waiter.event.clear()
+                waiter.event.wait(None if delay == float("inf") else delay)
+        except BaseException:
+            self._discard(waiter)
+            raise
+
+    def drain(self):
+        """Empty the bucket, e.g. after the provider answered 429, so the next call waits for a refill."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.tokens, 0)
+
+    def metrics(self) -> Dict:
+        with self._lock:
+            self._refill(time.monotonic())
+            depth = {name: 0 for name in LANE_NAMES.values()}
+            for waiter in self._waiters:
+                lane = LANE_NAMES.get(waiter.priority, str(waiter.priority))
+                depth[lane] = depth.get(lane, 0) + 1
+            return {
+                "tokens": round(self.tokens, 3),
+                "queue_depth": len(self._waiters),
+                "queue_depth_by_lane": depth,
+                "max_queue_depth": self.max_depth,
+                "granted": self.granted,
+                "throttled": self.throttled,
+                "avg_wait": self.total_wait / self.granted if self.granted else 0.0,
+                "max_wait": self.max_wait,
+            }
+
+
+class RateLimitScheduler:
+    """
+    Shared scheduler for vendor API quotas.
+
+    Every call first takes a credit from its provider bucket (if the provider
+    has a cross-key limit) and then from the bucket of its API key, so calls
+    run as fast as the quota allows and queue, by priority lane, once it is spent.
+    """
+
+    def __init__(self, limits: Dict[str, RateLimit] = None):
+        self.limits = dict(PROVIDER_LIMITS if limits is None else limits)
+        self._buckets: Dict[Tuple[str, str], TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _mask(key: Optional[str]) -> str:
+        """Bucket id of an API key; keys are never kept or logged in clear text."""
+        return "default" if not key else hashlib.sha256(key.encode()).hexdigest()[:8]
+
+    def configure(self, provider: str, **kwargs):
+        """Set or update a provider's quota; existing buckets for the provider are rebuilt."""
+        limit = self.limits.get(provider, RateLimit(per_key=60))
+        self.limits[provider] = RateLimit(**{**limit.__dict__, **kwargs})
+        with self._lock:
+            for bucket_key in [k for k in self._buckets if k[0] == provider]:
+                del self._buckets[bucket_key]
+
+    def _bucket(self, provider: str, key: str, capacity_of: float) -> TokenBucket:
+        limit = self.limits[provider]
+        with self._lock:
+            if (provider, key) not in self._buckets:
+                capacity = limit.burst or capacity_of
+                self._buckets[(provider, key)] = TokenBucket(
+                    f"{provider}:{key}", rate=capacity_of / limit.period, capacity=capacity
+                )
+            return self._buckets[(provider, key)]
+
+    def buckets(self, provider: str, key: str = None) -> List[TokenBucket]:
+        if provider not in self.limits:
+            raise ValueError(f"Unknown provider: {provider}. Choose from {list(self.limits)}.")
+        limit = self.limits[provider]
+        buckets = []
+        if limit.per_provider:
+            buckets.append(self._bucket(provider, "all", limit.per_provider))
+        buckets.append(self._bucket(provider, self._mask(key), limit.per_key))
+        return buckets
+
+    async def acquire(self, provider: str, key: str = None, cost: float = 1, priority: int = PRIORITY_DEFAULT):
+        for bucket in self.buckets(provider, key):
+            await bucket.acquire(cost, priority)
+
+    def acquire_sync(self, provider: str, key: str = None, cost: float = 1, priority: int = PRIORITY_DEFAULT):
+        for bucket in self.buckets(provider, key):
+            bucket.acquire_sync(cost, priority)
+
+    def max_cost(self, provider: str, key: str = None) -> float:
+        """The largest cost one acquire may ask for: the smallest capacity among the call's buckets."""
+        return min(bucket.capacity for bucket in self.buckets(provider, key))
+
+    async def submit(self, provider: str, func, *args, key: str = None, cost: float = 1,
+                     priority: int = PRIORITY_DEFAULT, **kwargs):
+        """Await a credit, then run `func(*args, **kwargs)` (a coroutine function) and return its result."""
+        await self.acquire(provider, key=key, cost=cost, priority=priority)
+        return await func(*args, **kwargs)
+
+    def drain(self, provider: str, key: str = None):
+        """Called when the provider rejects a call for quota reasons; following calls wait for a refill."""
+        for bucket in self.buckets(provider, key):
+            bucket.drain()
+        logger.warning(f"Rate limit hit for {provider} key {self._mask(key)}; waiting for refill.")
+
+    def metrics(self) -> Dict[str, Dict]:
+        with self._lock:
+            buckets = list(self._buckets.values())
+        return {bucket.name: bucket.metrics() for bucket in buckets}
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """True for quota rejections (HTTP 429 / RESOURCE_EXHAUSTED) from the OpenAI, Gemini or HTTP clients."""
+    status = getattr(error, "status_code", None) or getattr(error, "code", None) or getattr(error, "status", None)
+    return status == 429 or "429" in str(error) or "RESOURCE_EXHAUSTED" in str(error)
+
+
+RATE_LIMITER = RateLimitScheduler()
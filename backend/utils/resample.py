@@ -0,0 +1,111 @@
+import numpy as np
+from typing import Tuple
+
+INTERVAL_MINUTES = {
+    "1min": 1, "5min": 5, "15min": 15, "30min": 30, "45min": 45,
+    "1h": 60, "2h": 120, "4h": 240, "1day": 1440,
+}
+
+NS_PER_MINUTE = 60 * 10**9
+
+
+def bucket_starts(timestamps: np.ndarray, interval: str, offset_minutes: int = 0) -> np.ndarray:
+    """Floor int64 ns timestamps to the start of their `interval` bucket (epoch-anchored, shifted by offset)."""
+    if interval not in INTERVAL_MINUTES:
+        raise ValueError(f"Unsupported interval: {interval}. Choose from {list(INTERVAL_MINUTES)}.")
+    step = INTERVAL_MINUTES[interval] * NS_PER_MINUTE
+    offset = offset_minutes * NS_PER_MINUTE
+    return (timestamps - offset) // step * step + offset
+
+
+def resample_ohlc(timestamps: np.ndarray, ohlc: np.ndarray, interval: str, offset_minutes: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Aggregate sorted bars into `interval` buckets without a groupby.
+
+    Bucket boundaries are found with one comparison of neighbouring bucket
+    starts, and high/low are reduced per bucket with np.maximum/minimum.reduceat.
+    Returns (bucket start timestamps, ohlc array of shape (n_buckets, 4)).
+    """
+    if len(timestamps) == 0:
+        return np.empty(0, dtype=np.int64), np.empty((0, 4))
+
+    buckets = bucket_starts(timestamps, interval, offset_minutes)
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(buckets)] - 1
+
+    out = np.column_stack([
+        ohlc[starts, 0],
+        np.maximum.reduceat(ohlc[:, 1], starts),
+        np.minimum.reduceat(ohlc[:, 2], starts),
+        ohlc[ends, 3],
+    ])
+    return buckets[starts], out
+
+
+class OHLCResampler:
+    """
+    Incrementally derives `interval` bars from a stream of finer (e.g. 1-minute) bars.
+
+    Closed buckets are aggregated once and kept; only the minute bars of the
+    currently open bucket are held and re-aggregated when new minutes arrive.
+    Re-sending the latest minute (a still-forming bar) replaces it.
+    """
+
+    def __init__(self, interval: str, offset_minutes: int = 0, max_bars: int = 2000):
+        self.interval = interval
+        self.offset_minutes = offset_minutes
+        self.max_bars = max_bars
+
+        self.closed_timestamps = np.empty(0, dtype=np.int64)
+        self.closed_ohlc = np.empty((0, 4))
+        self.open_timestamps = np.empty(0, dtype=np.int64)
+        self.open_ohlc = np.empty((0, 4))
+        self.last_timestamp = None
+
+    @property
+    def bar_count(self) -> int:
+        return len(self.closed_timestamps) + (1 if len(self.open_timestamps) else 0)
+
+    def update(self, timestamps: np.ndarray, ohlc: np.ndarray):
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        ohlc = np.asarray(ohlc, dtype=float).reshape(-1, 4)
+
+        if self.last_timestamp is not None:
+            keep = timestamps >= self.last_timestamp
+            timestamps, ohlc = timestamps[keep], ohlc[keep]
+            if len(timestamps) and timestamps[0] == self.last_timestamp:
+                self.open_ohlc[-1] = ohlc[0]
+                timestamps, ohlc = timestamps[1:], ohlc[1:]
+        if not len(timestamps):
+            return
+
+        timestamps = np.concatenate([self.open_timestamps, timestamps])
+        ohlc = np.concatenate([self.open_ohlc, ohlc])
+        buckets = bucket_starts(timestamps, self.interval, self.offset_minutes)
+        first_open = np.searchsorted(buckets, buckets[-1], side="left")
+
+        if first_open > 0:
+            closed_timestamps, closed_ohlc = resample_ohlc(
+                timestamps[:first_open], ohlc[:first_open], self.interval, self.offset_minutes
+            )
+            self.closed_timestamps = np.concatenate([self.closed_timestamps, closed_timestamps])
+            self.closed_ohlc = np.concatenate([self.closed_ohlc, closed_ohlc])
+            # trim in chunks so appends stay amortized O(1)
+            if len(self.closed_timestamps) > 2 * self.max_bars:
+                self.closed_timestamps = self.closed_timestamps[-self.max_bars:]
+                self.closed_ohlc = self.closed_ohlc[-self.max_bars:]
+
+        self.open_timestamps = timestamps[first_open:]
+        self.open_ohlc = ohlc[first_open:]
+        self.last_timestamp = timestamps[-1]
+
+    def get_bars(self, size: int = None, include_open: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+        """Derived bars, oldest first; the open bucket is included as the latest (forming) bar."""
+        timestamps, ohlc = self.closed_timestamps, self.closed_ohlc
+        if include_open and len(self.open_timestamps):
+            open_timestamp, open_ohlc = resample_ohlc(self.open_timestamps, self.open_ohlc, self.interval, self.offset_minutes)
+            timestamps = np.concatenate([timestamps, open_timestamp])
+            ohlc = np.concatenate([ohlc, open_ohlc])
+        if size is not None:
+            timestamps, ohlc = timestamps[-size:], ohlc[-size:]
+        return timestamps, ohlc
@@ -1,247 +1,646 @@
 import matplotlib
 matplotlib.use('Agg')
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection, PolyCollection
+from matplotlib.figure import Figure
 from matplotlib.ticker import FuncFormatter
 from matplotlib.ticker import MaxNLocator
-from matplotlib import pyplot as plt
-from mplfinance.original_flavor import candlestick_ohlc
 import pandas as pd
+import io
 import os
+import threading
+import time
 import numpy as np
+from PIL import Image
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
 from backend.utils.parameters import PIP_INTERVALS, DECIMAL_PLACES
+from backend.utils.chart_cache import CHART_CACHE, ChartCache, chart_key
+from backend.utils.chart_profiles import ImageProfile, PROFILES, get_profile, encode_image, desaturate
+from backend.utils.logger_config import get_logger
 
-class TechnicalCharts:
-    def __init__(self, currency_pair: str, interval: str, df: pd.DataFrame, size: int, chart_name: str):
-        self.currency_pair = currency_pair
-        self.interval = interval
-        self.df = df
+logger = get_logger(__name__)
+
+# Data columns each plot_chart flag draws
+FLAG_COLUMNS = {
+    "EMA10": ["EMA10"],
+    "EMA20": ["EMA20"],
+    "EMA50": ["EMA50"],
+    "EMA100": ["EMA100"],
+    "RSI14": ["RSI14"],
+    "MACD": ["MACD", "MACD_Signal", "MACD_Diff"],
+    "ROC12": ["ROC12"],
+    "ATR14": ["ATR"],
+}
+
+# --- Layout ---
+PRICE_CHART_HEIGHT_INCH = 10   # Fixed height for the price chart
+INDICATOR_HEIGHT_INCH = 3      # Fixed height for each additional indicator
+CHART_WIDTH_INCH = 20
+
+EMA_STYLES = {"EMA10": "blue", "EMA20": "orange", "EMA50": "purple", "EMA100": "violet"}
+# Indicator panels below the price chart, top to bottom, and the flag that enables each
+PANEL_FLAGS = {"RSI": "RSI14", "MACD": "MACD", "ROC": "ROC12", "ATR": "ATR14"}
+# Panels drawn with a single line, whose colour carries no information
+SINGLE_LINE_PANELS = ("RSI", "ROC", "ATR")
+SHADING_BARS = {"5min": 0, "15min": 0, "1h": 6, "4h": 5}
+CANDLE_WIDTH = 0.6
+
+
+def bar_polygons(x: np.ndarray, bottom: np.ndarray, top: np.ndarray, width: float = CANDLE_WIDTH) -> np.ndarray:
+    """Corners of the rectangles [x - width/2, x + width/2] x [bottom, top] as an (n, 4, 2) array."""
+    left, right = x - width / 2, x + width / 2
+    return np.stack([
+        np.column_stack([left, bottom]),
+        np.column_stack([left, top]),
+        np.column_stack([right, top]),
+        np.column_stack([right, bottom]),
+    ], axis=1)
+
+
+def candlestick_arrays(x: np.ndarray, ohlc: np.ndarray, width: float = CANDLE_WIDTH):
+    """Wick segments (n, 2, 2), body polygons (n, 4, 2) and the up-candle mask for OHLC rows."""
+    open_, high, low, close = ohlc.T
+    wicks = np.stack([np.column_stack([x, low]), np.column_stack([x, high])], axis=1)
+    bodies = bar_polygons(x, open_, close, width)
+    return wicks, bodies, close >= open_
+
+
+def autoscale(ax, values, include=(), margin: float = 0.05):
+    """Set y limits to the finite range of `values` (plus fixed levels) with matplotlib's default 5% margins."""
+    values = np.concatenate([np.ravel(v) for v in values] + [np.asarray(include, dtype=float)])
+    values = values[np.isfinite(values)]
+    if not len(values):
+        return
+    lo, hi = values.min(), values.max()
+    pad = (hi - lo) * margin or abs(hi) * margin or 1
+    ax.set_ylim(lo - pad, hi + pad)
+
+
+class ChartTemplate:
+    """
+    A reusable figure for one chart layout: EMA overlays, indicator panels and bar count.
+
+    The figure, axes, formatters, legends and line artists are built once; each
+    update() swaps the data into the existing artists and re-saves the canvas.
+    Figures are created without pyplot, so nothing is registered globally and
+    close() (or dropping the template) releases everything.
+    """
+
+    def __init__(self, emas: Tuple[str, ...], panels: Tuple[str, ...], size: int):
+        self.emas = emas
+        self.panels = panels
         self.size = size
-        self.chart_name = chart_name
-        self.chart_root_path = "data/chart"
-    
-    def plot_chart(self, return_binary: bool = True,
-               EMA10: bool = False,
-               EMA20: bool = False,
-               EMA50: bool = False,
-               EMA100: bool = False,
-               RSI14: bool = False,
-               MACD: bool = False,
-               ROC12: bool = False,
-               ATR14: bool = False,
-               shading: bool = False):
-        # collect current data
-        data = {}
-        decimal_places = DECIMAL_PLACES[self.currency_pair]
+        self.renders = 0
+        self.lock = threading.Lock()
 
-        # --- Data Preparation ---
-        fx_data = self.df.copy()
-        fx_data = fx_data.tail(self.size)
-        fx_data['Date'] = fx_data.index
-        data["Close"] = fx_data.iloc[-1]["Close"].round(decimal_places)
-
-        # Create a new sequential index column
-        fx_data.loc[:, 'Index'] = range(len(fx_data))
-        ohlc_data = fx_data[['Index', 'Open', 'High', 'Low', 'Close']].copy()
-
-        # --- Define the Indicator Settings from Input Parameters ---
-        indicators = {
-            'EMA10': EMA10,
-            'EMA20': EMA20,
-            'EMA50': EMA50,
-            'EMA100': EMA100,
-            'RSI14': RSI14,
-            'MACD': MACD,
-            'ROC12': ROC12,
-            "ATR14": ATR14
-        }
+        self.dates = np.empty(0, dtype=object)
+        self.decimal_places = 4
+        self._spans = []
+        self._layout_done = False
 
-        # Determine which additional subplots to create.
-        additional_indicators = []
-        if indicators.get('RSI14'):
-            additional_indicators.append('RSI')
-        if indicators.get('MACD'):
-            additional_indicators.append('MACD')
-        if indicators.get('ROC12'):
-            additional_indicators.append('ROC')
-        if indicators.get('ATR14'):
-            additional_indicators.append('ATR')
-
-        # --- Figure Setup: Dynamic Subplots ---
-        # Fixed size for the candlestick chart and each additional indicator chart
-        price_chart_height_inch = 10      # Fixed height for the price chart
-        indicator_height_inch = 3         # Fixed height for each additional indicator
-        total_height = price_chart_height_inch + indicator_height_inch * len(additional_indicators)
-        n_subplots = 1 + len(additional_indicators)
-        height_ratios = [price_chart_height_inch] + [indicator_height_inch] * len(additional_indicators)
-
-        fig, axes = plt.subplots(nrows=n_subplots, figsize=(20, total_height),
-                                gridspec_kw={'height_ratios': height_ratios}, sharex=False)
-        if n_subplots == 1:
-            axes = [axes]
-        ax_price = axes[0]
-
-        # Map additional indicators to their dedicated axes in order (top to bottom)
-        indicator_axes = {}
-        for i, indicator in enumerate(additional_indicators):
-            indicator_axes[indicator] = axes[i + 1]
+        height_ratios = [PRICE_CHART_HEIGHT_INCH] + [INDICATOR_HEIGHT_INCH] * len(panels)
+        self.fig = Figure(figsize=(CHART_WIDTH_INCH, sum(height_ratios)))
+        FigureCanvasAgg(self.fig)
+        axes = self.fig.subplots(nrows=len(height_ratios), gridspec_kw={'height_ratios': height_ratios}, squeeze=False)[:, 0]
+        self.ax_price = axes[0]
+        self.panel_axes = dict(zip(panels, axes[1:]))
+        self.all_axes = list(axes)
+        self.lines = {}
 
         # --- Plot 1: Price Chart (Candlestick with Optional EMA Lines) ---
-        lines = []
-        labels = []
-        candlestick_ohlc(ax_price, ohlc_data.values, width=0.6, colorup='green', colordown='red', alpha=0.8)
-        # adjust wick width
-        for line in ax_price.get_lines():
-            x_data = line.get_xdata()
-            # Check if the line is vertical (both x values are the same)
-            if len(x_data) == 2 and x_data[0] == x_data[1]:
-                line.set_linewidth(2.5) 
-
-        if indicators.get('EMA10'):
-            line, = ax_price.plot(fx_data['Index'], fx_data['EMA10'], label='EMA 10', color='blue', linewidth=2)
-            lines.append(line)
-            labels.append("EMA 10: blue")
-            data["EMA10"] = fx_data.iloc[-1]["EMA10"].round(decimal_places)
-        if indicators.get('EMA20'):
-            line, = ax_price.plot(fx_data['Index'], fx_data['EMA20'], label='EMA 20', color='orange', linewidth=2)
-            lines.append(line)
-            labels.append("EMA 20: orange")
-            data["EMA20"] = fx_data.iloc[-1]["EMA20"].round(decimal_places)
-        if indicators.get('EMA50'):
-            line, = ax_price.plot(fx_data['Index'], fx_data['EMA50'], label='EMA 50', color='purple', linewidth=2)
-            lines.append(line)
-            labels.append("EMA 50: purple")
-            data["EMA50"] = fx_data.iloc[-1]["EMA50"].round(decimal_places)
-        if indicators.get('EMA100'):
-            line, = ax_price.plot(fx_data['Index'], fx_data['EMA100'], label='EMA 100', color='violet', linewidth=2)
-            lines.append(line)
-            labels.append("EMA 100: violet")
-            data["EMA100"] = fx_data.iloc[-1]["EMA100"].round(decimal_places)
-        if lines:
-            ax_price.legend(lines, labels, loc='upper left', fontsize=12)
-        ax_price.set_title(f"{self.currency_pair}")
-        ax_price.grid(True)
-
-        # --- Plot Additional Indicators ---
-        # RSI Plot
-        if 'RSI' in indicator_axes:
-            ax_rsi = indicator_axes['RSI']
-            ax_rsi.plot(fx_data['Index'], fx_data['RSI14'], label='RSI (14)', color='purple')
+        # one collection for all wicks and one for all bodies, refilled on every update
+        self.wicks = LineCollection([], linewidths=2.5, alpha=0.8, zorder=2)
+        self.bodies = PolyCollection([], linewidths=1, alpha=0.8, zorder=1)
+        self.ax_price.add_collection(self.wicks, autolim=False)
+        self.ax_price.add_collection(self.bodies, autolim=False)
+        for name in emas:
+            window = name[len("EMA"):]
+            # drawn above the candle wicks
+            self.lines[name], = self.ax_price.plot([], [], label=f'EMA {window}', color=EMA_STYLES[name], linewidth=2, zorder=2.5)
+        self.ema_legend = None
+        if emas:
+            self.ema_legend = self.ax_price.legend([self.lines[name] for name in emas],
+                                                   [f"EMA {name[len('EMA'):]}: {EMA_STYLES[name]}" for name in emas],
+                                                   loc='upper left', fontsize=12)
+        self.title = self.ax_price.set_title("")
+
+        # --- Additional Indicators ---
+        if 'RSI' in self.panel_axes:
+            ax_rsi = self.panel_axes['RSI']
+            self.lines['RSI14'], = ax_rsi.plot([], [], label='RSI (14)', color='purple')
             ax_rsi.axhline(70, color='red', linestyle='--')
             ax_rsi.axhline(30, color='green', linestyle='--')
             ax_rsi.legend(loc='upper left')
-            ax_rsi.grid(True)
-            data["RSI14"] = fx_data.iloc[-1]["RSI14"].round(2)
-        # MACD Plot
-        if 'MACD' in indicator_axes:
-            ax_macd = indicator_axes['MACD']
-            lines = []
-            labels = []
-            line, = ax_macd.plot(fx_data['Index'], fx_data['MACD'], label='MACD', color='red')
-            lines.append(line)
-            labels.append("MACD: red")
-            line, = ax_macd.plot(fx_data['Index'], fx_data['MACD_Signal'], label='Signal', color='green')
-            lines.append(line)
-            labels.append("Signal: green")
-            macd_diff = fx_data['MACD_Diff']
-            pos_diff = macd_diff.copy()
-            neg_diff = macd_diff.copy()
-            pos_diff[pos_diff <= 0] = 0  # Only positive values
-            neg_diff[neg_diff >= 0] = 0  # Only negative values
-            ax_macd.bar(fx_data['Index'], pos_diff, color='peru', label='Divergence', width=0.6)
-            ax_macd.bar(fx_data['Index'], neg_diff, color='black', width=0.6)
-            ax_macd.legend(lines, labels, loc='upper left', fontsize=12)
-            ax_macd.grid(True)
-            data["MACD"] = fx_data.iloc[-1]["MACD"].round(decimal_places)
-            data["MACD_Signal"] = fx_data.iloc[-1]["MACD_Signal"].round(decimal_places)
-            data["MACD_Diff"] = fx_data.iloc[-1]["MACD_Diff"].round(decimal_places)
-        # ROC Plot
-        if 'ROC' in indicator_axes:
-            ax_roc = indicator_axes['ROC']
-            ax_roc.plot(fx_data['Index'], fx_data['ROC12'], label='ROC (12)', color='green')
+        if 'MACD' in self.panel_axes:
+            ax_macd = self.panel_axes['MACD']
+            self.macd_bars = PolyCollection([], linewidths=0, zorder=1)
+            ax_macd.add_collection(self.macd_bars, autolim=False)
+            self.lines['MACD'], = ax_macd.plot([], [], label='MACD', color='red')
+            self.lines['MACD_Signal'], = ax_macd.plot([], [], label='Signal', color='green')
+            ax_macd.legend([self.lines['MACD'], self.lines['MACD_Signal']], ["MACD: red", "Signal: green"], loc='upper left', fontsize=12)
+        if 'ROC' in self.panel_axes:
+            ax_roc = self.panel_axes['ROC']
+            self.lines['ROC12'], = ax_roc.plot([], [], label='ROC (12)', color='green')
             ax_roc.axhline(0, color='black', linestyle='--')
             ax_roc.legend(loc='upper left')
-            ax_roc.grid(True)
-            data["ROC12"] = fx_data.iloc[-1]["ROC12"].round(2)
-        # ATR Plot
-        if 'ATR' in indicator_axes:
-            ax_atr = indicator_axes['ATR']
-            ax_atr.plot(fx_data['Index'], fx_data['ATR'], label='ATR (14)', color='blue')
+        if 'ATR' in self.panel_axes:
+            ax_atr = self.panel_axes['ATR']
+            self.lines['ATR'], = ax_atr.plot([], [], label='ATR (14)', color='blue')
             ax_atr.legend(loc='upper left')
-            ax_atr.grid(True)
-            data["ATR14"] = fx_data.iloc[-1]["ATR"].round(decimal_places)
-
-        # --- Formatting: Axis Labels, Ticks, and Grids ---
-        def make_price_formatter(decimal_places):
-            def price_formatter(x, pos):
-                return f"{x:.{decimal_places}f}"
-            return price_formatter
-        formatter = make_price_formatter(decimal_places)
-        # def price_formatter(x, pos):
-        #     return f"x:.{decimal_places}f"
-        # if self.currency_pair == "EUR/USD":
-        #     def price_formatter(x, pos):
-        #         return f"{x:.4f}"
-        # elif self.currency_pair == "USD/JPY":
-        #     def price_formatter(x, pos):
-        #         return f"{x:.1f}"
-        # else:
-        #     def price_formatter(x, pos):
-        #         return str(x)
-
-        # Calculate y-axis ticks for the price chart.
-        y_min, y_max = ax_price.get_ylim()
-
-        pip_interval = PIP_INTERVALS[self.currency_pair][self.interval]
-        y_min = round(y_min / pip_interval) * pip_interval
-        y_max = round(y_max / pip_interval) * pip_interval
-        y_ticks = np.arange(y_min, y_max + pip_interval, pip_interval)
-        # num_ticks = int(round((y_max - y_min) / pip_interval)) + 1
-        # y_ticks = np.linspace(y_min, y_max, num_ticks)
+
+        # --- Formatting: Axis Labels, Ticks, and Grids (formatters read the current data) ---
+        price_formatter = FuncFormatter(lambda x, pos: f"{x:.{self.decimal_places}f}")
 
         def date_formatter(x, pos):
             index = int(round(x))
-            if index < len(fx_data):
-                return fx_data['Date'].iloc[index].strftime('%m-%d %H:%M')
+            if 0 <= index < len(self.dates):
+                return self.dates[index]
             return ''
 
-        # Combine all axes (price chart + additional) for common formatting.
-        all_axes = [ax_price] + [indicator_axes[ind] for ind in additional_indicators]
-        for i, ax in enumerate(all_axes):
+        for i, ax in enumerate(self.all_axes):
             ax.xaxis.set_major_formatter(FuncFormatter(date_formatter))
             ax.xaxis.set_major_locator(MaxNLocator(integer=True, prune='both', nbins=20))
-            ax.set_xlim(0, len(fx_data) + 1)
             ax.yaxis.tick_right()
             ax.yaxis.set_label_position("right")
             if i == 0:
-                ax.yaxis.set_major_formatter(FuncFormatter(formatter))
-                ax.set_yticks(y_ticks)
+                ax.yaxis.set_major_formatter(price_formatter)
                 ax.tick_params(axis='x', rotation=0)
             else:
-                ax.set_xticklabels([])
-                ax.tick_params(axis='x', length=0)
+                ax.tick_params(axis='x', length=0, labelbottom=False)
             ax.grid(True, alpha=0.4)
 
-        # --- Shading ---
-        if shading:
-            time_intervals_dict = {"5min": 0, "15min": 0, "1h": 6, "4h": 5}
-            bars_to_mark = time_intervals_dict[self.interval]
-            start_shade = max(0, len(fx_data) - bars_to_mark)
-            end_shade = len(fx_data)
-            for ax in all_axes:
-                ax.axvspan(start_shade, end_shade, facecolor='blue', alpha=0.2, zorder=-1)
+    @staticmethod
+    def _remove(artists):
+        for artist in artists:
+            artist.remove()
+        return []
+
+    def update(self, title: str, dates: np.ndarray, ohlc: np.ndarray, series: Dict[str, np.ndarray],
+               decimal_places: int, pip_interval: float, shade_bars: int = 0):
+        """Swap a new window of bars into the figure; `series` holds the indicator arrays by column name."""
+        n = len(ohlc)
+        x = np.arange(n)
+        self.dates = dates
+        self.decimal_places = decimal_places
+        self.title.set_text(title)
+
+        wicks, bodies, up = candlestick_arrays(x, ohlc)
+        colors = np.where(up, 'green', 'red')
+        self.wicks.set_segments(wicks)
+        self.wicks.set_color(colors)
+        self.bodies.set_verts(bodies)
+        self.bodies.set_facecolor(colors)
+        self.bodies.set_edgecolor(colors)
+
+        for name, line in self.lines.items():
+            line.set_data(x, series[name])
+
+        autoscale(self.ax_price, [ohlc[:, 1:3]] + [series[name] for name in self.emas])
+        if 'RSI' in self.panel_axes:
+            autoscale(self.panel_axes['RSI'], [series['RSI14']], include=(30, 70))
+        if 'MACD' in self.panel_axes:
+            ax_macd = self.panel_axes['MACD']
+            macd_diff = series['MACD_Diff']
+            # divergence histogram: positive bars in peru, negative in black
+            self.macd_bars.set_verts(bar_polygons(x, np.zeros(n), macd_diff))
+            self.macd_bars.set_facecolor(np.where(macd_diff > 0, 'peru', 'black'))
+            autoscale(ax_macd, [series['MACD'], series['MACD_Signal'], macd_diff], include=(0,))
+        if 'ROC' in self.panel_axes:
+            autoscale(self.panel_axes['ROC'], [series['ROC12']], include=(0,))
+        if 'ATR' in self.panel_axes:
+            autoscale(self.panel_axes['ATR'], [series['ATR']])
+
+        # y ticks of the price chart on the pip grid of the interval
+        y_min, y_max = self.ax_price.get_ylim()
+        y_min = round(y_min / pip_interval) * pip_interval
+        y_max = round(y_max / pip_interval) * pip_interval
+        self.ax_price.set_yticks(np.arange(y_min, y_max + pip_interval, pip_interval))
+
+        self._spans = self._remove(self._spans)
+        for ax in self.all_axes:
+            ax.set_xlim(0, n + 1)
+            if shade_bars:
+                self._spans.append(ax.axvspan(max(0, n - shade_bars), n, facecolor='blue', alpha=0.2, zorder=-1))
+
+    def show_overlays(self, visible: bool):
+        """Show or hide the EMA lines and their legend on the price chart."""
+        for name in self.emas:
+            self.lines[name].set_visible(visible)
+        if self.ema_legend is not None:
+            self.ema_legend.set_visible(visible)
+
+    def _layout(self):
+        if not self._layout_done:
+            # the layout only depends on the panels, so it is computed on the first render
+            self.fig.tight_layout()
+            self._layout_done = True
+
+    def to_png(self) -> bytes:
+        self._layout()
+        buf = io.BytesIO()
+        self.fig.savefig(buf, format='png')
+        self.renders += 1
+        return buf.getvalue()
+
+    def to_image(self, dpi: float = None) -> Image.Image:
+        """Draw the figure at `dpi` into an RGBA image, skipping the PNG encode."""
+        self._layout()
+        dpi = dpi or self.fig.dpi
+        buf = io.BytesIO()
+        self.fig.savefig(buf, format='rgba', dpi=dpi)
+        self.renders += 1
+        width = int(self.fig.get_figwidth() * dpi)
+        raw = buf.getvalue()
+        return Image.frombuffer("RGBA", (width, len(raw) // (4 * width)), raw, "raw", "RGBA", 0, 1)
+
+    def panel_boxes(self, panels: Tuple[str, ...], width: int, height: int, pad: int = 5) -> List[Tuple[int, int, int, int]]:
+        """Full-width pixel bands (left, top, right, bottom) of `panels` in an image of width x height."""
+        boxes = []
+        for panel in panels:
+            if panel in self.panel_axes:
+                position = self.panel_axes[panel].get_position()
+                top = max(0, int((1 - position.y1) * height) - pad)
+                bottom = min(height, int((1 - position.y0) * height) + pad)
+                boxes.append((0, top, width, bottom))
+        return boxes
+
+    def bands(self, height: int) -> Dict[str, Tuple[int, int]]:
+        """Pixel rows (top, bottom) of "price" and each panel, tick labels included, in an image `height` tall."""
+        renderer = self.fig.canvas.get_renderer()
+        fig_height = self.fig.bbox.height
+        extents = [ax.get_tightbbox(renderer) for ax in self.all_axes]
+        # cut halfway between the labels of one axes and the top of the next, in figure fraction
+        cuts = [1.0] + [(upper.y0 + lower.y1) / 2 / fig_height for upper, lower in zip(extents, extents[1:])] + [0.0]
+        rows = [int(round((1 - cut) * height)) for cut in cuts]
+        return dict(zip(["price", *self.panels], zip(rows, rows[1:])))
+
+    def close(self):
+        self.fig.clear()
+        self.fig = None
+
+
+class FigurePool:
+    """
+    Keeps one ChartTemplate per (layout, size, price label width), least recently used first.
+    The margins are laid out on a template's first render, so pairs whose price
+    labels differ in width (USD/JPY against EUR/USD) get templates of their own.
+
+    Templates beyond `max_templates` are closed, and a template is rebuilt after
+    `max_renders` renders, so a long-running process holds a bounded set of
+    figures whatever charts it is asked for.
+    """
+
+    def __init__(self, max_templates: int = 16, max_renders: int = 500):
+        self.max_templates = max_templates
+        self.max_renders = max_renders
+        self._templates: "OrderedDict[Tuple, ChartTemplate]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.created = 0
+
+    def _get(self, emas: Tuple[str, ...], panels: Tuple[str, ...], size: int, label_width: int) -> ChartTemplate:
+        key = (emas, panels, size, label_width)
+        with self._lock:
+            template = self._templates.get(key)
+            if template is not None and template.renders >= self.max_renders:
+                logger.debug(f"Rebuilding chart template {key} after {template.renders} renders")
+                # a render on another thread may still be using the figure
+                with template.lock:
+                    template.close()
+                template = None
+            if template is None:
+                template = ChartTemplate(emas, panels, size)
+                self.created += 1
+            self._templates[key] = template
+            self._templates.move_to_end(key)
+            while len(self._templates) > self.max_templates:
+                evicted_key, evicted = self._templates.popitem(last=False)
+                logger.debug(f"Evicting chart template {evicted_key}")
+                with evicted.lock:
+                    evicted.close()
+            return template
+
+    @contextmanager
+    def template(self, emas: Tuple[str, ...], panels: Tuple[str, ...], size: int, label_width: int = 0):
+        """Check out the template of a layout; concurrent renders of one layout are serialized."""
+        while True:
+            template = self._get(emas, panels, size, label_width)
+            with template.lock:
+                # the template may have been evicted while we waited for it
+                if template.fig is not None:
+                    yield template
+                    return
 
-        # Save and close the figure
-        plt.tight_layout()
+    def clear(self):
+        with self._lock:
+            templates = list(self._templates.values())
+            self._templates.clear()
+        for template in templates:
+            with template.lock:
+                template.close()
 
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "templates": len(self._templates),
+                "created": self.created,
+                "renders": sum(template.renders for template in self._templates.values()),
+            }
+
+
+FIGURE_POOL = FigurePool()
+
+
+@dataclass
+class ChartJob:
+    """
+    Everything one render needs, as plain arrays: the payload shipped to render
+    worker processes instead of a pickled DataFrame.
+    """
+    currency_pair: str
+    emas: Tuple[str, ...]
+    panels: Tuple[str, ...]
+    size: int
+    dates: np.ndarray
+    ohlc: np.ndarray
+    series: Dict[str, np.ndarray]
+    decimal_places: int
+    pip_interval: float
+    shade_bars: int = 0
+    profile: ImageProfile = PROFILES["full"]
+
+
+def price_label_width(job: ChartJob) -> int:
+    """Characters of the widest price axis label of a job, which sets the right margin of its layout."""
+    if not len(job.ohlc):
+        return 0
+    return len(f"{float(np.nanmax(job.ohlc)):.{job.decimal_places}f}")
+
+
+def _update(template: ChartTemplate, job: ChartJob):
+    template.update(
+        title=f"{job.currency_pair}",
+        dates=job.dates,
+        ohlc=job.ohlc,
+        series=job.series,
+        decimal_places=job.decimal_places,
+        pip_interval=job.pip_interval,
+        shade_bars=job.shade_bars,
+    )
+
+
+def render_image(job: ChartJob) -> Tuple[bytes, Dict]:
+    """Render a chart job on this process's figure pool; returns the encoded bytes and their size and timings."""
+    profile = job.profile
+    with FIGURE_POOL.template(job.emas, job.panels, job.size, price_label_width(job)) as template:
+        _update(template, job)
+        start = time.perf_counter()
+        if profile == PROFILES["full"]:
+            binary_data = template.to_png()
+            draw_seconds = time.perf_counter() - start
+            # savefig encodes the PNG itself, so its encode time is part of the draw time
+            encode_seconds = None
+            width, height = template.fig.canvas.get_width_height()
+        else:
+            image = template.to_image(profile.render_dpi(template.fig.get_figwidth()))
+            draw_seconds = time.perf_counter() - start
+            width, height = image.size
+            gray_boxes = template.panel_boxes(SINGLE_LINE_PANELS, width, height) if profile.grayscale_panels else ()
+            binary_data = encode_image(image, profile, gray_boxes)
+            encode_seconds = time.perf_counter() - start - draw_seconds
+
+    stats = {
+        "profile": profile.name,
+        "mime_type": profile.mime_type,
+        "bytes": len(binary_data),
+        "width": width,
+        "height": height,
+        "draw_seconds": draw_seconds,
+        "encode_seconds": encode_seconds,
+    }
+    return binary_data, stats
+
+
+def render_job(job: ChartJob) -> bytes:
+    """Render a chart job on this process's figure pool and return the encoded image bytes."""
+    return render_image(job)[0]
+
+
+def render_composite(job: ChartJob, exports: Dict[str, Tuple[str, ...]], overlays: Tuple[str, ...] = ()) -> Dict[str, bytes]:
+    """
+    Draw the job's price chart and all of its panels once, then cut one image per
+    export: the price chart stacked with the export's panels, top to bottom.
+
+    Only the exports named in `overlays` show the EMA lines and their legend on
+    the price chart; when both kinds are exported the figure is drawn twice.
+    """
+    for name, panels in exports.items():
+        missing = set(panels) - set(job.panels)
+        if missing:
+            raise ValueError(f"Export {name!r} needs panels {sorted(missing)} that the chart job does not draw.")
+
+    profile = job.profile
+    with FIGURE_POOL.template(job.emas, job.panels, job.size, price_label_width(job)) as template:
+        _update(template, job)
+        images = {}
+        try:
+            for visible in sorted({name in overlays for name in exports}):
+                template.show_overlays(visible)
+                image = template.to_image(profile.render_dpi(template.fig.get_figwidth())).convert("RGB")
+                width, height = image.size
+                if profile.grayscale_panels:
+                    image = desaturate(image, template.panel_boxes(SINGLE_LINE_PANELS, width, height))
+                images[visible] = image
+                bands = template.bands(height)
+        finally:
+            template.show_overlays(True)
+
+    charts = {}
+    for name, panels in exports.items():
+        image = images[name in overlays]
+        rows = [bands["price"]] + [bands[panel] for panel in panels]
+        crop = Image.new("RGB", (width, sum(bottom - top for top, bottom in rows)), "white")
+        y = 0
+        for top, bottom in rows:
+            crop.paste(image.crop((0, top, width, bottom)), (0, y))
+            y += bottom - top
+        charts[name] = encode_image(crop, profile)
+    return charts
+
+
+class TechnicalCharts:
+    def __init__(self, currency_pair: str, interval: str, df: pd.DataFrame, size: int, chart_name: str, cache: ChartCache = CHART_CACHE, profile="full"):
+        self.currency_pair = currency_pair
+        self.interval = interval
+        self.df = df
+        self.size = size
+        self.chart_name = chart_name
+        self.chart_root_path = "data/chart"
+        self.cache = cache
+        # output profile (name in PROFILES or an ImageProfile) of the image bytes
+        self.profile = get_profile(profile)
+
+    def plot_chart(self, return_binary: bool = True,
+               EMA10: bool = False,
+               EMA20: bool = False,
+               EMA50: bool = False,
+               EMA100: bool = False,
+               RSI14: bool = False,
+               MACD: bool = False,
+               ROC12: bool = False,
+               ATR14: bool = False,
+               shading: bool = False):
+        """
+        Render the chart for the given indicator flags, served from the chart cache
+        when the same chart was already rendered for identical bars.
+        """
+        flags = dict(EMA10=EMA10, EMA20=EMA20, EMA50=EMA50, EMA100=EMA100, RSI14=RSI14,
+                     MACD=MACD, ROC12=ROC12, ATR14=ATR14, shading=shading)
+        key, cached = self._lookup(flags)
+        if cached is not None:
+            return self._output(*cached, return_binary)
+
+        data, job = self.chart_job(flags)
+        binary_data = render_job(job)
+        if key is not None:
+            self.cache.put(key, data, binary_data)
+        return self._output(data, binary_data, return_binary)
+
+    async def aplot_chart(self, return_binary: bool = True, renderer=None, **flags):
+        """
+        Non-blocking plot_chart: on a cache miss the chart job is rendered by
+        `renderer` (CHART_RENDERER by default) off the event loop and awaited.
+        """
+        if renderer is None:
+            from backend.utils.chart_renderer import CHART_RENDERER
+            renderer = CHART_RENDERER
+        flags = {flag: bool(flags.get(flag, False)) for flag in list(FLAG_COLUMNS) + ["shading"]}
+        key, cached = self._lookup(flags)
+        if cached is not None:
+            return self._output(*cached, return_binary)
+
+        data, job = self.chart_job(flags)
+        binary_data = await renderer.render(job)
+        if key is not None:
+            self.cache.put(key, data, binary_data)
+        return self._output(data, binary_data, return_binary)
+
+    def plot_panels(self, exports: Dict[str, Tuple[str, ...]], overlays: Tuple[str, ...] = (), **flags) -> Tuple[Dict, Dict[str, bytes]]:
+        """
+        Render the chart for `flags` once and return the current data and one image
+        per export, each the price chart over the export's panels (e.g. {"rsi": ("RSI",)}).
+        The EMA overlays are only drawn on the price chart of the exports in `overlays`.
+        """
+        flags = {flag: bool(flags.get(flag, False)) for flag in list(FLAG_COLUMNS) + ["shading"]}
+        data, charts, keys = self._lookup_exports(flags, exports, overlays)
+        if data is None:
+            data, job = self.chart_job(flags)
+            charts = render_composite(job, exports, overlays)
+            self._store_exports(keys, data, charts)
+        return data, charts
+
+    async def aplot_panels(self, exports: Dict[str, Tuple[str, ...]], overlays: Tuple[str, ...] = (), renderer=None, **flags) -> Tuple[Dict, Dict[str, bytes]]:
+        """Non-blocking plot_panels: on a cache miss the composite is rendered by `renderer` off the event loop."""
+        if renderer is None:
+            from backend.utils.chart_renderer import CHART_RENDERER
+            renderer = CHART_RENDERER
+        flags = {flag: bool(flags.get(flag, False)) for flag in list(FLAG_COLUMNS) + ["shading"]}
+        data, charts, keys = self._lookup_exports(flags, exports, overlays)
+        if data is None:
+            data, job = self.chart_job(flags)
+            charts = await renderer.render_composite(job, exports, overlays)
+            self._store_exports(keys, data, charts)
+        return data, charts
+
+    def _lookup_exports(self, flags: Dict[str, bool], exports: Dict[str, Tuple[str, ...]], overlays: Tuple[str, ...] = ()):
+        """Cached (data, charts) when every export is cached, else (None, None); plus the cache key of each export."""
+        keys, charts, data = {}, {}, None
+        for name, panels in exports.items():
+            # a crop differs from a chart rendered on its own, so it is cached under its own key
+            price = "price+overlays" if name in overlays else "price"
+            keys[name], cached = self._lookup(dict(flags, composite=",".join((price,) + tuple(panels))))
+            if cached is not None:
+                data, charts[name] = cached
+        if len(charts) < len(exports):
+            return None, None, keys
+        return data, charts, keys
+
+    def _store_exports(self, keys: Dict[str, str], data: Dict, charts: Dict[str, bytes]):
+        for name, key in keys.items():
+            if key is not None:
+                self.cache.put(key, data, charts[name])
+
+    def _lookup(self, flags: Dict[str, bool]):
+        if self.cache is None:
+            return None, None
+        columns = ["Open", "High", "Low", "Close"]
+        for flag, enabled in flags.items():
+            if enabled:
+                columns += FLAG_COLUMNS.get(flag, [])
+        if self.profile != PROFILES["full"]:
+            flags = dict(flags, profile=repr(self.profile))
+        key = chart_key(self.currency_pair, self.interval, self.size, flags, self.df, columns)
+        return key, self.cache.get(key)
+
+    def _output(self, data: Dict, binary_data: bytes, return_binary: bool):
         if return_binary:
-            import io
-            buf = io.BytesIO()
-            fig.savefig(buf, format='png')
-            buf.seek(0)
-            binary_data = buf.getvalue()
-            buf.close()
             return data, binary_data
+        with open(os.path.join(self.chart_root_path, f"{self.chart_name}.{self.profile.extension}"), "wb") as f:
+            f.write(binary_data)
+        return data, None
 
-        else:
-            fig.savefig(os.path.join(self.chart_root_path, f"{self.chart_name}.png"))
-            plt.close(fig)
-            return data, None
\ No newline at end of file
+    def chart_job(self, flags: Dict[str, bool]) -> Tuple[Dict, ChartJob]:
+        """The current indicator values and the array payload that renders the chart for `flags`."""
+        decimal_places = DECIMAL_PLACES[self.currency_pair]
+        fx_data = self.df.tail(self.size)
+        last = fx_data.iloc[-1]
+
+        emas = tuple(name for name in EMA_STYLES if flags.get(name))
+        panels = tuple(panel for panel, flag in PANEL_FLAGS.items() if flags.get(flag))
+        series = {
+            column: fx_data[column].to_numpy(dtype=float)
+            for flag, columns in FLAG_COLUMNS.items() if flags.get(flag) for column in columns
+        }
+
+        # collect current data
+        data = {"Close": last["Close"].round(decimal_places)}
+        for name in emas:
+            data[name] = last[name].round(decimal_places)
+        if flags.get("RSI14"):
+            data["RSI14"] = last["RSI14"].round(2)
+        if flags.get("MACD"):
+            for column in FLAG_COLUMNS["MACD"]:
+                data[column] = last[column].round(decimal_places)
+        if flags.get("ROC12"):
+            data["ROC12"] = last["ROC12"].round(2)
+        if flags.get("ATR14"):
+            data["ATR14"] = last["ATR"].round(decimal_places)
+
+        job = ChartJob(
+            currency_pair=self.currency_pair,
+            emas=emas,
+            panels=panels,
+            size=self.size,
+            dates=np.asarray(fx_data.index.strftime('%m-%d %H:%M'), dtype=str),
+            ohlc=fx_data[["Open", "High", "Low", "Close"]].to_numpy(dtype=float),
+            series=series,
+            decimal_places=decimal_places,
+            pip_interval=PIP_INTERVALS[self.currency_pair][self.interval],
+            shade_bars=SHADING_BARS[self.interval] if flags.get("shading") else 0,
+            profile=self.profile,
+        )
+        return data, job
+
+    def benchmark_profiles(self, profiles=None, **flags) -> pd.DataFrame:
+        """Bytes, pixel size and draw/encode time of this chart under each output profile, bypassing the cache."""
+        profiles = [get_profile(profile) for profile in (profiles or PROFILES)]
+        flags = {flag: bool(flags.get(flag, False)) for flag in list(FLAG_COLUMNS) + ["shading"]}
+        _, job = self.chart_job(flags)
+        render_job(job)  # builds the figure template, so every profile is timed warm
+        rows = []
+        for profile in profiles:
+            job.profile = profile
+            rows.append(render_image(job)[1])
+        return pd.DataFrame(rows).set_index("profile")
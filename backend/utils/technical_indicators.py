@@ -1,113 +1,108 @@
-import ta
+import numpy as np
 import pandas as pd
+from typing import Iterator, List, Tuple
+from backend.utils.indicator_registry import IndicatorSpec, IndicatorPlanner, resolve_specs, specs_for_analysis
 
 class TechnicalIndicators:
     def __init__(self):
         pass
     
     @staticmethod
-    def calculate_technical_indicators(df, sma=False, ema=True, rsi=True, macd=True, roc=True, bbands=True, atr=True) -> pd.DataFrame:
+    def calculate_technical_indicators(df, sma=False, ema=True, rsi=True, macd=True, roc=True, bbands=True, atr=True,
+                                       analysis_types: List[str] = None, specs: List[IndicatorSpec] = None) -> pd.DataFrame:
+        """
+        Add indicator columns to an OHLC frame.
+
+        The boolean flags select groups of INDICATOR_REGISTRY. `analysis_types` (e.g. ["rsi"])
+        restricts the computation to what those analyses read, and `specs` computes an explicit
+        list of IndicatorSpecs instead. Shared intermediates are only computed once.
+        """
         df = df.copy()
 
         # Ensure the index is a DateTimeIndex
         if not isinstance(df.index, pd.DatetimeIndex):
             raise ValueError("DataFrame index must be a DateTimeIndex")
 
-        # --- Simple Moving Average (SMA) ---
-        if sma:
-            df['SMA10'] = ta.trend.sma_indicator(df['Close'], window=10)
-            df['SMA20'] = ta.trend.sma_indicator(df['Close'], window=20)
-            df['SMA50'] = ta.trend.sma_indicator(df['Close'], window=50)
-            df['SMA100'] = ta.trend.sma_indicator(df['Close'], window=100)
-
-        # --- Exponential Moving Average (EMA) ---
-        if ema:
-            df['EMA10'] = ta.trend.ema_indicator(df['Close'], window=10)
-            df['EMA20'] = ta.trend.ema_indicator(df['Close'], window=20)
-            df['EMA50'] = ta.trend.ema_indicator(df['Close'], window=50)
-            df['EMA100'] = ta.trend.ema_indicator(df['Close'], window=100)
-
-        # --- Relative Strength Index (RSI) ---
-        if rsi:
-            df['RSI14'] = ta.momentum.rsi(df['Close'], window=14)
-
-        # --- Moving Average Convergence Divergence (MACD) ---
-        if macd:
-            macd = ta.trend.MACD(df['Close'], window_slow=26, window_fast=12, window_sign=9)
-            df['MACD'] = macd.macd()
-            df['MACD_Signal'] = macd.macd_signal()
-            df['MACD_Diff'] = macd.macd_diff()  # This is the MACD Histogram
-
-        # --- Rate of Change (ROC) ---
-        if roc:
-            df['ROC12'] = ta.momentum.roc(df['Close'], window=12)
-
-        # --- Bollinger Bands (Default: 20 SMA, ±2 std) ---
-        if bbands:
-            bollinger = ta.volatility.BollingerBands(close=df['Close'], window=20, window_dev=2)
-            df['BB_Mid']   = bollinger.bollinger_mavg()   # Middle band (20 SMA by default)
-            df['BB_Upper'] = bollinger.bollinger_hband()  # Upper band (+2 std)
-            df['BB_Lower'] = bollinger.bollinger_lband() 
-
-        # --- Average True Range (ATR) ---
-        if atr:
-            atr = ta.volatility.AverageTrueRange(high=df['High'], low=df['Low'], close=df['Close'], window=14)
-            df['ATR'] = atr.average_true_range()
-            
+        if specs is None:
+            if analysis_types is not None:
+                specs = specs_for_analysis(analysis_types)
+            else:
+                flags = {"sma": sma, "ema": ema, "rsi": rsi, "macd": macd, "roc": roc, "bbands": bbands, "atr": atr}
+                specs = resolve_specs(group for group, enabled in flags.items() if enabled)
+
+        indicators = IndicatorPlanner(df).run(specs)
+        for column, values in indicators.items():
+            df[column] = values
+
         df['Date'] = df.index
         
         return df
     
-    @staticmethod
-    def get_ma_context(df: pd.DataFrame, decimal_places: int, period: int = 20) -> str:
-        df = df.copy()
+    # --- Crossover definitions: (series A, series B or constant level, text when A crosses above, text when A crosses below) ---
+    MA_CROSSOVERS = [
+        ("EMA20", "EMA50", "EMA20 crossed above EMA50.", "EMA20 crossed below EMA50."),
+        ("EMA50", "EMA100", "EMA50 crossed above EMA100.", "EMA50 crossed below EMA100."),
+        ("Close", "EMA20", "the closing price crossed above EMA20.", "the closing price crossed below EMA20."),
+        ("Close", "EMA50", "the closing price crossed above EMA50.", "the closing price crossed below EMA50."),
+        ("Close", "EMA100", "the closing price crossed above EMA100.", "the closing price crossed below EMA100."),
+    ]
+
+    MACD_CROSSOVERS = [
+        ("MACD", "MACD_Signal", "MACD crossed above the MACD Signal line.", "MACD crossed below the MACD Signal line."),
+        ("MACD_Diff", 0, "the MACD histogram turned positive (MACD_Diff crossed above 0).", "the MACD histogram turned negative (MACD_Diff crossed below 0)."),
+    ]
 
-        df['EMA20_cross_above_EMA50'] = (df['EMA20'] > df['EMA50']) & (df['EMA20'].shift(1) <= df['EMA50'].shift(1))
-        df['EMA20_cross_below_EMA50'] = (df['EMA20'] < df['EMA50']) & (df['EMA20'].shift(1) >= df['EMA50'].shift(1))
-
-        # Similarly, you can detect crossovers between other EMAs
-        df['EMA50_cross_above_EMA100'] = (df['EMA50'] > df['EMA100']) & (df['EMA50'].shift(1) <= df['EMA100'].shift(1))
-        df['EMA50_cross_below_EMA100'] = (df['EMA50'] < df['EMA100']) & (df['EMA50'].shift(1) >= df['EMA100'].shift(1))
-
-        # Detect when the Close price crosses above or below EMA20
-        df['Price_cross_above_EMA20'] = (df['Close'] > df['EMA20']) & (df['Close'].shift(1) <= df['EMA20'].shift(1))
-        df['Price_cross_below_EMA20'] = (df['Close'] < df['EMA20']) & (df['Close'].shift(1) >= df['EMA20'].shift(1))
+    @staticmethod
+    def detect_crossover_events(df: pd.DataFrame, crossovers: List[Tuple], period: int = 20) -> np.ndarray:
+        """
+        Detect crossovers of the last `period` bars.
+
+        Each crossover is (A, B, ...) where B is a column name or a constant level (zero-crossing).
+        Returns an int array of shape (n_events, 2) with rows (bar position in df, event code), ordered
+        by bar and then by code. Event code 2*k is "A crossed above B" for crossovers[k], 2*k+1 is "below".
+        """
+        n = len(df)
+        # one extra bar is needed to compare the first bar of the window with its predecessor
+        start = max(n - period - 1, 0)
+
+        a = np.column_stack([df[spec[0]].to_numpy(dtype=float)[start:] for spec in crossovers])
+        b = np.column_stack([
+            df[spec[1]].to_numpy(dtype=float)[start:] if isinstance(spec[1], str) else np.full(n - start, float(spec[1]))
+            for spec in crossovers
+        ])
+
+        curr_a, curr_b = a[1:], b[1:]
+        prev_a, prev_b = a[:-1], b[:-1]
+        above = (curr_a > curr_b) & (prev_a <= prev_b)
+        below = (curr_a < curr_b) & (prev_a >= prev_b)
+
+        # interleave to (bars, 2 * n_crossovers) so np.nonzero yields bar-major order
+        flags = np.empty((above.shape[0], 2 * len(crossovers)), dtype=bool)
+        flags[:, 0::2] = above
+        flags[:, 1::2] = below
+
+        bars, codes = np.nonzero(flags)
+        return np.column_stack([bars + start + 1, codes])
 
-        # Detect when the Close price crosses above or below EMA50
-        df['Price_cross_above_EMA50'] = (df['Close'] > df['EMA50']) & (df['Close'].shift(1) <= df['EMA50'].shift(1))
-        df['Price_cross_below_EMA50'] = (df['Close'] < df['EMA50']) & (df['Close'].shift(1) >= df['EMA50'].shift(1))
+    @staticmethod
+    def describe_crossover_events(df: pd.DataFrame, events: np.ndarray, crossovers: List[Tuple]) -> Iterator[str]:
+        """Lazily render an event table from detect_crossover_events as natural language."""
+        dates = df["Date"] if "Date" in df.columns else df.index.to_series()
+        for bar, code in events:
+            spec = crossovers[code // 2]
+            text = spec[2] if code % 2 == 0 else spec[3]
+            yield f"On {dates.iloc[bar]}, {text}"
 
-        # Detect when the Close price crosses above or below EMA100
-        df['Price_cross_above_EMA100'] = (df['Close'] > df['EMA100']) & (df['Close'].shift(1) <= df['EMA100'].shift(1))
-        df['Price_cross_below_EMA100'] = (df['Close'] < df['EMA100']) & (df['Close'].shift(1) >= df['EMA100'].shift(1))
+    @staticmethod
+    def get_ma_context(df: pd.DataFrame, decimal_places: int, period: int = 20) -> str:
+        crossovers = TechnicalIndicators.MA_CROSSOVERS
+        events = TechnicalIndicators.detect_crossover_events(df, crossovers, period)
 
         # Create a list to store our natural language events
-        events = [f"In the last {period} bars: "]
-
-        for idx, row in df[period * -1:].iterrows():
-            date = row['Date']
-            if row['EMA20_cross_above_EMA50']:
-                events.append(f"On {date}, EMA20 crossed above EMA50.")
-            if row['EMA20_cross_below_EMA50']:
-                events.append(f"On {date}, EMA20 crossed below EMA50.")
-            if row['EMA50_cross_above_EMA100']:
-                events.append(f"On {date}, EMA50 crossed above EMA100.")
-            if row['EMA50_cross_below_EMA100']:
-                events.append(f"On {date}, EMA50 crossed below EMA100.")
-            if row['Price_cross_above_EMA20']:
-                events.append(f"On {date}, the closing price crossed above EMA20.")
-            if row['Price_cross_below_EMA20']:
-                events.append(f"On {date}, the closing price crossed below EMA20.")
-            if row['Price_cross_above_EMA50']:	
-                events.append(f"On {date}, the closing price crossed above EMA50.")
-            if row['Price_cross_below_EMA50']:
-                events.append(f"On {date}, the closing price crossed below EMA50.")
-            if row['Price_cross_above_EMA100']:
-                events.append(f"On {date}, the closing price crossed above EMA100.")
-            if row['Price_cross_below_EMA100']:
-                events.append(f"On {date}, the closing price crossed below EMA100.")
-        
-        cross_over_context = "\n".join(events) if events else "No significant crossover events detected."
+        lines = [f"In the last {period} bars: "]
+        lines.extend(TechnicalIndicators.describe_crossover_events(df, events, crossovers))
+
+        cross_over_context = "\n".join(lines) if lines else "No significant crossover events detected."
 
         last_bar = df.iloc[-1]
         values = {
@@ -123,34 +118,15 @@ class TechnicalIndicators:
     
     @staticmethod
     def get_macd_context(df: pd.DataFrame, decimal_places: int, period: int = 20) -> str:
-        # Create a copy of the dataframe
-        df = df.copy()
-        
-        # Detect when the MACD line crosses above or below the MACD Signal line
-        df['MACD_cross_above_Signal'] = (df['MACD'] > df['MACD_Signal']) & (df['MACD'].shift(1) <= df['MACD_Signal'].shift(1))
-        df['MACD_cross_below_Signal'] = (df['MACD'] < df['MACD_Signal']) & (df['MACD'].shift(1) >= df['MACD_Signal'].shift(1))
-        
-        # Detect when the MACD histogram (MACD_Diff) crosses zero
-        df['MACD_Diff_cross_above_0'] = (df['MACD_Diff'] > 0) & (df['MACD_Diff'].shift(1) <= 0)
-        df['MACD_Diff_cross_below_0'] = (df['MACD_Diff'] < 0) & (df['MACD_Diff'].shift(1) >= 0)
-        
+        crossovers = TechnicalIndicators.MACD_CROSSOVERS
+        events = TechnicalIndicators.detect_crossover_events(df, crossovers, period)
+
         # List to store natural language events for the most recent period
-        events = [f"In the last {period} bars: "]
-        
-        # Iterate over the last 20 rows of the dataframe
-        for idx, row in df[period * -1:].iterrows():
-            date = row['Date']
-            if row['MACD_cross_above_Signal']:
-                events.append(f"On {date}, MACD crossed above the MACD Signal line.")
-            if row['MACD_cross_below_Signal']:
-                events.append(f"On {date}, MACD crossed below the MACD Signal line.")
-            if row['MACD_Diff_cross_above_0']:
-                events.append(f"On {date}, the MACD histogram turned positive (MACD_Diff crossed above 0).")
-            if row['MACD_Diff_cross_below_0']:
-                events.append(f"On {date}, the MACD histogram turned negative (MACD_Diff crossed below 0).")
+        lines = [f"In the last {period} bars: "]
+        lines.extend(TechnicalIndicators.describe_crossover_events(df, events, crossovers))
         
         # Build the context string for MACD events
-        macd_context = "\n".join(events) if events else "No significant MACD events detected."
+        macd_context = "\n".join(lines) if lines else "No significant MACD events detected."
         
         # Summarize the latest indicator values, rounding them appropriately.
         last_bar = df.iloc[-1]
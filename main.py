@@ -152,7 +152,6 @@ def main():
     for currency_pair in ["EUR/USD", "USD/JPY"]:   
         executor = StrategyExecutor(currency_pair=currency_pair, root_path=root_path, sl_pips=15, tp_pips=30, trailing_pips=None)
         executor.execute()
-        time.sleep(60)
     
 if __name__ == "__main__":
     #back_test("EUR/USD", r"simulation\trading_strategy.csv")
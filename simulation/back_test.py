@@ -1,9 +1,83 @@
+import numpy as np
 import pandas as pd
-from backend.service.data_collection import TechnicalIndicators
+from backend.service.BarStore import BAR_STORE
+from backend.service.TwelveData import TwelveData
 from backend.utils.parameters import CURRENCY_TICKERS
+from backend.utils.rate_limiter import PRIORITY_BACKTEST
+
+TIMEZONE = "Europe/Berlin"
+NS_PER_HOUR = 3600 * 10**9
+
+
+# --- First-hit kernels ---
+def window_matrix(values: np.ndarray, starts: np.ndarray, ends: np.ndarray):
+    """
+    Gather the bars [start, end) of every order into one (orders, max window) matrix.
+
+    Returns (matrix, valid) where `valid` masks the padding of shorter windows.
+    """
+    width = int((ends - starts).max()) if len(starts) else 0
+    index = starts[:, None] + np.arange(max(width, 1))
+    valid = index < ends[:, None]
+    return values[np.minimum(index, len(values) - 1)], valid
+
+
+def first_hit(values: np.ndarray, starts: np.ndarray, ends: np.ndarray, levels: np.ndarray, above: np.ndarray,
+              chunk_size: int = 512) -> np.ndarray:
+    """
+    Index of the first bar in [start, end) where `values` reaches `level`, for all orders at once.
+
+    `above` selects per order whether the level is hit from below (values >= level)
+    or from above (values <= level). Returns -1 where the level is never reached.
+    """
+    hits = np.full(len(starts), -1, dtype=np.int64)
+    for lo in range(0, len(starts), chunk_size):
+        part = slice(lo, lo + chunk_size)
+        matrix, valid = window_matrix(values, starts[part], ends[part])
+        level = levels[part, None]
+        hit = np.where(above[part, None], matrix >= level, matrix <= level) & valid
+        found = hit.any(axis=1)
+        hits[part] = np.where(found, starts[part] + hit.argmax(axis=1), -1)
+    return hits
+
+
+def first_touch(high: np.ndarray, low: np.ndarray, starts: np.ndarray, ends: np.ndarray, levels: np.ndarray,
+                above: np.ndarray) -> np.ndarray:
+    """first_hit on High for levels reached from below and on Low for levels reached from above."""
+    hits = np.full(len(starts), -1, dtype=np.int64)
+    for side, values, from_below in ((above, high, True), (~above, low, False)):
+        if side.any():
+            hits[side] = first_hit(values, starts[side], ends[side], levels[side], np.full(side.sum(), from_below))
+    return hits
+
+
+def first_crossings(running: np.ndarray, valid: np.ndarray, levels: np.ndarray, from_below: bool) -> np.ndarray:
+    """
+    Offsets of the first bar where a running max (from_below) or running min reaches
+    each of several levels; `levels` is (orders, n_levels). Running extremes are
+    monotone, so the offset is the number of bars before the crossing, and equals
+    the window length where the level is never reached (returned as -1).
+    """
+    pad = np.inf if from_below else -np.inf
+    running = np.where(valid, running, pad)[:, :, None]
+    levels = levels[:, None, :]
+    offsets = (running < levels).sum(axis=1) if from_below else (running > levels).sum(axis=1)
+    return np.where(offsets < valid.sum(axis=1)[:, None], offsets, -1)
+
 
 class BackTest:
-    def __init__(self, currency_pair: str, strategy_file_path: str, test_result_file_path:str,  custom: bool = False, profit_pips = None, loss_pips = None, fill_period = 2):
+    """
+    Evaluates a strategy file against 1-minute prices.
+
+    All orders are evaluated together: the prices of the whole test period are
+    loaded once as contiguous arrays, each order's fill and exit windows are
+    located with searchsorted, and fill, take-profit and stop-loss times come
+    from vectorized first-hit kernels instead of per-row pandas scans.
+    """
+
+    DOWNLOAD_DAYS = 3  # 1-minute bars per TwelveData request stay below its 5000 bar limit
+
+    def __init__(self, currency_pair: str, strategy_file_path: str, test_result_file_path:str,  custom: bool = False, profit_pips = None, loss_pips = None, fill_period = 2, price_data: pd.DataFrame = None):
         self.currency_pair = currency_pair
         self.currency_ticker = CURRENCY_TICKERS[currency_pair]
         self.strategy_file_path = strategy_file_path
@@ -13,6 +87,7 @@ class BackTest:
         self.profit_pips = profit_pips
         self.loss_pips = loss_pips
         self.fill_period = fill_period
+        self.price_data = price_data
         if self.currency_pair == "EUR/USD":
             self.pip = 0.0001
         if self.currency_pair == "USD/JPY":
@@ -21,21 +96,56 @@ class BackTest:
     def validate_custom_input(self, custom, profit_pips, loss_pips):
         if custom:
             if profit_pips is None or loss_pips is None:
-                raise ValueError("If custom is True, profit_pips and loss_pips can not be None")    
-    
-    def get_price(self, output_size, end_date):
-        ti = TechnicalIndicators(currency_pair=self.currency_pair, interval="1min", outputsize=output_size, end_date=end_date)
-        price_data = ti.download_data_wo_ti()
+                raise ValueError("If custom is True, profit_pips and loss_pips can not be None")
+
+    @staticmethod
+    def to_berlin(index: pd.Index) -> pd.DatetimeIndex:
+        if not isinstance(index, pd.DatetimeIndex):
+            # order times spanning a DST change carry mixed offsets and parse as objects
+            index = pd.DatetimeIndex(pd.to_datetime(index, utc=True))
         try:
-            dt_index_berlin = price_data.index.tz_convert("Europe/Berlin")
-        except:
-            dt_index_berlin = price_data.index.tz_localize("Europe/Berlin")
-        price_data.index = dt_index_berlin
+            return index.tz_convert(TIMEZONE)
+        except TypeError:
+            return index.tz_localize(TIMEZONE)
+
+    def download_price(self, start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame:
+        frames = []
+        for chunk_start in pd.date_range(start, end, freq=f"{self.DOWNLOAD_DAYS}D"):
+            chunk_end = min(chunk_start + pd.Timedelta(days=self.DOWNLOAD_DAYS), end)
+            data = TwelveData(
+                currency_pair=self.currency_pair,
+                interval="1min",
+                start_date=chunk_start.strftime("%Y-%m-%d %H:%M:%S"),
+                end_date=chunk_end.strftime("%Y-%m-%d %H:%M:%S"),
+                priority=PRIORITY_BACKTEST,
+            ).get_data()
+            if data is not None:
+                frames.append(data)
+        if not frames:
+            raise ValueError(f"No 1-minute prices for {self.currency_pair} between {start} and {end}")
+        data = pd.concat(frames)
+        return data[~data.index.duplicated(keep="last")].sort_index()
+
+    def get_price(self, start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame:
+        """One contiguous frame of 1-minute bars covering [start, end], from the bar store when it covers the period."""
+        start, end = self.to_berlin(pd.DatetimeIndex([start, end]))
+        first, last = BAR_STORE.first_timestamp(self.currency_pair, "1min"), BAR_STORE.last_timestamp(self.currency_pair, "1min")
+        stored = pd.DatetimeIndex([first, last]) if first is not None else None
+        covered = stored is not None and self.to_berlin(stored)[0] <= start and self.to_berlin(stored)[1] >= min(end, pd.Timestamp.now(tz=TIMEZONE))
+        if covered:
+            if stored.tz is None:
+                # naive stored bars are Berlin times, like every naive time of the back test
+                price_data = BAR_STORE.read_range(self.currency_pair, "1min", start.tz_localize(None), end.tz_localize(None))
+            else:
+                price_data = BAR_STORE.read_range(self.currency_pair, "1min", start, end)
+        else:
+            price_data = self.download_price(start, end)
+        price_data.index = self.to_berlin(price_data.index)
         return price_data
-    
+
     def get_strategy(self):
         strategy_data = pd.read_csv(self.strategy_file_path, parse_dates=["order_time"], index_col="order_time")
-        
+
         if self.custom:
             strategy_data.loc[strategy_data["strategy"] == "buy", "stop_loss_custom"] = strategy_data["entry_point"] - self.pip * self.loss_pips
             strategy_data.loc[strategy_data["strategy"] == "buy", "take_profit_custom"] = strategy_data["entry_point"] + self.pip * self.profit_pips
@@ -44,115 +154,220 @@ class BackTest:
             strategy_data.loc[strategy_data["strategy"] == "sell", "take_profit_custom"] = strategy_data["entry_point"] - self.pip * self.profit_pips
 
         return strategy_data
-    
-    def get_trade_status(self, row, timeseries):
-        price_at_order = None
-        current_status = "pending"
-        entry_time = None
-        entry_point = None
-        close_time = None
-        close_price = None
-        profit = None
-        if row["strategy"] == "wait":
-            return {"price_at_order": price_at_order, "status": "no_order", "entry_time": entry_time, "entry_price": entry_point, "close_time": close_time, "close_price": close_price, "profit": profit}
-        start_time = timeseries.index[0]
-        end_time = start_time + pd.Timedelta(hours=self.fill_period)
-        timeseries_window = timeseries.loc[timeseries.index <= end_time]
-
-        price_at_order = timeseries_window.iloc[0]["Close"]
-        entry_point = row['entry_point']
-
-        if row['strategy'] == 'sell':
-            if entry_point > price_at_order:
-                fill_condition = timeseries_window['High'] >= entry_point
-            else:
-                fill_condition = timeseries_window['Low'] <= entry_point
-        elif row['strategy'] == 'buy':
-            if entry_point < price_at_order:
-                fill_condition = timeseries_window['Low'] <= entry_point
-            else:
-                fill_condition = timeseries_window['High'] >= entry_point
-        if fill_condition.any():
-            entry_time = fill_condition.idxmax()
-            current_status = "open"
-            
-        else:
-            current_status = "cancel"
-            return  {"price_at_order": price_at_order, "status": current_status, "entry_time": entry_time, "entry_price": entry_point, "close_time": close_time, "close_price": close_price, "profit": profit}
 
-        end_of_day = entry_time.normalize() + pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
-        timeseries_window = timeseries.loc[(timeseries.index >= entry_time) & (timeseries.index <= end_of_day)]
+    # --- Vectorized evaluation ---
+    def price_arrays(self, order_times: pd.DatetimeIndex):
+        """(timestamps int64 ns, high, low, close) of the whole test period; cached for repeated evaluations."""
+        if self.price_data is None:
+            self.price_data = self.get_price(order_times.min(), order_times.max() + pd.Timedelta(hours=48))
+        self.price_data.index = self.to_berlin(self.price_data.index)
+        return (
+            self.to_int(self.price_data.index),
+            self.price_data["High"].to_numpy(dtype=float),
+            self.price_data["Low"].to_numpy(dtype=float),
+            self.price_data["Close"].to_numpy(dtype=float),
+        )
 
-        if self.custom:
-            sl_val = row["stop_loss_custom"]
-            tp_val = row["take_profit_custom"]
-        else:
-            sl_val = row["stop_loss"]
-            tp_val = row["take_profit"]
+    @staticmethod
+    def to_int(index: pd.DatetimeIndex) -> np.ndarray:
+        return index.tz_convert("UTC").as_unit("ns").asi8
 
-        tp_condition = timeseries_window["High"] >= tp_val if row["strategy"] == "buy" else timeseries_window["Low"] <= tp_val
-        sl_condition = timeseries_window["High"] >= sl_val if row["strategy"] == "sell" else timeseries_window["Low"] <= sl_val
+    def compute_fills(self, orders: pd.DataFrame, prices, fill_period: float = None):
+        """
+        Order start bar, price at order and fill bar (-1 if never filled) of every order.
 
-        tp_time = tp_condition.idxmax() if tp_condition.any() else None
-        sl_time = sl_condition.idxmax() if sl_condition.any() else None
+        An order fills once the price moves from where it was at order time
+        to the entry: a High touch for entries above it, a Low touch below.
+        """
+        fill_period = self.fill_period if fill_period is None else fill_period
+        timestamps, high, low, close = prices
+        order_ns = self.to_int(orders.index)
 
-        if tp_time and sl_time:
-            if tp_time < sl_time:
-                close_time = tp_time
-                close_price = tp_val
-                current_status = "take_profit"
-            else:
-                close_time = sl_time
-                close_price = sl_val
-                current_status = "stop_loss"
-        elif tp_time is not None:
-            close_time = tp_time
-            close_price = tp_val
-            current_status = "take_profit"
-        elif sl_time is not None:
-            close_time = sl_time
-            close_price = sl_val
-            current_status = "stop_loss"
-        else:
-            close_time = timeseries_window.index[-1]
-            close_price = timeseries_window["Close"].iloc[-1]
-            current_status = "eod"
+        starts = np.searchsorted(timestamps, order_ns, side="left")
+        has_data = starts < len(timestamps)
+        starts = np.minimum(starts, len(timestamps) - 1)
+        fill_ends = np.searchsorted(timestamps, timestamps[starts] + int(fill_period * NS_PER_HOUR), side="right")
+
+        price_at_order = close[starts]
+        entry = orders["entry_point"].to_numpy(dtype=float)
+        is_buy = (orders["strategy"] == "buy").to_numpy()
+        # True: the fill is a High touching the entry from below
+        above = np.where(is_buy, entry >= price_at_order, entry > price_at_order)
+
+        fills = first_touch(high, low, starts, fill_ends, entry, above)
+        fills[~has_data] = -1
+        return starts, has_data, price_at_order, fills
+
+    def exit_windows(self, fills: np.ndarray, prices) -> np.ndarray:
+        """End (exclusive) of every filled order's exit window: the end of the Berlin day it was filled on."""
+        timestamps = prices[0]
+        entry_times = pd.DatetimeIndex(timestamps[fills].astype("datetime64[ns]")).tz_localize("UTC").tz_convert(TIMEZONE)
+        end_of_day = entry_times.normalize() + pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
+        return np.searchsorted(timestamps, self.to_int(end_of_day), side="right")
+
+    def evaluate_orders(self, orders: pd.DataFrame, prices) -> pd.DataFrame:
+        """Fill and exit of all open/pending orders in one pass; returns the status columns indexed like `orders`."""
+        timestamps, high, low, close = prices
+        result = pd.DataFrame(index=orders.index, columns=["price_at_order", "status", "entry_time", "entry_price", "close_time", "close_price", "profit"], dtype=object)
+
+        wait = (orders["strategy"] == "wait").to_numpy()
+        result.loc[wait, "status"] = "no_order"
+        orders = orders[~wait]
+        if orders.empty:
+            return result
+
+        starts, has_data, price_at_order, fills = self.compute_fills(orders, prices)
+        result.loc[orders.index[has_data], "price_at_order"] = price_at_order[has_data]
+        result.loc[orders.index[has_data], "entry_price"] = orders["entry_point"].to_numpy()[has_data]
+        result.loc[orders.index[has_data & (fills < 0)], "status"] = "cancel"
+
+        filled = fills >= 0
+        orders, fills = orders[filled], fills[filled]
+        if orders.empty:
+            return result
+
+        is_buy = (orders["strategy"] == "buy").to_numpy()
+        entry = orders["entry_point"].to_numpy(dtype=float)
+        sl_val = orders["stop_loss_custom" if self.custom else "stop_loss"].to_numpy(dtype=float)
+        tp_val = orders["take_profit_custom" if self.custom else "take_profit"].to_numpy(dtype=float)
+
+        exit_ends = self.exit_windows(fills, prices)
+        tp_hits = first_touch(high, low, fills, exit_ends, tp_val, is_buy)
+        sl_hits = first_touch(high, low, fills, exit_ends, sl_val, ~is_buy)
+
+        close_index, close_price, status = self.resolve_exits(tp_hits, sl_hits, exit_ends, tp_val, sl_val, close)
+        profit = np.where(is_buy, close_price - entry, entry - close_price) / self.pip
 
-        profit = close_price - entry_point if row["strategy"] == "buy" else entry_point - close_price
-        profit_pips = profit / self.pip
-        return  {"price_at_order": price_at_order, "status": current_status, "entry_time": entry_time, "entry_price": entry_point, "close_time": close_time, "close_price": close_price, "profit": round(profit_pips, 1)}
+        berlin = lambda index: pd.DatetimeIndex(timestamps[index].astype("datetime64[ns]")).tz_localize("UTC").tz_convert(TIMEZONE)
+        result.loc[orders.index, "status"] = status
+        result.loc[orders.index, "entry_time"] = berlin(fills)
+        result.loc[orders.index, "close_time"] = berlin(close_index)
+        result.loc[orders.index, "close_price"] = close_price
+        result.loc[orders.index, "profit"] = np.round(profit, 1)
+        return result
 
+    @staticmethod
+    def resolve_exits(tp_hits, sl_hits, exit_ends, tp_val, sl_val, close):
+        """Take profit if it is hit strictly before the stop loss, else stop loss, else close at the end of day."""
+        tp_first = (tp_hits >= 0) & ((sl_hits < 0) | (tp_hits < sl_hits))
+        sl_first = (sl_hits >= 0) & ~tp_first
+        eod_index = exit_ends - 1
+
+        close_index = np.where(tp_first, tp_hits, np.where(sl_first, sl_hits, eod_index))
+        close_price = np.where(tp_first, tp_val, np.where(sl_first, sl_val, close[eod_index]))
+        status = np.where(tp_first, "take_profit", np.where(sl_first, "stop_loss", "eod"))
+        return close_index, close_price, status
 
     def evaluate_strategy(self):
         strategy_data = self.get_strategy()
+        strategy_data.index = self.to_berlin(strategy_data.index)
         not_closed_strategy = strategy_data[strategy_data["status"].isin(["open", "pending"])]
 
-        i = 0
-        for time_index, row in not_closed_strategy.iterrows():
-            fx_data = self.get_price(output_size=48*60, end_date=time_index + pd.Timedelta(hours=48))
-            fx_data = fx_data[fx_data.index >= time_index]
-            status_dict = self.get_trade_status(row, fx_data)
-            for k, v in status_dict.items():
-                strategy_data.at[time_index, k] = v
+        if not not_closed_strategy.empty:
+            prices = self.price_arrays(not_closed_strategy.index)
+            status = self.evaluate_orders(not_closed_strategy, prices)
+            status = status[status["status"].notna()]
+            for column in status.columns:
+                strategy_data[column] = strategy_data[column].astype(object) if column in strategy_data else None
+                strategy_data.loc[status.index, column] = status[column]
         strategy_data.reset_index(drop=False, inplace=True, names="order_time")
 
         return strategy_data
-    
+
+    # --- Parameter sweep ---
+    def sweep(self, profit_pips, loss_pips, fill_periods=None, chunk_size: int = 256) -> pd.DataFrame:
+        """
+        Evaluate every (fill_period, profit_pips, loss_pips) bracket combination in one pass.
+
+        Prices are loaded once; fills and exit windows are computed once per fill
+        period and shared by all TP/SL variants, whose first crossings are read off
+        the running High max / Low min of each trade. Returns one row per
+        combination with trade counts, win rate, expectancy and pips.
+        """
+        profit_pips = np.atleast_1d(np.asarray(profit_pips, dtype=float))
+        loss_pips = np.atleast_1d(np.asarray(loss_pips, dtype=float))
+        fill_periods = [self.fill_period] if fill_periods is None else list(np.atleast_1d(fill_periods))
+
+        strategy_data = self.get_strategy()
+        strategy_data.index = self.to_berlin(strategy_data.index)
+        orders = strategy_data[strategy_data["status"].isin(["open", "pending"]) & (strategy_data["strategy"] != "wait")]
+        if orders.empty:
+            return pd.DataFrame()
+        prices = self.price_arrays(orders.index)
+        _, high, low, close = prices
+
+        rows = []
+        for fill_period in fill_periods:
+            _, has_data, _, fills = self.compute_fills(orders, prices, fill_period=fill_period)
+            filled = fills >= 0
+            entry = orders["entry_point"].to_numpy(dtype=float)[filled]
+            is_buy = (orders["strategy"] == "buy").to_numpy()[filled]
+            fills = fills[filled]
+            exit_ends = self.exit_windows(fills, prices) if len(fills) else fills
+
+            # (filled orders, profit_pips, loss_pips) pips of each trade
+            sign = np.where(is_buy, 1.0, -1.0)[:, None]
+            tp_val = entry[:, None] + sign * self.pip * profit_pips
+            sl_val = entry[:, None] - sign * self.pip * loss_pips
+            pips = np.empty((len(fills), len(profit_pips), len(loss_pips)))
+            outcome = np.empty(pips.shape, dtype=np.int8)  # 1 take profit, -1 stop loss, 0 end of day
+
+            for lo in range(0, len(fills), chunk_size):
+                part = slice(lo, lo + chunk_size)
+                highs, valid = window_matrix(high, fills[part], exit_ends[part])
+                lows, _ = window_matrix(low, fills[part], exit_ends[part])
+                running_high = np.maximum.accumulate(np.where(valid, highs, -np.inf), axis=1)
+                running_low = np.minimum.accumulate(np.where(valid, lows, np.inf), axis=1)
+                buy = is_buy[part, None]
+
+                tp_hits = np.where(buy, first_crossings(running_high, valid, tp_val[part], True),
+                                   first_crossings(running_low, valid, tp_val[part], False))
+                sl_hits = np.where(buy, first_crossings(running_low, valid, sl_val[part], False),
+                                   first_crossings(running_high, valid, sl_val[part], True))
+
+                tp_hits, sl_hits = tp_hits[:, :, None], sl_hits[:, None, :]
+                tp_first = (tp_hits >= 0) & ((sl_hits < 0) | (tp_hits < sl_hits))
+                sl_first = (sl_hits >= 0) & ~tp_first
+                eod_price = close[exit_ends[part] - 1][:, None, None]
+                close_price = np.where(tp_first, tp_val[part][:, :, None], np.where(sl_first, sl_val[part][:, None, :], eod_price))
+                pips[part] = np.round(sign[part, :, None] * (close_price - entry[part, None, None]) / self.pip, 1)
+                outcome[part] = np.where(tp_first, 1, np.where(sl_first, -1, 0))
+
+            for i, profit in enumerate(profit_pips):
+                for j, loss in enumerate(loss_pips):
+                    trade_pips = pips[:, i, j]
+                    trades = len(trade_pips)
+                    rows.append({
+                        "fill_period": fill_period,
+                        "profit_pips": profit,
+                        "loss_pips": loss,
+                        "orders": int(has_data.sum()),
+                        "filled": trades,
+                        "take_profit": int((outcome[:, i, j] == 1).sum()),
+                        "stop_loss": int((outcome[:, i, j] == -1).sum()),
+                        "eod": int((outcome[:, i, j] == 0).sum()),
+                        "win_rate": (trade_pips > 0).mean() if trades else np.nan,
+                        "expectancy": trade_pips.mean() if trades else np.nan,
+                        "total_pips": trade_pips.sum(),
+                    })
+        return pd.DataFrame(rows)
+
     def write_strategy(self, df):
         df.to_csv(self.test_result_file_path, index=False)
-    
+
     def run(self):
         df = self.evaluate_strategy()
         self.write_strategy(df)
 
 if __name__ == "__main__":
-    back_test = BackTest(currency_pair="USD/JPY", 
-                         strategy_file_path=r"simulation\back_test\2024_11\USD_JPY_agg.csv", 
+    back_test = BackTest(currency_pair="USD/JPY",
+                         strategy_file_path=r"simulation\back_test\2024_11\USD_JPY_agg.csv",
                          test_result_file_path=r"simulation\2025_01_06\USD_JPY_test.csv",
                          custom=False, profit_pips=25, loss_pips=15)
     back_test.evaluate_strategy()
-    # back_test = BackTest(currency_pair="USD/JPY", 
-    #                      strategy_file_path=r"simulation\2025_01_06\USD_JPY.csv", 
+    # back_test = BackTest(currency_pair="USD/JPY",
+    #                      strategy_file_path=r"simulation\2025_01_06\USD_JPY.csv",
     #                      test_result_file_path=r"simulation\2025_01_06\USD_JPY_test_custom.csv",
     #                      custom=True, profit_pips=30, loss_pips=15)
-    # back_test.run()
\ No newline at end of file
+    # back_test.run()
+    # results = back_test.sweep(profit_pips=[15, 20, 30], loss_pips=[10, 15], fill_periods=[1, 2, 4])
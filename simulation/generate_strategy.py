@@ -12,6 +12,7 @@ import asyncio
 from datetime import datetime
 import time 
 import shutil
+from backend.utils.rate_limiter import PRIORITY_BACKTEST, is_rate_limit_error
 
 async def generate_trading_strategy_new(root_path: str, currency_pair: str, gemini_model: str):
     # prepare file and dir paths
@@ -219,7 +220,7 @@ async def generate_back_test_strategies(start_date, end_date, currency_pair, fil
             try:
                 coroutines = []
                 for api_key in [os.environ["GEMINI_API_KEY_KIEN"], os.environ["GEMINI_API_KEY_CONG"], os.environ["GEMINI_API_KEY_XIFAN"]]:
-                    TA = TechnicalAnalysis(currency_pair=currency_pair, gemini_model=gemini_model, gemini_api_key=api_key)
+                    TA = TechnicalAnalysis(currency_pair=currency_pair, gemini_model=gemini_model, gemini_api_key=api_key, priority=PRIORITY_BACKTEST)
                     coroutines.append(TA.create_gemini_analysis(
                         pivot_points=pivot_points,
                         current_price=current_price
@@ -245,8 +246,12 @@ async def generate_back_test_strategies(start_date, end_date, currency_pair, fil
             except Exception as e:
                 print(f"Attempt {attempt + 1} failed: {e}")
                 if attempt < max_retries - 1:
-                    print("Retrying in 120 seconds...")
-                    await asyncio.sleep(120)  # Wait for 120 seconds before retrying
+                    if is_rate_limit_error(e):
+                        # quota errors drain the key's bucket, so the retry waits exactly for the refill
+                        print("Retrying...")
+                    else:
+                        print("Retrying in 120 seconds...")
+                        await asyncio.sleep(120)  # Wait for 120 seconds before retrying
                 else:
                     print(f"Max retries reached. Skipping {hour} for interval {interval}.")
                     break # break the retry loop after max_retries are reached. The outer loops keep running.
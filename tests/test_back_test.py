@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.service.BarStore import BarStore
+from simulation import back_test
+from simulation.back_test import BackTest, TIMEZONE
+
+
+def make_minutes(start: str, n: int, tz: str = None) -> pd.DataFrame:
+    index = pd.date_range(start, periods=n, freq="1min", tz=tz, name="datetime")
+    close = np.arange(n, dtype=float)
+    return pd.DataFrame({"Open": close, "High": close, "Low": close, "Close": close}, index=index)
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = BarStore(root_path=str(tmp_path))
+    monkeypatch.setattr(back_test, "BAR_STORE", store)
+    return store
+
+
+def test_get_price_with_tz_aware_bounds_on_naive_store(store):
+    # TwelveData bars come without a timezone; the back test reads them as Berlin times
+    store.write("EUR/USD", "1min", make_minutes("2025-03-03 00:00", 3 * 1440))
+    start = pd.Timestamp("2025-03-03 10:00", tz=TIMEZONE)
+    end = pd.Timestamp("2025-03-03 12:00", tz=TIMEZONE)
+
+    prices = BackTest("EUR/USD", "strategy.csv", "result.csv").get_price(start, end)
+
+    assert prices.index[0] == start and prices.index[-1] == end
+    assert prices["Close"].iloc[0] == 600
+
+
+def test_get_price_with_tz_aware_bounds_on_utc_store(store):
+    store.write("EUR/USD", "1min", make_minutes("2025-03-03 00:00", 3 * 1440, tz="UTC"))
+    start = pd.Timestamp("2025-03-03 10:00", tz=TIMEZONE)
+    end = pd.Timestamp("2025-03-03 12:00", tz=TIMEZONE)
+
+    prices = BackTest("EUR/USD", "strategy.csv", "result.csv").get_price(start, end)
+
+    assert prices.index[0] == start and prices.index[-1] == end
+    # 10:00 in Berlin is 09:00 UTC in winter
+    assert prices["Close"].iloc[0] == 540
+
+
+def test_read_range_rejects_tz_aware_bounds_on_naive_store(store):
+    store.write("EUR/USD", "1min", make_minutes("2025-03-03 00:00", 60))
+    with pytest.raises(ValueError):
+        store.read_range("EUR/USD", "1min", pd.Timestamp("2025-03-03 00:10", tz="UTC"))
+
+
+def make_random_walk(start: str, n: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    index = pd.date_range(start, periods=n, freq="1min", tz=TIMEZONE, name="datetime")
+    close = 1.1 + np.cumsum(rng.normal(0, 0.00008, n))
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    high = np.maximum(open_, close) + rng.uniform(0, 0.00005, n)
+    low = np.minimum(open_, close) - rng.uniform(0, 0.00005, n)
+    return pd.DataFrame({"Open": open_, "High": high, "Low": low, "Close": close}, index=index)
+
+
+def write_orders(path, prices: pd.DataFrame, n: int, seed: int = 0) -> str:
+    rng = np.random.default_rng(seed)
+    positions = np.sort(rng.choice(np.arange(len(prices) - 2 * 1440), n, replace=False))
+    close = prices["Close"].to_numpy()[positions]
+    strategy = rng.choice(["buy", "sell", "wait"], n, p=[0.45, 0.45, 0.1])
+    entry = np.round(close + rng.normal(0, 0.0004, n), 5)
+    direction = np.where(strategy == "sell", -1, 1)
+    pd.DataFrame({
+        "order_time": prices.index[positions].tz_localize(None),
+        "strategy": strategy,
+        "entry_point": entry,
+        "stop_loss": entry - direction * 0.001,
+        "take_profit": entry + direction * 0.001,
+        "status": rng.choice(["open", "pending", "closed"], n, p=[0.45, 0.45, 0.1]),
+    }).to_csv(path, index=False)
+    return str(path)
+
+
+def expected_sweep_row(prices, strategy_file, fill_period, profit_pips, loss_pips) -> dict:
+    back_test = BackTest("EUR/USD", strategy_file, "result.csv", custom=True, profit_pips=profit_pips,
+                         loss_pips=loss_pips, fill_period=fill_period, price_data=prices.copy())
+    result = back_test.evaluate_strategy()
+    result = result[result["status"].isin(["cancel", "take_profit", "stop_loss", "eod"])]
+    trades = result[result["status"] != "cancel"]
+    profit = trades["profit"].astype(float)
+    return {
+        "orders": len(result),
+        "filled": len(trades),
+        "take_profit": int((trades["status"] == "take_profit").sum()),
+        "stop_loss": int((trades["status"] == "stop_loss").sum()),
+        "eod": int((trades["status"] == "eod").sum()),
+        "win_rate": (profit > 0).mean(),
+        "expectancy": profit.mean(),
+        "total_pips": profit.sum(),
+    }
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 256])
+def test_sweep_equals_evaluate_strategy_per_combination(tmp_path, chunk_size):
+    prices = make_random_walk("2025-03-03 00:00", 5 * 1440)
+    strategy_file = write_orders(tmp_path / "strategy.csv", prices, 40)
+    profit_pips, loss_pips, fill_periods = [5, 12], [4, 10, 25], [0.5, 2]
+
+    sweep = BackTest("EUR/USD", strategy_file, "result.csv", price_data=prices.copy()).sweep(
+        profit_pips, loss_pips, fill_periods, chunk_size=chunk_size)
+
+    assert len(sweep) == len(profit_pips) * len(loss_pips) * len(fill_periods)
+    # enough trades to cross several chunk boundaries
+    assert sweep["filled"].min() > 7
+    for row in sweep.to_dict("records"):
+        expected = expected_sweep_row(prices, strategy_file, row["fill_period"], row["profit_pips"], row["loss_pips"])
+        for column, value in expected.items():
+            assert row[column] == pytest.approx(value, abs=1e-9), (row, column)
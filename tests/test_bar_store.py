@@ -0,0 +1,97 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.service import BarStore as bar_store_module
+from backend.service.BarStore import BarStore
+
+
+def make_bars(start: str, n: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    index = pd.date_range(start, periods=n, freq="1min", name="datetime")
+    close = 1.1 + np.cumsum(rng.normal(0, 0.0001, n))
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    high = np.maximum(open_, close) + rng.uniform(0, 0.00005, n)
+    low = np.minimum(open_, close) - rng.uniform(0, 0.00005, n)
+    return pd.DataFrame({"Open": open_, "High": high, "Low": low, "Close": close}, index=index)
+
+
+def pandas_resample(df: pd.DataFrame, rule: str) -> pd.DataFrame:
+    return df.resample(rule).agg({"Open": "first", "High": "max", "Low": "min", "Close": "last"}).dropna()
+
+
+@pytest.fixture
+def store(tmp_path):
+    return BarStore(root_path=str(tmp_path))
+
+
+def test_resample_depth_covers_a_partial_first_bucket():
+    assert BarStore.resample_depth("5min", 10) == 55
+    assert BarStore.resample_depth("1h", 3, source_interval="5min") == 48
+    assert BarStore.resample_depth("1day", 1) == 2 * 1440
+
+
+def test_resample_matches_pandas_as_bars_arrive(store):
+    size = 20
+    depth = BarStore.resample_depth("5min", size)
+    # starting mid-bucket leaves a partial first 5min bar that the depth accounts for
+    bars = make_bars("2025-03-03 00:03", depth + 40)
+    store.write("EUR/USD", "1min", bars.iloc[:depth])
+
+    derived = store.resample("EUR/USD", "5min", size)
+    pd.testing.assert_frame_equal(derived, pandas_resample(bars.iloc[:depth], "5min").tail(size), check_freq=False)
+
+    # the forming minute is re-sent with new prices, then new minutes follow
+    forming = bars.iloc[depth - 1:depth].copy()
+    forming["Close"] += 0.001
+    forming["High"] = forming[["High", "Close"]].max(axis=1)
+    updated = pd.concat([bars.iloc[:depth - 1], forming, bars.iloc[depth:]])
+    store.write("EUR/USD", "1min", forming)
+    store.write("EUR/USD", "1min", bars.iloc[depth:])
+
+    derived = store.resample("EUR/USD", "5min", size)
+    pd.testing.assert_frame_equal(derived, pandas_resample(updated, "5min").tail(size), check_freq=False)
+
+
+def test_resample_needs_enough_source_bars(store):
+    store.write("EUR/USD", "1min", make_bars("2025-03-03 00:00", 30))
+    assert store.resample("EUR/USD", "5min", 10) is None
+    assert len(store.resample("EUR/USD", "5min", 6)) == 6
+
+
+def test_concurrent_backfills_of_one_key_keep_the_store_consistent(store, monkeypatch):
+    history = make_bars("2025-03-03 00:00", 3000)
+
+    class FakeTwelveData:
+        requests = 0
+
+        def __init__(self, currency_pair, interval, outputsize=400, exchange="OANDA", start_date=None, end_date=None, **kwargs):
+            self.outputsize = outputsize
+            self.end_date = end_date
+
+        def get_data(self):
+            FakeTwelveData.requests += 1
+            # a slow request lets the threads interleave if the store lets them
+            time.sleep(0.02)
+            data = history if self.end_date is None else history[history.index <= pd.Timestamp(self.end_date)]
+            return data.tail(self.outputsize)
+
+    monkeypatch.setattr(bar_store_module, "TwelveData", FakeTwelveData)
+    monkeypatch.setattr(BarStore, "MAX_FETCH_SIZE", 500)
+    store.write("EUR/USD", "1min", history.tail(100))
+
+    totals = []
+    threads = [threading.Thread(target=lambda: totals.append(store.backfill("EUR/USD", "1min", 2000))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stored = store.read("EUR/USD", "1min")
+    pd.testing.assert_frame_equal(stored, history.tail(len(stored)), check_freq=False)
+    assert len(stored) >= 2000 and stored.index.is_unique
+    # the first backfill fetched the history; the others found it stored
+    assert sorted(totals)[0] == len(stored) and FakeTwelveData.requests == 4
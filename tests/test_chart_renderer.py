@@ -0,0 +1,46 @@
+import asyncio
+
+import pytest
+
+from backend.utils.chart_renderer import ChartRenderer
+from backend.utils.technical_charts import TechnicalCharts
+from backend.utils.technical_indicators import TechnicalIndicators
+from tests.test_incremental_indicators import make_bars
+
+FLAGS = dict(EMA20=True, EMA50=True, RSI14=True, MACD=True, shading=True)
+
+
+@pytest.fixture(scope="module")
+def charts():
+    df = TechnicalIndicators.calculate_technical_indicators(make_bars(300))
+    return TechnicalCharts("EUR/USD", "1h", df, size=120, chart_name="test", cache=None)
+
+
+@pytest.fixture(scope="module")
+def pool():
+    renderer = ChartRenderer(max_workers=1)
+    yield renderer
+    renderer.shutdown()
+
+
+def test_thread_path_is_the_default():
+    assert ChartRenderer().max_workers == 0
+
+
+def test_pool_render_equals_plot_chart(charts, pool):
+    data, expected = charts.plot_chart(**FLAGS)
+
+    pooled_data, pooled = asyncio.run(charts.aplot_chart(renderer=pool, **FLAGS))
+    threaded_data, threaded = asyncio.run(charts.aplot_chart(renderer=ChartRenderer(), **FLAGS))
+
+    assert pooled_data == data and pooled == expected
+    assert threaded == expected
+
+
+def test_pool_composite_equals_plot_panels(charts, pool):
+    exports = {"ema": (), "rsi": ("RSI",), "macd": ("MACD",)}
+    data, expected = charts.plot_panels(exports, overlays=("ema",), **FLAGS)
+
+    pooled_data, pooled = asyncio.run(charts.aplot_panels(exports, overlays=("ema",), renderer=pool, **FLAGS))
+
+    assert pooled_data == data and pooled == expected
@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.utils.incremental_indicators import IncrementalIndicatorEngine, IncrementalIndicators
+from backend.utils.technical_indicators import TechnicalIndicators
+
+COLUMNS = ["EMA20", "EMA100", "RSI14", "MACD", "MACD_Signal", "ROC12", "BB_Upper", "ATR"]
+
+
+def make_bars(n: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 1.1 + np.cumsum(rng.normal(0, 0.001, n))
+    open_ = np.r_[close[0], close[:-1]]
+    spread = np.abs(rng.normal(0, 0.0005, n))
+    index = pd.date_range("2025-01-01", periods=n, freq="h", name="datetime")
+    return pd.DataFrame({
+        "Open": open_,
+        "High": np.maximum(open_, close) + spread,
+        "Low": np.minimum(open_, close) - spread,
+        "Close": close,
+    }, index=index)
+
+
+def test_first_fill_matches_batch():
+    df = make_bars(300)
+    batch = TechnicalIndicators.calculate_technical_indicators(df)
+    incremental = IncrementalIndicatorEngine().sync("EUR/USD", "1h", df)
+    pd.testing.assert_frame_equal(incremental[COLUMNS], batch[COLUMNS], check_exact=False, rtol=1e-9, atol=1e-12, check_freq=False)
+
+
+def test_slid_window_matches_batch():
+    df = make_bars(400)
+    engine = IncrementalIndicatorEngine()
+    engine.sync("EUR/USD", "1h", df.iloc[:300])
+    window = df.iloc[100:]
+    slid = engine.sync("EUR/USD", "1h", window)
+
+    recomputed = TechnicalIndicators.calculate_technical_indicators(window)
+    for column in COLUMNS:
+        np.testing.assert_allclose(slid[column].to_numpy(), recomputed[column].to_numpy(), rtol=1e-9, atol=1e-12, err_msg=column)
+
+
+def test_growing_frame_and_forming_bar_match_batch():
+    df = make_bars(300)
+    engine = IncrementalIndicatorEngine()
+    engine.sync("EUR/USD", "1h", df.iloc[:250])
+    revised = df.iloc[:260].copy()
+    revised.iloc[-1, revised.columns.get_loc("Close")] += 0.001
+    revised.iloc[-1, revised.columns.get_loc("High")] = revised[["High", "Close"]].iloc[-1].max()
+    engine.sync("EUR/USD", "1h", df.iloc[:260])
+    result = engine.sync("EUR/USD", "1h", revised)
+
+    recomputed = TechnicalIndicators.calculate_technical_indicators(revised)
+    for column in COLUMNS:
+        np.testing.assert_allclose(result[column].to_numpy(), recomputed[column].to_numpy(), rtol=1e-9, atol=1e-12, err_msg=column)
+
+
+def test_revising_the_latest_bar_rolls_it_back():
+    df = make_bars(120)
+    revised = df.iloc[-1].copy()
+    revised["Close"] += 0.002
+    revised["High"] = max(revised["High"], revised["Close"])
+
+    state = IncrementalIndicators()
+    state.extend(df)
+    row = state.update(df.index[-1], *revised[["Open", "High", "Low", "Close"]])
+
+    fresh = IncrementalIndicators()
+    fresh.extend(df.iloc[:-1])
+    expected = fresh.update(df.index[-1], *revised[["Open", "High", "Low", "Close"]])
+    assert row == pytest.approx(expected, nan_ok=True)
+    assert len(state.timestamps) == len(df)
+
+
+def test_closed_bars_cannot_be_revised():
+    df = make_bars(30)
+    state = IncrementalIndicators()
+    for timestamp, bar in df.iterrows():
+        state.update(timestamp, *bar[["Open", "High", "Low", "Close"]], revisable=False)
+    with pytest.raises(ValueError):
+        state.update(df.index[-1], *df.iloc[-1][["Open", "High", "Low", "Close"]])
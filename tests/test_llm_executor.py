@@ -0,0 +1,167 @@
+import asyncio
+
+import pytest
+
+from backend.utils import llm_executor
+from backend.utils.llm_executor import Fallback, HedgePolicy, LLMExecutor, RetryPolicy
+
+
+class StubLimiter:
+    """Grants every credit at once and records, per acquire, whether the provider semaphore was taken."""
+
+    def __init__(self, executor: LLMExecutor):
+        self.executor = executor
+        self.acquired = []
+        self.drained = 0
+
+    async def acquire(self, provider, key=None, cost=1, priority=None):
+        self.acquired.append(self.executor._semaphore(provider).locked())
+
+    def drain(self, provider, key=None):
+        self.drained += 1
+
+
+class RecordingPolicy(RetryPolicy):
+    def __post_init__(self):
+        super().__post_init__()
+        self.backoffs = []
+
+    def backoff(self, attempt: int) -> float:
+        self.backoffs.append(attempt)
+        return 0.0
+
+
+class StatusError(Exception):
+    def __init__(self, message: str, status_code: int):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+@pytest.fixture
+def executor(monkeypatch):
+    executor = LLMExecutor(concurrency={"stub": 1})
+    limiter = StubLimiter(executor)
+    monkeypatch.setattr(llm_executor, "RATE_LIMITER", limiter)
+    executor.limiter = limiter
+    return executor
+
+
+def failing(*errors, value="ok"):
+    """A coroutine function raising `errors` one per call, then returning `value`."""
+    calls = []
+
+    async def call():
+        calls.append(len(calls))
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return value
+
+    call.calls = calls
+    return call
+
+
+def test_backoff_stays_within_the_exponential_cap():
+    policy = RetryPolicy(base_delay=1.0, max_delay=5.0)
+    for attempt, cap in [(1, 1.0), (2, 2.0), (3, 4.0), (4, 5.0), (10, 5.0)]:
+        assert all(0 <= policy.backoff(attempt) <= cap for _ in range(50))
+
+
+def test_run_result_retries_with_backoff(executor):
+    policy = RecordingPolicy(max_attempts=4, timeout=None)
+    call = failing(Exception("429 Too Many Requests"), ConnectionError("reset"))
+
+    result = asyncio.run(executor.run_result("stub", "site", call, policy=policy))
+
+    assert result.ok and result.value == "ok" and result.attempts == 3
+    assert policy.backoffs == [1, 2]
+    # the quota rejection empties the bucket; the dropped connection does not
+    assert executor.limiter.drained == 1
+    stats = executor.metrics()["stub:site"]
+    assert (stats["calls"], stats["ok"], stats["retries"], stats["failures"]) == (1, 1, 2, 0)
+
+
+def test_run_result_gives_up_after_max_attempts(executor):
+    policy = RecordingPolicy(max_attempts=2, timeout=None)
+    call = failing(StatusError("overloaded", 503), StatusError("overloaded", 503), StatusError("overloaded", 503))
+
+    result = asyncio.run(executor.run_result("stub", "site", call, policy=policy))
+
+    assert not result.ok and result.attempts == 2 and result.status == 503
+    assert len(call.calls) == 2 and policy.backoffs == [1]
+
+
+def test_run_result_does_not_retry_client_errors(executor):
+    policy = RecordingPolicy(max_attempts=4, timeout=None)
+    call = failing(StatusError("bad request", 400))
+
+    result = asyncio.run(executor.run_result("stub", "site", call, policy=policy))
+
+    assert not result.ok and result.attempts == 1
+    assert (result.status, result.error_type, result.error) == (400, "StatusError", "bad request")
+    assert len(call.calls) == 1 and policy.backoffs == []
+    assert executor.metrics()["stub:site"]["failures"] == 1
+
+
+def test_credit_is_taken_before_the_semaphore(executor):
+    async def run():
+        release = asyncio.Event()
+
+        async def slow():
+            await release.wait()
+            return "slow"
+
+        first = asyncio.create_task(executor.run_result("stub", "site", slow))
+        await asyncio.sleep(0.01)
+        second = asyncio.create_task(executor.run_result("stub", "site", failing()))
+        await asyncio.sleep(0.01)
+        # the second call holds its credit while it queues behind the first for the only slot
+        assert executor.limiter.acquired == [False, True]
+        assert not second.done()
+        release.set()
+        return await first, await second
+
+    first, second = asyncio.run(run())
+    assert first.value == "slow" and second.value == "ok"
+    assert second.queue_delay > 0
+
+
+def test_hedge_needs_a_call(executor):
+    with pytest.raises(ValueError, match="at least one call"):
+        asyncio.run(executor.hedge("stub", "site", [], HedgePolicy()))
+
+
+def test_hedge_win_cancels_the_slower_call(executor):
+    policy = HedgePolicy(fallbacks=[Fallback(model="backup")], initial_delay=0.01, min_delay=0.01)
+    cancelled = []
+
+    async def primary():
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+        return "primary"
+
+    async def backup():
+        return "backup"
+
+    async def run():
+        value = await executor.hedge("stub", "site", [primary, backup], policy)
+        await asyncio.sleep(0)
+        return value
+
+    assert asyncio.run(run()) == "backup"
+    assert cancelled == [True]
+    stats = executor.metrics()["stub:site"]
+    assert (stats["hedges"], stats["hedge_wins"]) == (1, 1)
+
+
+def test_hedge_raises_the_last_error_when_every_call_fails(executor):
+    # a failed call fires the next one at once, well before the hedge delay
+    policy = HedgePolicy(fallbacks=[Fallback(model="backup")], initial_delay=60, min_delay=60)
+    first = failing(ConnectionError("primary down"))
+    second = failing(StatusError("backup down", 500))
+
+    with pytest.raises(StatusError, match="backup down"):
+        asyncio.run(asyncio.wait_for(executor.hedge("stub", "site", [first, second], policy), timeout=5))
+    assert len(first.calls) == 1 and len(second.calls) == 1
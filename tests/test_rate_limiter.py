@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+from backend.utils import rate_limiter
+from backend.utils.rate_limiter import (
+    PRIORITY_BACKTEST, PRIORITY_DEFAULT, PRIORITY_LIVE, RateLimit, RateLimitScheduler, TokenBucket,
+    is_rate_limit_error,
+)
+
+
+class FakeClock:
+    """Stands in for the `time` module of the rate limiter; only moves when the test advances it."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter, "time", clock)
+    return clock
+
+
+def test_queued_acquires_are_served_by_priority(clock):
+    async def run():
+        # 100 tokens/s keeps the real sleeps of the head short; the fake clock decides when a token refills
+        bucket = TokenBucket("test", rate=100, capacity=1)
+        await bucket.acquire()
+        order = []
+
+        async def take(lane, priority):
+            await bucket.acquire(priority=priority)
+            order.append(lane)
+
+        tasks = []
+        for lane, priority in [("backtest", PRIORITY_BACKTEST), ("default", PRIORITY_DEFAULT), ("live", PRIORITY_LIVE)]:
+            tasks.append(asyncio.create_task(take(lane, priority)))
+            await asyncio.sleep(0)
+        assert bucket.metrics()["queue_depth"] == 3
+
+        for granted in range(1, 4):
+            # capacity 1: each refill pays for exactly one waiter
+            clock.advance(1)
+            for _ in range(200):
+                if len(order) == granted:
+                    break
+                await asyncio.sleep(0.005)
+            assert len(order) == granted
+        await asyncio.gather(*tasks)
+        return order
+
+    assert asyncio.run(run()) == ["live", "default", "backtest"]
+
+
+def test_cost_above_capacity_is_rejected(clock):
+    bucket = TokenBucket("test", rate=1, capacity=2)
+
+    with pytest.raises(ValueError, match="exceeds the capacity"):
+        asyncio.run(bucket.acquire(cost=3))
+    with pytest.raises(ValueError, match="exceeds the capacity"):
+        bucket.acquire_sync(cost=3)
+    assert bucket.metrics()["queue_depth"] == 0
+
+    bucket.acquire_sync(cost=2)
+    assert bucket.metrics()["tokens"] == 0
+
+
+def test_drain_after_rate_limit_waits_for_refill(clock):
+    scheduler = RateLimitScheduler({"vendor": RateLimit(per_key=60, period=60)})
+    scheduler.acquire_sync("vendor", key="secret")
+    (bucket,) = scheduler.buckets("vendor", key="secret")
+    assert bucket.metrics()["tokens"] == 59
+
+    error = Exception("429 Too Many Requests")
+    assert is_rate_limit_error(error)
+    scheduler.drain("vendor", key="secret")
+    assert bucket.metrics()["tokens"] == 0
+
+    # one token per second refills; the other keys keep their own credit
+    clock.advance(1)
+    assert bucket.metrics()["tokens"] == 1
+    scheduler.acquire_sync("vendor", key="secret")
+    assert bucket.metrics()["tokens"] == 0
+    assert scheduler.buckets("vendor", key="other")[0].metrics()["tokens"] == 60
+
+
+def test_acquire_sync_on_event_loop_raises(clock):
+    bucket = TokenBucket("test", rate=1, capacity=1)
+
+    async def run():
+        bucket.acquire_sync()
+
+    with pytest.raises(RuntimeError, match="would block the running event loop"):
+        asyncio.run(run())
+    assert bucket.metrics()["queue_depth"] == 0
+    assert bucket.metrics()["tokens"] == 1
@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+import ta
+
+from backend.utils.incremental_indicators import IncrementalIndicatorEngine
+from backend.utils.technical_indicators import TechnicalIndicators
+from tests.test_incremental_indicators import make_bars
+
+
+def test_matches_ta():
+    df = make_bars(400)
+    result = TechnicalIndicators.calculate_technical_indicators(df, sma=True)
+    close = df["Close"]
+    macd = ta.trend.MACD(close, window_slow=26, window_fast=12, window_sign=9)
+    bollinger = ta.volatility.BollingerBands(close=close, window=20, window_dev=2)
+    expected = {
+        "SMA20": ta.trend.sma_indicator(close, window=20),
+        "EMA100": ta.trend.ema_indicator(close, window=100),
+        "RSI14": ta.momentum.rsi(close, window=14),
+        "MACD_Signal": macd.macd_signal(),
+        "ROC12": ta.momentum.roc(close, window=12),
+        "BB_Lower": bollinger.bollinger_lband(),
+        "ATR": ta.volatility.AverageTrueRange(high=df["High"], low=df["Low"], close=close, window=14).average_true_range(),
+    }
+    for column, values in expected.items():
+        np.testing.assert_allclose(result[column].to_numpy(), values.to_numpy(), rtol=1e-9, atol=1e-12, err_msg=column)
+
+
+def test_analysis_types_narrow_the_columns():
+    df = make_bars(200)
+    result = TechnicalIndicators.calculate_technical_indicators(df, analysis_types=["rsi"])
+    assert list(result.columns) == ["Open", "High", "Low", "Close", "RSI14", "Date"]
+
+    incremental = IncrementalIndicatorEngine().sync("EUR/USD", "1h", df, analysis_types=["rsi"])
+    pd.testing.assert_series_equal(incremental["RSI14"], result["RSI14"], check_freq=False)